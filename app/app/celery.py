@@ -59,6 +59,12 @@ app.conf.beat_schedule = {
 
     # ── Transporte ─────────────────────────────────────────────────────────────
 
+    'gerar-lista-embarque-diaria': {
+        'task': 'transporte.tasks.gerar_lista_embarque_diaria',
+        # Segunda a sexta às 04:30, antes da primeira partida (05:20)
+        'schedule': crontab(hour=4, minute=30, day_of_week='1-5'),
+    },
+
     'notificar-cartas-conducao-semanal': {
         'task': 'transporte.tasks.notificar_cartas_conducao',
         # Todas as segundas-feiras às 08:30
@@ -155,7 +155,8 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication + perfil do utilizador a partir dos claims do token
+        'core.authentication.PerfilJWTAuthentication',
     ],
 
     'DEFAULT_PERMISSION_CLASSES': [
@@ -182,8 +183,13 @@ SIMPLE_JWT = {
 
     # Claims adicionais no token (nome e role do utilizador)
     'TOKEN_OBTAIN_SERIALIZER': 'core.token_serializers.CustomTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'core.token_serializers.CustomTokenRefreshSerializer',
 }
 
+# Segundos que is_active/role/is_staff/perfil ficam em cache na autenticação só por token
+# (core.authentication.UtilizadorDoTokenAuthentication)
+JWT_UTILIZADOR_CACHE_TTL = int(os.environ.get('JWT_UTILIZADOR_CACHE_TTL', 60))
+
 # ──────────────────────────────────────────────
 # DRF SPECTACULAR (OpenAPI / Swagger)
 # ──────────────────────────────────────────────
@@ -208,6 +214,16 @@ import os
 AT_USERNAME = os.environ.get('AT_USERNAME', 'sandbox')
 AT_API_KEY = os.environ.get('AT_API_KEY', '')
 AT_SENDER_ID = os.environ.get('AT_SENDER_ID', '')
+# 'africastalking' em produção; 'local' usa o gateway falso de core.sms (dev/testes)
+SMS_BACKEND = os.environ.get('SMS_BACKEND', 'africastalking')
+# Nº de notificações por subtask do pipeline de SMS em lote
+SMS_TAMANHO_LOTE = int(os.environ.get('SMS_TAMANHO_LOTE', 100))
+# Cliente HTTP do gateway (timeouts em segundos) e disjuntor
+SMS_TIMEOUT_LIGACAO = float(os.environ.get('SMS_TIMEOUT_LIGACAO', 3.05))
+SMS_TIMEOUT_LEITURA = float(os.environ.get('SMS_TIMEOUT_LEITURA', 10))
+SMS_TAMANHO_POOL = int(os.environ.get('SMS_TAMANHO_POOL', 10))
+SMS_CIRCUITO_FALHAS = int(os.environ.get('SMS_CIRCUITO_FALHAS', 5))
+SMS_CIRCUITO_PAUSA = int(os.environ.get('SMS_CIRCUITO_PAUSA', 60))
 
 # Celery + Redis
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://redis:6379/0')
@@ -25,6 +25,7 @@ Dependências esperadas em INSTALLED_APPS:
 
 from django.contrib import admin
 from django.urls import include, path
+from core.token_serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -39,8 +40,17 @@ except ImportError:
 
 
 auth_patterns = [
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    # simplejwt 4.x não lê TOKEN_OBTAIN/REFRESH_SERIALIZER: os serializers vão explícitos
+    path(
+        'token/',
+        TokenObtainPairView.as_view(serializer_class=CustomTokenObtainPairSerializer),
+        name='token_obtain_pair',
+    ),
+    path(
+        'token/refresh/',
+        TokenRefreshView.as_view(serializer_class=CustomTokenRefreshSerializer),
+        name='token_refresh',
+    ),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
 ]
 
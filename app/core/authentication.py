@@ -0,0 +1,253 @@
+"""
+core/authentication.py
+======================
+Autenticação JWT com o perfil do utilizador resolvido pelo role.
+
+O access token emitido por CustomTokenObtainPairSerializer já traz o
+`role` e o `perfil_id` (pk do Aluno, Motorista, Monitor, Gestor ou
+Encarregado). PerfilJWTAuthentication guarda esses claims no user do
+pedido, e:
+
+  - perfil_id_do_utilizador(user) → pk do perfil, sem queries quando o token
+                                    o traz (permissões, escopo por role)
+  - perfil_do_utilizador(user)    → o perfil completo, numa query pelo role
+                                    (em vez de tentar perfil_motorista,
+                                    perfil_monitor, ... um a um)
+
+Ambos ficam em cache no próprio user — um objecto novo por pedido.
+
+Para endpoints de leitura muito consultados (presenças, resumos do dia),
+UtilizadorDoTokenAuthentication nem sequer lê o User: constrói um
+UtilizadorDoToken a partir dos claims e só confirma que a conta continua
+activa, com o role e o is_staff do token, numa cache Redis de TTL curto
+(JWT_UTILIZADOR_CACHE_TTL).
+
+O `perfil_id` do token nunca é usado sem confirmação: o estado em cache
+traz também o pk do perfil actual do utilizador, e só esse vale. Um perfil
+apagado, recriado ou passado para outra conta deixa de dar acesso logo que
+a cache é invalidada (core.signals), mesmo com tokens antigos ou renovados. Os ViewSets escolhem as actions que a usam com
+AutenticacaoPorTokenMixin.
+
+Referenciado em settings.py:
+  REST_FRAMEWORK = {
+      'DEFAULT_AUTHENTICATION_CLASSES': ['core.authentication.PerfilJWTAuthentication'],
+  }
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.base import ModelState
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from core.models import User
+
+logger = logging.getLogger(__name__)
+
+# role → related_name do perfil em User (ADMIN não tem perfil)
+PERFIL_POR_ROLE = {
+    User.Cargo.ALUNO: 'perfil_aluno',
+    User.Cargo.MOTORISTA: 'perfil_motorista',
+    User.Cargo.MONITOR: 'perfil_monitor',
+    User.Cargo.GESTOR: 'perfil_gestor',
+    User.Cargo.ENCARREGADO: 'perfil_encarregado',
+}
+
+
+class PerfilJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que guarda no user o perfil_id do token, se ainda for o dele."""
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        # Um token emitido antes de uma mudança de role ou de perfil não serve de atalho
+        perfil_id = validated_token.get('perfil_id')
+        if validated_token.get('role') == user.role and perfil_id is not None:
+            estado = estado_activo_do_utilizador(user.pk)
+            if estado and estado[0] == user.role and estado[2] == perfil_id:
+                user._perfil_id_token = perfil_id
+        return user
+
+
+# ──────────────────────────────────────────────
+# Utilizador sem estado (só claims do token)
+# ──────────────────────────────────────────────
+
+CACHE_UTILIZADOR_KEY = 'jwt:utilizador:estado:{}'
+
+
+class UtilizadorDoToken(TokenUser):
+    """
+    User do pedido construído só com os claims do access token — chega para
+    as permissões e para filtrar_por_role (pk, role, is_staff, perfil_id).
+    Não é uma instância de User: não serve para gravar FKs (registado_por, ...).
+    """
+
+    def __init__(self, token):
+        super().__init__(token)
+        # perfil_do_utilizador() guarda o perfil aqui, como num User
+        self._state = ModelState()
+
+    def __str__(self):
+        return self.nome or super().__str__()
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def nome(self):
+        return self.token.get('nome', '')
+
+    @cached_property
+    def nome_curto(self):
+        return self.token.get('nome_curto', '')
+
+
+def _estado_activo(user_id):
+    """
+    (role, is_staff, perfil_id) actuais do utilizador, ou () se estiver
+    inactivo ou não existir — o que decide o que o utilizador vê nas
+    permissões.
+    """
+    estado = User.objects.filter(pk=user_id, is_active=True).values_list('role', 'is_staff').first()
+    if not estado:
+        return ()
+    role, is_staff = estado
+    perfil_id = None
+    if role in PERFIL_POR_ROLE:
+        perfil = User._meta.get_field(PERFIL_POR_ROLE[role]).related_model
+        perfil_id = perfil.objects.filter(user_id=user_id).values_list('pk', flat=True).first()
+    return (role, is_staff, perfil_id)
+
+
+def estado_activo_do_utilizador(user_id):
+    """
+    _estado_activo() com cache de JWT_UTILIZADOR_CACHE_TTL segundos. Sem
+    Redis, lê da base de dados em vez de falhar a autenticação.
+    """
+    try:
+        return tuple(cache.get_or_set(
+            CACHE_UTILIZADOR_KEY.format(user_id),
+            lambda: _estado_activo(user_id),
+            timeout=getattr(settings, 'JWT_UTILIZADOR_CACHE_TTL', 60),
+        ))
+    except Exception as exc:
+        logger.warning('Cache indisponível ao verificar o utilizador %s: %s', user_id, exc)
+        return _estado_activo(user_id)
+
+
+def invalidar_cache_utilizador(user_id):
+    """Esquece o estado em cache (chamado quando o User muda ou é apagado)."""
+    try:
+        cache.delete(CACHE_UTILIZADOR_KEY.format(user_id))
+    except Exception as exc:
+        logger.warning('Cache indisponível ao invalidar o utilizador %s: %s', user_id, exc)
+
+
+class UtilizadorDoTokenAuthentication(PerfilJWTAuthentication):
+    """
+    Autenticação sem a query ao User: devolve um UtilizadorDoToken.
+
+    Contas desactivadas são recusadas assim que a cache expira ou é
+    invalidada (core.signals). Tokens sem o claim `role`, ou emitidos antes
+    de uma mudança de role ou de is_staff, seguem o caminho normal do
+    PerfilJWTAuthentication — is_staff dá acesso de gestor e não pode vir
+    de um claim desactualizado.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed(_('Token contained no recognizable user identification'))
+
+        role = validated_token.get('role')
+        if not role:
+            return super().get_user(validated_token)
+
+        estado = estado_activo_do_utilizador(user_id)
+        if not estado:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if estado[:2] != (role, validated_token.get('is_staff', False)):
+            return super().get_user(validated_token)
+
+        user = UtilizadorDoToken(validated_token)
+        # O perfil confirmado na base de dados, não o do claim
+        if estado[2] is not None:
+            user._perfil_id_token = estado[2]
+        return user
+
+
+class AutenticacaoPorTokenMixin:
+    """
+    Mixin de ViewSet: as actions em `acoes_autenticadas_por_token` usam
+    UtilizadorDoTokenAuthentication; as restantes mantêm a autenticação
+    por omissão.
+
+    A action ainda não está resolvida quando o DRF pede os autenticadores,
+    por isso é lida do action_map com o método do pedido.
+    """
+
+    acoes_autenticadas_por_token = ()
+
+    def get_authenticators(self):
+        # Sem pedido (ex.: geração do schema OpenAPI) fica a autenticação por omissão
+        action_map = getattr(self, 'action_map', None) or {}
+        request = getattr(self, 'request', None)
+        acao = action_map.get(request.method.lower()) if request is not None else None
+        if acao in self.acoes_autenticadas_por_token:
+            return [UtilizadorDoTokenAuthentication()]
+        return super().get_authenticators()
+
+
+try:
+    from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+    class PerfilJWTScheme(SimpleJWTScheme):
+        """Mesmo esquema OpenAPI (bearer) do JWTAuthentication original."""
+        target_class = 'core.authentication.PerfilJWTAuthentication'
+
+    class UtilizadorDoTokenScheme(SimpleJWTScheme):
+        target_class = 'core.authentication.UtilizadorDoTokenAuthentication'
+except ImportError:
+    pass
+
+
+def _relacao_do_perfil(user):
+    attr = PERFIL_POR_ROLE.get(getattr(user, 'role', None))
+    return User._meta.get_field(attr) if attr else None
+
+
+def perfil_do_utilizador(user):
+    """
+    Perfil de core do utilizador (None se o role não tiver perfil ou se
+    ainda não tiver sido criado). Uma query, pela tabela do role; o
+    resultado fica em cache no user (user.perfil_xxx deixa de fazer query).
+    """
+    relacao = _relacao_do_perfil(user)
+    if relacao is None or not user.pk:
+        return None
+    if relacao.is_cached(user):
+        return relacao.get_cached_value(user)
+
+    perfil = relacao.related_model.objects.filter(user_id=user.pk).first()
+
+    relacao.set_cached_value(user, perfil)
+    if perfil is not None and isinstance(user, User):
+        relacao.remote_field.set_cached_value(perfil, user)
+    return perfil
+
+
+def perfil_id_do_utilizador(user):
+    """pk do perfil do utilizador: do token quando possível, senão de perfil_do_utilizador()."""
+    perfil_id = user.__dict__.get('_perfil_id_token')
+    if perfil_id is not None:
+        return perfil_id
+    perfil = perfil_do_utilizador(user)
+    return perfil.pk if perfil is not None else None
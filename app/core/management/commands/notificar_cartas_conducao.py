@@ -5,9 +5,6 @@ Envia e-mail aos motoristas com carta de condução vencida ou
 a vencer nos próximos N dias (default: 30).
 """
 
-from datetime import timedelta
-from django.utils import timezone
-from core.models import Motorista
 from django.core.management.base import BaseCommand
 from django.core.mail import send_mail, BadHeaderError
 
@@ -30,23 +27,16 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        hoje = timezone.now().date()
-        limite = hoje + timedelta(days=options['dias'])
-        dry_run = options['dry_run']
+        from transporte.documentos import documentos_a_expirar
 
-        expirados = Motorista.objects.filter(
-            data_validade_carta__lt=hoje,
-            ativo=True,
-        ).select_related('user')
+        dry_run = options['dry_run']
 
-        a_vencer = Motorista.objects.filter(
-            data_validade_carta__gte=hoje,
-            data_validade_carta__lte=limite,
-            ativo=True,
-        ).select_related('user')
+        resultado = documentos_a_expirar(dias=options['dias'], documentos=['CARTA'])
+        expirados = resultado['vencidos']
+        a_vencer = resultado['a_vencer']
 
-        total_expirados = expirados.count()
-        total_a_vencer = a_vencer.count()
+        total_expirados = len(expirados)
+        total_a_vencer = len(a_vencer)
 
         if total_expirados == 0 and total_a_vencer == 0:
             self.stdout.write(self.style.SUCCESS('Nenhum motorista requer notificação.'))
@@ -63,8 +53,8 @@ class Command(BaseCommand):
                 motoristas=expirados,
                 assunto='Carta de Condução Vencida',
                 template=lambda m: (
-                    f'Prezado(a) {m.user.nome},\n\n'
-                    f'A sua carta de condução venceu em {m.data_validade_carta.strftime("%d/%m/%Y")}.\n'
+                    f'Prezado(a) {m["referencia"]},\n\n'
+                    f'A sua carta de condução venceu em {m["validade"].strftime("%d/%m/%Y")}.\n'
                     f'Por favor, regularize a sua situação o mais brevemente possível.\n\n'
                     f'Atenciosamente,\nEquipa de Gestão de Transporte'
                 ),
@@ -82,8 +72,8 @@ class Command(BaseCommand):
                 motoristas=a_vencer,
                 assunto='Carta de Condução Próxima de Vencer',
                 template=lambda m: (
-                    f'Prezado(a) {m.user.nome},\n\n'
-                    f'A sua carta de condução expira em {m.data_validade_carta.strftime("%d/%m/%Y")}.\n'
+                    f'Prezado(a) {m["referencia"]},\n\n'
+                    f'A sua carta de condução expira em {m["validade"].strftime("%d/%m/%Y")}.\n'
                     f'Por favor, proceda à renovação com antecedência.\n\n'
                     f'Atenciosamente,\nEquipa de Gestão de Transporte'
                 ),
@@ -99,8 +89,8 @@ class Command(BaseCommand):
         """Itera os motoristas, envia (ou simula) e-mail, devolve o total enviado."""
         enviados = 0
         for motorista in motoristas:
-            email = motorista.user.email
-            nome = motorista.user.nome
+            email = motorista['email']
+            nome = motorista['referencia']
 
             if not email:
                 self.stdout.write(
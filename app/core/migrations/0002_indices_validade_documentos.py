@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='motorista',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['validade_da_carta'], name='idx_motorista_carta_ativo'),
+        ),
+    ]
@@ -305,6 +305,13 @@ class Motorista(PerfilMixin):
     class Meta:
         verbose_name = "Motorista"
         verbose_name_plural = "Motoristas"
+        indexes = [
+            # Cartas a expirar (transporte.documentos) — só motoristas activos
+            models.Index(
+                fields=['validade_da_carta'], condition=models.Q(ativo=True),
+                name='idx_motorista_carta_ativo',
+            ),
+        ]
 
     def carta_conducao_vencida(self) -> bool:
         if not self.validade_da_carta:
@@ -0,0 +1,197 @@
+"""
+core/pagination.py
+==================
+Paginação por cursor (keyset) para as tabelas que crescem todos os dias.
+
+A PageNumberPagination global faz, em cada página, um COUNT(*) e um
+OFFSET que percorre todas as linhas anteriores. KeysetPagination guarda no
+cursor os valores da ordenação da última linha devolvida e filtra a
+página seguinte por esses valores:
+
+  WHERE data < :data OR (data = :data AND id < :id)   ← índice (data, id)
+
+A ordenação termina sempre no id, para que a posição seja única mesmo
+quando muitas linhas partilham a data. A contagem só é feita a pedido
+(?contar=1).
+
+Resposta:
+  { "count": N (só com ?contar=1), "next": url, "previous": url, "results": [...] }
+"""
+
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+VALORES_VERDADEIROS = ('1', 'true', 'sim')
+
+
+class KeysetPagination(CursorPagination):
+    """
+    CursorPagination com posição composta (todos os campos da ordenação),
+    sem offsets. As subclasses definem `ordering` e o índice correspondente
+    no Meta do modelo; um ?ordering= válido do OrderingFilter continua a ser
+    respeitado, com o id como desempate.
+    """
+
+    ordering = ('-id',)
+    contar_query_param = 'contar'
+
+    def get_ordering(self, request, queryset, view):
+        if api_settings.ORDERING_PARAM in request.query_params:
+            ordenacao = list(super().get_ordering(request, queryset, view))
+        else:
+            ordenacao = list(self.ordering)
+        if not any(campo.lstrip('-') in ('id', 'pk') for campo in ordenacao):
+            ordenacao.append('-id' if ordenacao[0].startswith('-') else 'id')
+        return tuple(ordenacao)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.contagem = queryset.count() if self._contar(request) else None
+
+        self.cursor = self.decode_cursor(request)
+        recuar = bool(self.cursor and self.cursor.reverse)
+        posicao = self._posicao_do_cursor()
+
+        ordenacao = _reverse_ordering(self.ordering) if recuar else self.ordering
+        queryset = queryset.order_by(*ordenacao)
+        if posicao is not None:
+            queryset = queryset.filter(self._depois_de(ordenacao, posicao))
+
+        # Mais uma linha para saber se há página seguinte
+        resultados = list(queryset[:self.page_size + 1])
+        self.page = resultados[:self.page_size]
+        ha_mais = len(resultados) > self.page_size
+
+        if recuar:
+            self.page.reverse()
+            self.has_next, self.has_previous = posicao is not None, ha_mais
+        else:
+            self.has_next, self.has_previous = ha_mais, posicao is not None
+        # Sem linhas não há onde ancorar os links
+        self.has_next = self.has_next and bool(self.page)
+        self.has_previous = self.has_previous and bool(self.page)
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    # ── Cursor ──────────────────────────────
+
+    def _contar(self, request):
+        return request.query_params.get(self.contar_query_param, '').lower() in VALORES_VERDADEIROS
+
+    def _posicao_do_cursor(self):
+        if self.cursor is None or self.cursor.position is None:
+            return None
+        try:
+            posicao = json.loads(self.cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        # Cursor de outra ordenação (o cliente mudou o ?ordering=)
+        if not isinstance(posicao, list) or len(posicao) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return posicao
+
+    @staticmethod
+    def _depois_de(ordenacao, posicao):
+        """
+        Linhas depois de `posicao` na `ordenacao`:
+          (a > x) OR (a = x AND b > y) OR ...
+        com o limite no primeiro campo repetido (a >= x) para o índice
+        poder ser percorrido por intervalo.
+        """
+        primeiro = ordenacao[0]
+        limite = Q(**{f"{primeiro.lstrip('-')}__{'lte' if primeiro.startswith('-') else 'gte'}": posicao[0]})
+
+        condicao, iguais = Q(), Q()
+        for campo, valor in zip(ordenacao, posicao):
+            nome = campo.lstrip('-')
+            lookup = 'lt' if campo.startswith('-') else 'gt'
+            condicao |= iguais & Q(**{f'{nome}__{lookup}': valor})
+            iguais &= Q(**{nome: valor})
+        return limite & condicao
+
+    def _get_position_from_instance(self, instance, ordering):
+        valores = []
+        for campo in ordering:
+            valor = instance
+            *caminho, ultimo = campo.lstrip('-').split('__')
+            for parte in caminho:
+                valor = valor[parte] if isinstance(valor, dict) else getattr(valor, parte)
+            # Numa FK guarda-se o id (attname), não o __str__ do objecto relacionado
+            valor = valor[ultimo] if isinstance(valor, dict) else valor.serializable_value(ultimo)
+            valores.append(str(valor))
+        return json.dumps(valores)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        posicao = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=posicao))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        posicao = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=posicao))
+
+    # ── Resposta ────────────────────────────
+
+    def get_paginated_response(self, data):
+        resposta = OrderedDict()
+        if self.contagem is not None:
+            resposta['count'] = self.contagem
+        resposta['next'] = self.get_next_link()
+        resposta['previous'] = self.get_previous_link()
+        resposta['results'] = data
+        return Response(resposta)
+
+    def get_paginated_response_schema(self, schema):
+        esquema = super().get_paginated_response_schema(schema)
+        esquema['properties'] = OrderedDict(
+            count={'type': 'integer', 'example': 123, 'description': f'Só com ?{self.contar_query_param}=1.'},
+            **esquema['properties'],
+        )
+        return esquema
+
+    def get_schema_operation_parameters(self, view):
+        parametros = super().get_schema_operation_parameters(view)
+        parametros[0]['schema'] = {'type': 'string'}
+        parametros.append({
+            'name': self.contar_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Incluir o total de resultados (COUNT) na resposta.',
+            'schema': {'type': 'boolean'},
+        })
+        return parametros
+
+
+# ──────────────────────────────────────────────
+# Paginações por modelo (índice correspondente no Meta)
+# ──────────────────────────────────────────────
+
+class TransacaoPagination(KeysetPagination):
+    """(data_vencimento, id) — idx_transacao_venc_id."""
+    ordering = ('-data_vencimento', '-id')
+
+
+class MensalidadePagination(KeysetPagination):
+    """(mes_referente, id) — idx_mensalidade_mes_id."""
+    ordering = ('-mes_referente', '-id')
+
+
+class TransporteAlunoPagination(KeysetPagination):
+    """(data, id) — idx_transporte_data_id."""
+    ordering = ('-data', '-id')
@@ -1,8 +1,19 @@
 """
 core/permissions.py
 Permissões granulares do sistema de transporte escolar.
+
+Além das permissões DRF, este módulo define o escopo de cada role:
+  - perfis_do_pedido(request)        → ids dos perfis do utilizador (aluno ids,
+                                       encarregado, rotas), lidos uma vez por pedido
+  - filtrar_por_role(queryset, req)  → queryset já restringido ao que o role vê
+                                       (ESCOPOS_POR_ROLE), para os get_queryset()
+
+Os has_object_permission comparam ids com esses conjuntos — sem queries
+por objecto.
 """
 
+from django.db.models import Q
+from django.utils.functional import cached_property
 from rest_framework.permissions import BasePermission, IsAuthenticated
 
 
@@ -15,6 +26,128 @@ def _e_admin_ou_gestor(user) -> bool:
     return user.is_staff or _tem_role(user, 'ADMIN', 'GESTOR')
 
 
+# ──────────────────────────────────────────────
+# Perfis do utilizador (cache por pedido)
+# ──────────────────────────────────────────────
+
+class PerfisDoUtilizador:
+    """
+    Ids dos perfis ligados ao utilizador. Cada conjunto é lido na primeira
+    utilização (uma query) e reutilizado no resto do pedido; o pk do próprio
+    perfil vem do token, depois de confirmado contra o perfil actual do
+    utilizador (core.authentication.perfil_id_do_utilizador).
+
+      aluno_ids       → ALUNO: o próprio; ENCARREGADO: os seus educandos
+      encarregado_id  → ENCARREGADO
+      motorista_id    → MOTORISTA
+      rota_ids        → MOTORISTA: rotas dos seus veículos;
+                        ALUNO / ENCARREGADO: rotas onde os alunos estão inscritos
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.role = getattr(user, 'role', None)
+
+    @cached_property
+    def perfil_id(self):
+        """pk do perfil do role — do token JWT, confirmado em core.authentication."""
+        from core.authentication import perfil_id_do_utilizador
+        return perfil_id_do_utilizador(self.user)
+
+    @cached_property
+    def aluno_ids(self) -> frozenset:
+        from core.models import Aluno
+        if self.role == 'ALUNO':
+            return frozenset([self.perfil_id] if self.perfil_id is not None else [])
+        if self.role == 'ENCARREGADO' and self.perfil_id is not None:
+            return frozenset(Aluno.objects.filter(encarregado_id=self.perfil_id).values_list('pk', flat=True))
+        return frozenset()
+
+    @property
+    def encarregado_id(self):
+        return self.perfil_id if self.role == 'ENCARREGADO' else None
+
+    @property
+    def motorista_id(self):
+        return self.perfil_id if self.role == 'MOTORISTA' else None
+
+    @cached_property
+    def rota_ids(self) -> frozenset:
+        from transporte.models import Rota
+        if self.role not in ('MOTORISTA', 'ALUNO', 'ENCARREGADO') or self.perfil_id is None:
+            return frozenset()
+        if self.role == 'MOTORISTA':
+            qs = Rota.objects.filter(veiculo__motorista_id=self.perfil_id).values_list('pk', flat=True)
+        elif self.role == 'ALUNO':
+            qs = Rota.alunos.through.objects.filter(aluno_id=self.perfil_id).values_list('rota_id', flat=True)
+        elif self.role == 'ENCARREGADO':
+            qs = (
+                Rota.alunos.through.objects
+                .filter(aluno__encarregado_id=self.perfil_id)
+                .values_list('rota_id', flat=True)
+            )
+        return frozenset(qs)
+
+
+def perfis_do_pedido(request) -> PerfisDoUtilizador:
+    """PerfisDoUtilizador do request.user, guardado no próprio pedido."""
+    perfis = request.__dict__.get('_perfis_do_utilizador')
+    if perfis is None or perfis.user is not request.user:
+        perfis = PerfisDoUtilizador(request.user)
+        request.__dict__['_perfis_do_utilizador'] = perfis
+    return perfis
+
+
+# ──────────────────────────────────────────────
+# Escopo de querysets por role
+# ──────────────────────────────────────────────
+
+# modelo → role → filtro (None = vê tudo). ADMIN/GESTOR vêem sempre tudo;
+# um role que não esteja listado não vê nada do modelo.
+ESCOPOS_POR_ROLE = {
+    'transporte.Rota': {
+        'MOTORISTA': lambda p: Q(veiculo__motorista__user_id=p.user.pk),
+        'MONITOR': None,
+        'ALUNO': lambda p: Q(pk__in=p.rota_ids),
+        'ENCARREGADO': lambda p: Q(pk__in=p.rota_ids),
+    },
+    'transporte.Veiculo': {
+        'MOTORISTA': lambda p: Q(motorista__user_id=p.user.pk),
+        'MONITOR': None,
+    },
+    'transporte.TransporteAluno': {
+        'MOTORISTA': lambda p: Q(rota__veiculo__motorista__user_id=p.user.pk),
+        'MONITOR': None,
+        'ALUNO': lambda p: Q(aluno_id__in=p.aluno_ids),
+        'ENCARREGADO': lambda p: Q(aluno_id__in=p.aluno_ids),
+    },
+    'financeiro.Mensalidade': {
+        'ALUNO': lambda p: Q(aluno_id__in=p.aluno_ids),
+        'ENCARREGADO': lambda p: Q(aluno_id__in=p.aluno_ids),
+    },
+}
+
+
+def filtrar_por_role(queryset, request):
+    """
+    Restringe `queryset` ao que o role do utilizador pode ver, segundo
+    ESCOPOS_POR_ROLE. Anónimos (ex.: geração do schema) recebem um queryset vazio.
+    """
+    user = request.user
+    if not user or not user.is_authenticated:
+        return queryset.none()
+    if _e_admin_ou_gestor(user):
+        return queryset
+
+    escopo = ESCOPOS_POR_ROLE.get(queryset.model._meta.label, {})
+    if user.role not in escopo:
+        return queryset.none()
+    filtro = escopo[user.role]
+    if filtro is None:
+        return queryset
+    return queryset.filter(filtro(perfis_do_pedido(request)))
+
+
 class IsGestor(BasePermission):
     """
     Permite acesso a utilizadores com role GESTOR ou ADMIN (is_staff).
@@ -123,13 +256,11 @@ class IsGestorOuProprioAluno(BasePermission):
             return True
         # Aluno só vê o próprio
         if _tem_role(request.user, 'ALUNO'):
-            return obj.user == request.user
+            return obj.user_id == request.user.pk
         # Encarregado só vê os seus alunos
         if _tem_role(request.user, 'ENCARREGADO'):
-            try:
-                return obj.encarregado.user == request.user
-            except AttributeError:
-                return False
+            encarregado_id = perfis_do_pedido(request).encarregado_id
+            return encarregado_id is not None and obj.encarregado_id == encarregado_id
         # Monitor e Motorista vêem todos os alunos (leitura)
         return _tem_role(request.user, 'MONITOR', 'MOTORISTA')
 
@@ -147,8 +278,9 @@ class IsProprioPerfilOuGestor(BasePermission):
     def has_object_permission(self, request, view, obj):
         if _e_admin_ou_gestor(request.user):
             return True
-        user_do_obj = obj if hasattr(obj, 'email') else getattr(obj, 'user', None)
-        return user_do_obj == request.user
+        if hasattr(obj, 'email'):
+            return obj.pk == request.user.pk
+        return getattr(obj, 'user_id', None) == request.user.pk
 
 
 class PodeLerMensalidade(BasePermission):
@@ -169,19 +301,15 @@ class PodeLerMensalidade(BasePermission):
     def has_object_permission(self, request, view, obj):
         if _e_admin_ou_gestor(request.user):
             return True
-        if _tem_role(request.user, 'ALUNO'):
-            return obj.aluno.user == request.user
-        if _tem_role(request.user, 'ENCARREGADO'):
-            try:
-                return obj.aluno.encarregado.user == request.user
-            except AttributeError:
-                return False
+        if _tem_role(request.user, 'ALUNO', 'ENCARREGADO'):
+            return obj.aluno_id in perfis_do_pedido(request).aluno_ids
         return False
 
 
 class PodeVerRota(BasePermission):
     """
-    GESTOR / MOTORISTA / MONITOR → todas as rotas.
+    GESTOR / MONITOR → todas as rotas.
+    MOTORISTA → rotas dos seus veículos.
     ENCARREGADO → rotas onde tem alunos inscritos.
     ALUNO → rota em que está inscrito.
     """
@@ -193,18 +321,10 @@ class PodeVerRota(BasePermission):
     def has_object_permission(self, request, view, obj):
         if _e_admin_ou_gestor(request.user):
             return True
-        if _tem_role(request.user, 'MOTORISTA'):
-            return obj.veiculo.motorista.user == request.user
         if _tem_role(request.user, 'MONITOR'):
             return True
-        if _tem_role(request.user, 'ALUNO'):
-            return obj.alunos.filter(user=request.user).exists()
-        if _tem_role(request.user, 'ENCARREGADO'):
-            try:
-                alunos_enc = request.user.perfil_encarregado.alunos.values_list('pk', flat=True)
-                return obj.alunos.filter(pk__in=alunos_enc).exists()
-            except AttributeError:
-                return False
+        if _tem_role(request.user, 'MOTORISTA', 'ALUNO', 'ENCARREGADO'):
+            return obj.pk in perfis_do_pedido(request).rota_ids
         return False
 
 
@@ -226,5 +346,6 @@ class PodeVerVeiculo(BasePermission):
         if _e_admin_ou_gestor(request.user) or _tem_role(request.user, 'MONITOR'):
             return True
         if _tem_role(request.user, 'MOTORISTA'):
-            return obj.motorista.user == request.user
+            motorista_id = perfis_do_pedido(request).motorista_id
+            return motorista_id is not None and obj.motorista_id == motorista_id
         return False
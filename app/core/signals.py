@@ -5,6 +5,9 @@ Signals do módulo core.
 
 Signals:
   - User.post_save      → criar perfil base consoante o role (se ainda não existe)
+  - User.post_save/post_delete → invalidar o estado em cache da autenticação por token
+  - Perfis (Aluno, Motorista, ...) post_save/post_delete → idem, para o dono
+                          antigo e o novo do perfil
   - Motorista.post_save → validar carta de condução + alertar se prestes a vencer
   - Aluno.post_save     → registar log de activação/desactivação
   - Aluno.pre_delete    → bloquear eliminação de alunos com histórico
@@ -23,7 +26,7 @@ from transporte.models import Veiculo
 from financeiro.models import Mensalidade
 from transporte.models import TransporteAluno
 from django.core.exceptions import PermissionDenied
-from django.db.models.signals import post_save, pre_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from core.models import Aluno, Encarregado, Gestor, Monitor, Motorista, User
 
 logger = logging.getLogger(__name__)
@@ -39,6 +42,48 @@ def criar_perfil_por_role(sender, instance, created, **kwargs):
         instance.email, instance.role, instance.pk
     )
 
+@receiver([post_save, post_delete], sender=User)
+def invalidar_cache_autenticacao(sender, instance, created=False, **kwargs):
+    """
+    is_active, role e is_staff ficam em cache na autenticação por token
+    (core.authentication.UtilizadorDoTokenAuthentication): uma conta
+    desactivada deixa de autenticar logo, sem esperar pelo TTL.
+    """
+    if created:
+        return
+    from core.authentication import invalidar_cache_utilizador
+    invalidar_cache_utilizador(instance.pk)
+
+
+@receiver(pre_save, sender=Aluno)
+@receiver(pre_save, sender=Encarregado)
+@receiver(pre_save, sender=Gestor)
+@receiver(pre_save, sender=Monitor)
+@receiver(pre_save, sender=Motorista)
+def guardar_dono_anterior_do_perfil(sender, instance, **kwargs):
+    """Dono do perfil antes desta escrita — um perfil pode mudar de conta."""
+    if not instance.pk:
+        return
+    instance._user_id_anterior = (
+        sender.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Aluno)
+@receiver([post_save, post_delete], sender=Encarregado)
+@receiver([post_save, post_delete], sender=Gestor)
+@receiver([post_save, post_delete], sender=Monitor)
+@receiver([post_save, post_delete], sender=Motorista)
+def invalidar_cache_autenticacao_do_perfil(sender, instance, **kwargs):
+    """
+    O pk do perfil também fica em cache na autenticação por token: o
+    perfil_id de um token só vale enquanto o perfil for desse utilizador.
+    """
+    from core.authentication import invalidar_cache_utilizador
+    for user_id in {instance.user_id, instance.__dict__.pop('_user_id_anterior', None)} - {None}:
+        invalidar_cache_utilizador(user_id)
+
+
 @receiver(pre_save, sender=User)
 def desactivar_perfil_com_user(sender, instance, **kwargs):
     """
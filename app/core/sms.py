@@ -4,8 +4,11 @@ core/sms.py
 Cliente SMS para Moçambique via Africa's Talking.
 """
 
+import os
 import re
+import time
 import logging
+import threading
 from django.conf import settings
 from typing import Dict, List, Optional
 
@@ -83,32 +86,281 @@ def identificar_operador(numero: str) -> str:
     return 'Desconhecido'
 
 
+# ── Segmentação ───────────────────────────────────────────────────────────────
+
+TAMANHO_SEGMENTO = 160
+
+
+def segmentar_mensagem(mensagem: str, limite: int = TAMANHO_SEGMENTO) -> List[str]:
+    """
+    Divide uma mensagem em segmentos de até `limite` caracteres, cortando
+    entre palavras. Com mais de um segmento, cada um leva o prefixo
+    '(i/n) ' (incluído no limite) para o destinatário os poder ordenar.
+    """
+    mensagem = ' '.join(mensagem.split())
+    if len(mensagem) <= limite:
+        return [mensagem]
+
+    # Espaço para o prefixo pelo nº de segmentos estimado; se a divisão
+    # der um total com mais dígitos, repete-se com a reserva desse total
+    total = len(mensagem) // (limite - 8) + 1
+    while True:
+        partes = _dividir_por_palavras(mensagem, limite - len(f'({total}/{total}) '))
+        if len(str(len(partes))) <= len(str(total)):
+            break
+        total = len(partes)
+
+    total = len(partes)
+    return [f'({i}/{total}) {parte}' for i, parte in enumerate(partes, start=1)]
+
+
+def _dividir_por_palavras(mensagem: str, largura: int) -> List[str]:
+    """Partes de até `largura` caracteres; palavras maiores são cortadas."""
+    partes, actual = [], ''
+    for palavra in mensagem.split(' '):
+        while len(palavra) > largura:
+            if actual:
+                partes.append(actual)
+                actual = ''
+            partes.append(palavra[:largura])
+            palavra = palavra[largura:]
+        candidato = f'{actual} {palavra}' if actual else palavra
+        if len(candidato) <= largura:
+            actual = candidato
+        else:
+            partes.append(actual)
+            actual = palavra
+    if actual:
+        partes.append(actual)
+    return partes
+
+
+# ── Gateway local (desenvolvimento / testes) ─────────────────────────────────
+
+class GatewayLocal:
+    """
+    Gateway falso com a mesma interface de africastalking.SMS.send().
+    Não envia nada: guarda cada pedido em `enviados` e responde 'Success'
+    para todos os destinatários. Activado com SMS_BACKEND='local'.
+    """
+
+    def __init__(self):
+        self.enviados = []
+
+    def send(self, message, recipients, sender_id=None):
+        self.enviados.append({
+            'message': message,
+            'recipients': list(recipients),
+            'sender_id': sender_id,
+        })
+        return {
+            'SMSMessageData': {
+                'Recipients': [
+                    {
+                        'number': numero,
+                        'status': 'Success',
+                        'messageId': f'LOCAL-{len(self.enviados)}-{i}',
+                        'cost': 'MZN 0.00',
+                    }
+                    for i, numero in enumerate(recipients)
+                ],
+            },
+        }
+
+    def limpar(self):
+        self.enviados.clear()
+
+
+gateway_local = GatewayLocal()
+
+
 # ── Cliente Africa's Talking ──────────────────────────────────────────────────
+#
+# O SDK oficial faz requests.post() módulo-a-módulo: cada SMS abre uma nova
+# ligação TLS. ClienteAfricasTalking fala directamente com o mesmo endpoint
+# (/version1/messaging) através de uma requests.Session com pool de
+# ligações keep-alive, partilhada por todas as threads do processo.
 
-def _get_client():
+class GatewayIndisponivel(Exception):
+    """O disjuntor está aberto — o envio nem chega a ser tentado."""
+
+
+class ClienteAfricasTalking:
+    """Cliente HTTP da API de SMS com sessão keep-alive e timeouts configuráveis."""
+
+    URL_PRODUCAO = 'https://api.africastalking.com/version1/messaging'
+    URL_SANDBOX = 'https://api.sandbox.africastalking.com/version1/messaging'
+
+    def __init__(self, username: str, api_key: str, timeout=(3.05, 10), tamanho_pool: int = 10):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.username = username
+        self.timeout = timeout
+        self.url = self.URL_SANDBOX if username == 'sandbox' else self.URL_PRODUCAO
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'apiKey': api_key,
+        })
+        # Sem retries ao nível HTTP: as falhas são contadas pelo disjuntor
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamanho_pool, max_retries=0)
+        self.session.mount('https://', adaptador)
+
+    def send(self, message, recipients, sender_id=None):
+        dados = {
+            'username': self.username,
+            'to': ','.join(recipients),
+            'message': message,
+            'bulkSMSMode': 1,
+        }
+        if sender_id:
+            dados['from'] = sender_id
+
+        resposta = self.session.post(self.url, data=dados, timeout=self.timeout)
+        resposta.raise_for_status()
+        return resposta.json()
+
+    def fechar(self):
+        self.session.close()
+
+
+class _ClienteHolder:
     """
-    Inicializa e devolve o cliente Africa's Talking.
-    Levanta ImproperlyConfigured se as credenciais não estiverem definidas.
+    Guarda um ClienteAfricasTalking por processo (thread-safe).
+    Recria o cliente se as credenciais mudarem ou após um fork
+    (workers prefork do Celery não partilham sockets com o pai).
     """
-    try:
-        import africastalking
-    except ImportError:
-        raise ImportError(
-            "Pacote 'africastalking' não instalado. "
-            "Adiciona 'africastalking' ao requirements.txt e reinstala."
-        )
 
-    username = getattr(settings, 'AT_USERNAME', None)
-    api_key = getattr(settings, 'AT_API_KEY', None)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cliente = None
+        self._chave = None
+
+    def obter(self) -> ClienteAfricasTalking:
+        username = getattr(settings, 'AT_USERNAME', None)
+        api_key = getattr(settings, 'AT_API_KEY', None)
 
-    if not username or not api_key:
-        raise ValueError(
-            "AT_USERNAME e AT_API_KEY devem estar definidos no .env. "
-            "Em sandbox usa AT_USERNAME=sandbox."
+        if not username or not api_key:
+            raise ValueError(
+                "AT_USERNAME e AT_API_KEY devem estar definidos no .env. "
+                "Em sandbox usa AT_USERNAME=sandbox."
+            )
+
+        timeout = (
+            getattr(settings, 'SMS_TIMEOUT_LIGACAO', 3.05),
+            getattr(settings, 'SMS_TIMEOUT_LEITURA', 10),
         )
+        tamanho_pool = getattr(settings, 'SMS_TAMANHO_POOL', 10)
+        chave = (os.getpid(), username, api_key, timeout, tamanho_pool)
+
+        cliente = self._cliente
+        if cliente is not None and self._chave == chave:
+            return cliente
 
-    africastalking.initialize(username, api_key)
-    return africastalking.SMS
+        with self._lock:
+            if self._cliente is None or self._chave != chave:
+                if self._cliente is not None and self._chave[0] == chave[0]:
+                    self._cliente.fechar()
+                self._cliente = ClienteAfricasTalking(username, api_key, timeout, tamanho_pool)
+                self._chave = chave
+            return self._cliente
+
+    def reiniciar(self):
+        with self._lock:
+            if self._cliente is not None:
+                self._cliente.fechar()
+            self._cliente = None
+            self._chave = None
+
+
+cliente_holder = _ClienteHolder()
+
+
+class Disjuntor:
+    """
+    Circuit breaker do gateway de SMS (por processo).
+
+      fechado     → envios normais; SMS_CIRCUITO_FALHAS falhas seguidas abrem-no
+      aberto      → envios recusados de imediato (GatewayIndisponivel)
+                    durante SMS_CIRCUITO_PAUSA segundos
+      semi-aberto → passada a pausa, deixa passar um envio de teste:
+                    sucesso fecha o circuito, falha volta a abri-lo
+    """
+
+    def __init__(self, relogio=time.monotonic):
+        self.relogio = relogio
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.falhas = 0
+            self.aberto_desde = None
+            self._teste_em_curso = False
+
+    @property
+    def estado(self) -> str:
+        if self.aberto_desde is None:
+            return 'fechado'
+        pausa = getattr(settings, 'SMS_CIRCUITO_PAUSA', 60)
+        if self.relogio() - self.aberto_desde >= pausa:
+            return 'semi-aberto'
+        return 'aberto'
+
+    def autorizar(self):
+        """Levanta GatewayIndisponivel se o envio não deve ser tentado."""
+        with self._lock:
+            estado = self.estado
+            if estado == 'fechado':
+                return
+            if estado == 'semi-aberto' and not self._teste_em_curso:
+                self._teste_em_curso = True
+                return
+        raise GatewayIndisponivel('Gateway de SMS indisponível (circuito aberto).')
+
+    def registar_sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self.aberto_desde = None
+            self._teste_em_curso = False
+
+    def registar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            self._teste_em_curso = False
+            limite = getattr(settings, 'SMS_CIRCUITO_FALHAS', 5)
+            if self.aberto_desde is not None or self.falhas >= limite:
+                if self.aberto_desde is None:
+                    logger.error('Gateway de SMS: %d falhas seguidas — circuito aberto.', self.falhas)
+                self.aberto_desde = self.relogio()
+
+
+disjuntor = Disjuntor()
+
+
+def _get_client():
+    """
+    Devolve o cliente do gateway: o gateway_local com SMS_BACKEND='local',
+    senão o ClienteAfricasTalking partilhado do processo.
+    Levanta ValueError se as credenciais não estiverem definidas.
+    """
+    if getattr(settings, 'SMS_BACKEND', 'africastalking') == 'local':
+        return gateway_local
+    return cliente_holder.obter()
+
+
+def _enviar(mensagem: str, numeros: List[str], sender_id: str = None) -> dict:
+    """Envia pelo gateway, passando pelo disjuntor."""
+    disjuntor.autorizar()
+    try:
+        resposta = _get_client().send(message=mensagem, recipients=numeros, sender_id=sender_id)
+    except Exception:
+        disjuntor.registar_falha()
+        raise
+    disjuntor.registar_sucesso()
+    return resposta
 
 
 def enviar_sms(destinatario: str, mensagem: str, sender_id: str = None) -> dict:
@@ -143,15 +395,7 @@ def enviar_sms(destinatario: str, mensagem: str, sender_id: str = None) -> dict:
     operador = identificar_operador(numero_normalizado)
 
     try:
-        sms = _get_client()
-        kwargs = {
-            'message': mensagem,
-            'recipients': [numero_normalizado],
-        }
-        if sender_id:
-            kwargs['senderId'] = sender_id
-
-        resposta = sms.send(**kwargs)
+        resposta = _enviar(mensagem, [numero_normalizado], sender_id)
         recipients = resposta.get('SMSMessageData', {}).get('Recipients', [])
 
         if recipients:
@@ -225,15 +469,7 @@ def enviar_sms_bulk(destinatarios: List[str], mensagem: str, sender_id: str = No
         return resultados
 
     try:
-        sms = _get_client()
-        kwargs = {
-            'message': mensagem,
-            'recipients': numeros_validos,
-        }
-        if sender_id:
-            kwargs['senderId'] = sender_id
-
-        resposta = sms.send(**kwargs)
+        resposta = _enviar(mensagem, numeros_validos, sender_id)
         recipients = resposta.get('SMSMessageData', {}).get('Recipients', [])
 
         mapa = {r.get('number'): r for r in recipients}
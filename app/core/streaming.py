@@ -0,0 +1,62 @@
+"""
+core/streaming.py
+=================
+Respostas JSON em stream para actions que devolvem listas inteiras
+(sem paginação): mensalidades do mês, folhas pendentes, alunos da rota...
+
+Em vez de serializar o queryset todo para uma lista em memória, a
+resposta lê o queryset aos lotes com iterator() e escreve o array JSON
+lote a lote — a memória fica constante seja qual for o tamanho da escola
+e os primeiros bytes saem logo.
+
+Uso numa action:
+    return resposta_json_em_stream(qs, MensalidadeListSerializer,
+                                   context=self.get_serializer_context())
+
+O status (200) é enviado antes de o queryset ser lido: validações e
+permissões têm de ser feitas antes de chamar a função.
+"""
+
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+TAMANHO_LOTE = 500
+
+
+def _lotes(queryset, tamanho):
+    """Listas de até `tamanho` objectos, lidas com iterator()."""
+    # iterator() ignora o prefetch_related — aplicado aqui a cada lote
+    prefetch = queryset._prefetch_related_lookups
+    lote = []
+    for obj in queryset.iterator(chunk_size=tamanho):
+        lote.append(obj)
+        if len(lote) == tamanho:
+            if prefetch:
+                prefetch_related_objects(lote, *prefetch)
+            yield lote
+            lote = []
+    if lote:
+        if prefetch:
+            prefetch_related_objects(lote, *prefetch)
+        yield lote
+
+
+def _array_json(queryset, serializer_class, context, tamanho_lote):
+    # Mesmo formato do JSONRenderer (UNICODE_JSON e COMPACT_JSON por omissão)
+    codificador = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    separador = ''
+    yield '['
+    for lote in _lotes(queryset, tamanho_lote):
+        dados = serializer_class(lote, many=True, context=context).data
+        yield separador + ','.join(codificador.encode(item) for item in dados)
+        separador = ','
+    yield ']'
+
+
+def resposta_json_em_stream(queryset, serializer_class, context=None, tamanho_lote=TAMANHO_LOTE):
+    """StreamingHttpResponse com o array JSON de `serializer_class` sobre `queryset`."""
+    return StreamingHttpResponse(
+        _array_json(queryset, serializer_class, context, tamanho_lote),
+        content_type='application/json',
+    )
@@ -76,6 +76,185 @@ class JWTTests(BaseAPITestCase):
         self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class PerfilDoUtilizadorTests(BaseAPITestCase):
+    """core.authentication — perfil resolvido pelo role e perfil_id no token."""
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        cache.clear()
+        self.motorista = criar_motorista(
+            user=criar_user(role='MOTORISTA', email='jwt_mot@teste.co.mz'),
+        )
+
+    def _user_do_token(self, token):
+        from core.authentication import PerfilJWTAuthentication
+        autenticacao = PerfilJWTAuthentication()
+        return autenticacao.get_user(autenticacao.get_validated_token(str(token)))
+
+    def test_login_devolve_perfil_id(self):
+        resp = self.client.post('/api/v1/auth/token/', {
+            'email': 'jwt_mot@teste.co.mz',
+            'password': 'Senha@1234',
+        })
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['role'], 'MOTORISTA')
+        self.assertEqual(resp.data['perfil_id'], self.motorista.pk)
+
+    def test_perfil_id_do_token_sem_queries(self):
+        from core.authentication import perfil_id_do_utilizador
+        from core.token_serializers import CustomTokenObtainPairSerializer
+        token = CustomTokenObtainPairSerializer.get_token(self.motorista.user).access_token
+        self._user_do_token(token)  # confirma o perfil e deixa-o em cache
+
+        with self.assertNumQueries(1):  # só o SELECT do utilizador
+            user = self._user_do_token(token)
+            self.assertEqual(perfil_id_do_utilizador(user), self.motorista.pk)
+
+    def test_perfil_carregado_numa_query_e_em_cache(self):
+        from core.authentication import perfil_do_utilizador
+        user = self._user_do_token(RefreshToken.for_user(self.motorista.user).access_token)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(perfil_do_utilizador(user), self.motorista)
+            self.assertEqual(user.perfil_motorista, self.motorista)
+            self.assertIs(perfil_do_utilizador(user).user, user)
+
+    def test_token_de_outro_role_e_ignorado(self):
+        from core.authentication import perfil_id_do_utilizador
+        from core.token_serializers import CustomTokenObtainPairSerializer
+        token = CustomTokenObtainPairSerializer.get_token(self.motorista.user).access_token
+        self.motorista.user.role = 'GESTOR'
+        self.motorista.user.save()
+
+        user = self._user_do_token(token)
+        self.assertIsNone(perfil_id_do_utilizador(user))
+
+    def test_perfil_recriado_nao_usa_o_perfil_id_antigo(self):
+        from core.authentication import perfil_id_do_utilizador
+        from core.token_serializers import CustomTokenObtainPairSerializer
+        user = self.motorista.user
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        self.motorista.delete()
+        novo = criar_motorista(user=user)
+
+        self.assertEqual(perfil_id_do_utilizador(self._user_do_token(token)), novo.pk)
+
+    def test_perfil_passado_para_outra_conta_deixa_de_valer(self):
+        from core.authentication import UtilizadorDoTokenAuthentication, perfil_id_do_utilizador
+        from core.token_serializers import CustomTokenObtainPairSerializer
+        token = CustomTokenObtainPairSerializer.get_token(self.motorista.user).access_token
+        self._user_do_token(token)
+        self.motorista.user = criar_user(role='MOTORISTA', email='jwt_mot2@teste.co.mz')
+        self.motorista.save()
+
+        self.assertIsNone(perfil_id_do_utilizador(self._user_do_token(token)))
+        autenticacao = UtilizadorDoTokenAuthentication()
+        user = autenticacao.get_user(autenticacao.get_validated_token(str(token)))
+        self.assertIsNone(perfil_id_do_utilizador(user))
+
+    def test_refresh_emite_o_perfil_id_actual(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        resp = self.client.post('/api/v1/auth/token/', {
+            'email': 'jwt_mot@teste.co.mz',
+            'password': 'Senha@1234',
+        })
+        user = self.motorista.user
+        self.motorista.delete()
+        novo = criar_motorista(user=user)
+
+        resp = self.client.post('/api/v1/auth/token/refresh/', {'refresh': resp.data['refresh']})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessToken(resp.data['access'])['perfil_id'], novo.pk)
+        self.assertEqual(RefreshToken(resp.data['refresh'])['perfil_id'], novo.pk)
+
+    def test_refresh_de_conta_desactivada_e_recusado(self):
+        resp = self.client.post('/api/v1/auth/token/', {
+            'email': 'jwt_mot@teste.co.mz',
+            'password': 'Senha@1234',
+        })
+        User = self.motorista.user.__class__
+        User.objects.filter(pk=self.motorista.user_id).update(is_active=False)
+
+        resp = self.client.post('/api/v1/auth/token/refresh/', {'refresh': resp.data['refresh']})
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UtilizadorDoTokenAuthenticationTests(BaseAPITestCase):
+    """core.authentication — leituras autenticadas só pelos claims do token."""
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        cache.clear()
+        self.user = criar_user(role='MONITOR', email='jwt_mon@teste.co.mz')
+
+    def _autenticar_com_claims(self, user):
+        from core.token_serializers import CustomTokenObtainPairSerializer
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return token
+
+    def test_leitura_repetida_nao_le_o_user(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import User
+        self._autenticar_com_claims(self.user)
+        self.assertEqual(self.client.get('/api/v1/transportes/resumo-hoje/').status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get('/api/v1/transportes/resumo-hoje/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        tabela = User._meta.db_table
+        self.assertFalse([q['sql'] for q in queries if tabela in q['sql']])
+
+    def test_utilizador_desactivado_e_recusado(self):
+        self._autenticar_com_claims(self.user)
+        self.assertEqual(self.client.get('/api/v1/transportes/hoje/').status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+        resp = self.client.get('/api/v1/transportes/hoje/')
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_do_token_tem_claims_de_perfil(self):
+        from core.authentication import UtilizadorDoToken, UtilizadorDoTokenAuthentication
+        token = self._autenticar_com_claims(self.user)
+        autenticacao = UtilizadorDoTokenAuthentication()
+        user = autenticacao.get_user(autenticacao.get_validated_token(str(token)))
+
+        self.assertIsInstance(user, UtilizadorDoToken)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.role, 'MONITOR')
+        self.assertEqual(user.nome, self.user.nome)
+
+    def test_mudanca_de_role_usa_autenticacao_completa(self):
+        from core.authentication import UtilizadorDoTokenAuthentication
+        from core.models import User
+        token = self._autenticar_com_claims(self.user)
+        self.user.role = 'GESTOR'
+        self.user.save()
+
+        autenticacao = UtilizadorDoTokenAuthentication()
+        user = autenticacao.get_user(autenticacao.get_validated_token(str(token)))
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.role, 'GESTOR')
+
+    def test_remocao_de_is_staff_usa_autenticacao_completa(self):
+        from core.authentication import UtilizadorDoTokenAuthentication
+        from core.models import User
+        self.user.is_staff = True
+        self.user.save()
+        token = self._autenticar_com_claims(self.user)
+        self.user.is_staff = False
+        self.user.save()
+
+        autenticacao = UtilizadorDoTokenAuthentication()
+        user = autenticacao.get_user(autenticacao.get_validated_token(str(token)))
+        self.assertIsInstance(user, User)
+        self.assertFalse(user.is_staff)
+
+
 class UserViewSetTests(BaseAPITestCase):
 
     def setUp(self):
@@ -24,6 +24,7 @@ from tests.factories import (
     criar_monitor,
     criar_motorista,
     criar_rota,
+    criar_transporte_aluno,
     criar_user,
     criar_veiculo,
 )
@@ -353,3 +354,87 @@ class BalancoEndpointPermissaoTests(BaseAPITestCase):
     def test_anonimo_nao_gera_balanco(self):
         resp = self.client.post('/api/v1/balancos/gerar/', {'mes': 3, 'ano': 2025})
         self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+# ══════════════════════════════════════════════
+# ESCOPO POR ROLE
+# ══════════════════════════════════════════════
+
+class EscopoPorRoleTests(BaseAPITestCase):
+    """filtrar_por_role e has_object_permission sobre os ids de perfis_do_pedido."""
+
+    def setUp(self):
+        super().setUp()
+        criar_config_financeira()
+        self.motorista = criar_motorista(user=criar_user(role='MOTORISTA', email='mot_esc@teste.co.mz'))
+        outro_motorista = criar_motorista(user=criar_user(role='MOTORISTA', email='mot_esc2@teste.co.mz'))
+        self.rota = criar_rota(veiculo=criar_veiculo(motorista=self.motorista))
+        self.outra_rota = criar_rota(veiculo=criar_veiculo(motorista=outro_motorista), nome='Rota Norte')
+
+        self.encarregado = criar_encarregado(user=criar_user(role='ENCARREGADO', email='enc_esc@teste.co.mz'))
+        self.alunos = [
+            criar_aluno(
+                user=criar_user(role='ALUNO', email=f'aluno_esc{i}@teste.co.mz'),
+                encarregado=self.encarregado,
+            )
+            for i in range(2)
+        ]
+        self.rota.alunos.add(*self.alunos)
+        self.aluno_alheio = criar_aluno(
+            user=criar_user(role='ALUNO', email='aluno_esc_alheio@teste.co.mz'),
+            encarregado=criar_encarregado(user=criar_user(role='ENCARREGADO', email='enc_esc2@teste.co.mz')),
+        )
+
+    @staticmethod
+    def _pedido(user):
+        from types import SimpleNamespace
+        return SimpleNamespace(user=user)
+
+    def test_objectos_verificados_sem_query_por_objecto(self):
+        from core.permissions import PodeLerMensalidade, PodeVerRota
+        from financeiro.models import Mensalidade
+        mensalidades = [Mensalidade(aluno=a) for a in (*self.alunos, self.aluno_alheio)]
+        req = self._pedido(self.encarregado.user)
+
+        # Uma query para as rotas e outra para os alunos — depois só sets
+        with self.assertNumQueries(2):
+            self.assertTrue(PodeVerRota().has_object_permission(req, None, self.rota))
+            self.assertFalse(PodeVerRota().has_object_permission(req, None, self.outra_rota))
+            permitidas = [
+                PodeLerMensalidade().has_object_permission(req, None, m) for m in mensalidades
+            ]
+        self.assertEqual(permitidas, [True, True, False])
+
+    def test_filtrar_por_role(self):
+        from core.permissions import filtrar_por_role
+        from financeiro.models import Mensalidade
+        from transporte.models import Rota, TransporteAluno
+        self.outra_rota.alunos.add(self.aluno_alheio)
+        for aluno in self.alunos:
+            criar_transporte_aluno(aluno=aluno, rota=self.rota)
+        criar_transporte_aluno(aluno=self.aluno_alheio, rota=self.outra_rota)
+
+        self.assertEqual(
+            list(filtrar_por_role(Rota.objects.all(), self._pedido(self.motorista.user))),
+            [self.rota],
+        )
+        self.assertEqual(
+            set(filtrar_por_role(TransporteAluno.objects.all(), self._pedido(self.encarregado.user))
+                .values_list('aluno_id', flat=True)),
+            {a.pk for a in self.alunos},
+        )
+        self.assertFalse(
+            filtrar_por_role(Mensalidade.objects.all(), self._pedido(self.motorista.user)).exists()
+        )
+
+    def test_motorista_lista_so_as_suas_rotas(self):
+        self._autenticar(self.motorista.user)
+        resp = self.client.get('/api/v1/rotas/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        resultados = resp.data['results'] if 'results' in resp.data else resp.data
+        self.assertEqual([r['id'] for r in resultados], [self.rota.pk])
+
+    def test_motorista_continua_a_receber_403_na_rota_alheia(self):
+        self._autenticar(self.motorista.user)
+        resp = self.client.get(f'/api/v1/rotas/{self.outra_rota.pk}/')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
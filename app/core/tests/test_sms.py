@@ -0,0 +1,153 @@
+"""
+tests/core/test_sms.py
+======================
+Testes do cliente SMS (core.sms).
+
+Executar:
+    python manage.py test core.tests.test_sms
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+
+class SegmentarMensagemTests(TestCase):
+
+    def test_mensagem_curta_fica_inteira(self):
+        from core.sms import segmentar_mensagem
+        self.assertEqual(segmentar_mensagem('Olá  mundo'), ['Olá mundo'])
+
+    def test_mensagem_longa_dividida_entre_palavras(self):
+        from core.sms import segmentar_mensagem
+        texto = ' '.join(f'palavra{i}' for i in range(60))
+        segmentos = segmentar_mensagem(texto)
+
+        self.assertGreater(len(segmentos), 1)
+        self.assertTrue(all(len(seg) <= 160 for seg in segmentos))
+        total = len(segmentos)
+        corpo = ' '.join(seg.split(') ', 1)[1] for seg in segmentos)
+        self.assertEqual(corpo, texto)
+        self.assertEqual(segmentos[-1][:len(f'({total}/{total})')], f'({total}/{total})')
+
+    def test_palavra_maior_que_o_limite_e_cortada(self):
+        from core.sms import segmentar_mensagem
+        segmentos = segmentar_mensagem('x' * 400)
+        self.assertTrue(all(len(seg) <= 160 for seg in segmentos))
+        self.assertEqual(''.join(seg.split(') ', 1)[1] for seg in segmentos), 'x' * 400)
+
+    def test_prefixo_com_mais_digitos_que_a_estimativa(self):
+        from core.sms import segmentar_mensagem
+        # Palavras longas intercaladas com curtas: a estimativa dá 9 segmentos
+        # (prefixo de 6 caracteres), a divisão dá mais de 10
+        texto = ' '.join(['y' * 154, 'curta'] * 8)
+        segmentos = segmentar_mensagem(texto)
+
+        total = len(segmentos)
+        self.assertGreaterEqual(total, 10)
+        self.assertTrue(all(len(seg) <= 160 for seg in segmentos))
+        self.assertTrue(segmentos[-1].startswith(f'({total}/{total}) '))
+
+
+class _GatewayFalhado:
+    def __init__(self):
+        self.chamadas = 0
+
+    def send(self, message, recipients, sender_id=None):
+        self.chamadas += 1
+        raise ConnectionError('gateway em baixo')
+
+
+@override_settings(SMS_CIRCUITO_FALHAS=2, SMS_CIRCUITO_PAUSA=60)
+class DisjuntorTests(TestCase):
+
+    def setUp(self):
+        from core.sms import disjuntor
+        self.agora = 1000.0
+        self.disjuntor = disjuntor
+        self.disjuntor.relogio = lambda: self.agora
+        self.disjuntor.reiniciar()
+        self.addCleanup(self.disjuntor.reiniciar)
+        self.addCleanup(setattr, self.disjuntor, 'relogio', time.monotonic)
+
+    def test_abre_apos_falhas_seguidas_e_deixa_de_chamar_o_gateway(self):
+        from core.sms import enviar_sms
+        gateway = _GatewayFalhado()
+        with patch('core.sms._get_client', return_value=gateway):
+            for _ in range(2):
+                self.assertFalse(enviar_sms('841234567', 'teste')['sucesso'])
+            resultado = enviar_sms('841234567', 'teste')
+
+        self.assertEqual(gateway.chamadas, 2)
+        self.assertEqual(self.disjuntor.estado, 'aberto')
+        self.assertIn('circuito aberto', resultado['erro'])
+
+    @override_settings(SMS_BACKEND='local')
+    def test_semi_aberto_fecha_apos_envio_com_sucesso(self):
+        from core.sms import enviar_sms
+        with patch('core.sms._get_client', return_value=_GatewayFalhado()):
+            enviar_sms('841234567', 'teste')
+            enviar_sms('841234567', 'teste')
+
+        self.agora += 61
+        self.assertEqual(self.disjuntor.estado, 'semi-aberto')
+        self.assertTrue(enviar_sms('841234567', 'teste')['sucesso'])
+        self.assertEqual(self.disjuntor.estado, 'fechado')
+
+    def test_falha_em_semi_aberto_reabre(self):
+        from core.sms import enviar_sms
+        gateway = _GatewayFalhado()
+        with patch('core.sms._get_client', return_value=gateway):
+            enviar_sms('841234567', 'teste')
+            enviar_sms('841234567', 'teste')
+            self.agora += 61
+            enviar_sms('841234567', 'teste')
+
+        self.assertEqual(gateway.chamadas, 3)
+        self.assertEqual(self.disjuntor.estado, 'aberto')
+
+
+@override_settings(SMS_BACKEND='africastalking', AT_USERNAME='sandbox', AT_API_KEY='chave')
+class ClienteAfricasTalkingTests(TestCase):
+
+    def setUp(self):
+        from core.sms import cliente_holder
+        cliente_holder.reiniciar()
+        self.addCleanup(cliente_holder.reiniciar)
+
+    def test_cliente_reutilizado_entre_chamadas_e_threads(self):
+        from core.sms import _get_client
+        cliente = _get_client()
+        vistos = []
+        threads = [threading.Thread(target=lambda: vistos.append(_get_client())) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertTrue(all(c is cliente for c in vistos))
+        self.assertEqual(cliente.url, cliente.URL_SANDBOX)
+
+    def test_novas_credenciais_criam_novo_cliente(self):
+        from core.sms import _get_client
+        cliente = _get_client()
+        with self.settings(AT_API_KEY='outra'):
+            self.assertIsNot(_get_client(), cliente)
+
+    @override_settings(SMS_TIMEOUT_LIGACAO=1, SMS_TIMEOUT_LEITURA=2)
+    def test_envio_usa_sessao_e_timeouts(self):
+        from core.sms import _get_client
+        cliente = _get_client()
+        resposta = MagicMock()
+        resposta.json.return_value = {'SMSMessageData': {'Recipients': []}}
+
+        with patch.object(cliente.session, 'post', return_value=resposta) as post:
+            cliente.send('Olá', ['+258841234567'], sender_id='ESCOLA')
+
+        args, kwargs = post.call_args
+        self.assertEqual(args[0], cliente.URL_SANDBOX)
+        self.assertEqual(kwargs['timeout'], (1, 2))
+        self.assertEqual(kwargs['data']['to'], '+258841234567')
+        self.assertEqual(kwargs['data']['from'], 'ESCOLA')
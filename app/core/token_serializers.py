@@ -3,16 +3,32 @@ core/token_serializers.py
 =========================
 Serializer JWT customizado.
 
-Adiciona `nome`, `role` e `nome_curto` ao payload do access token,
-evitando um segundo request para obter o perfil após o login.
+Adiciona `nome`, `role`, `nome_curto` e `perfil_id` ao payload do access
+token, evitando um segundo request para obter o perfil após o login.
+O `perfil_id` é também lido por core.authentication, que assim não precisa
+de procurar o perfil do utilizador em cada pedido.
+
+O refresh (CustomTokenRefreshSerializer) volta a ler estes claims do
+utilizador: o simplejwt copiaria para cada novo access token os claims do
+login, e com ROTATE_REFRESH_TOKENS um perfil_id antigo duraria enquanto a
+sessão fosse renovada.
 
 Referenciado em settings.py:
   SIMPLE_JWT = {
       'TOKEN_OBTAIN_SERIALIZER': 'core.token_serializers.CustomTokenObtainPairSerializer',
+      'TOKEN_REFRESH_SERIALIZER': 'core.token_serializers.CustomTokenRefreshSerializer',
   }
+e ligados explicitamente às views em app/urls.py (o simplejwt 4.x ignora essas chaves).
 """
 
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.authentication import perfil_do_utilizador
+from core.models import User
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -22,14 +38,52 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
       - nome_curto → primeiro nome (para UI)
       - role       → cargo/papel no sistema
       - is_staff   → flag de administrador
+      - perfil_id  → pk do perfil do role (Aluno, Motorista, ...) ou None
     """
 
+    @staticmethod
+    def claims_do_utilizador(user) -> dict:
+        perfil = perfil_do_utilizador(user)
+        return {
+            'nome': user.nome,
+            'nome_curto': user.nome_curto,
+            'role': user.role,
+            'is_staff': user.is_staff,
+            'perfil_id': perfil.pk if perfil is not None else None,
+        }
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        token['nome'] = user.nome
-        token['nome_curto'] = user.nome_curto
-        token['role'] = user.role
-        token['is_staff'] = user.is_staff
-
+        for claim, valor in cls.claims_do_utilizador(user).items():
+            token[claim] = valor
         return token
+
+    def validate(self, attrs):
+        """Devolve também os claims no corpo da resposta do login."""
+        data = super().validate(attrs)
+        data.update(self.claims_do_utilizador(self.user))  # perfil já em cache no user
+        return data
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh com os claims do utilizador relidos da base de dados (role,
+    is_staff, perfil_id, ...), em vez dos copiados do token anterior.
+    Contas desactivadas ou apagadas deixam de renovar a sessão.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        user = (
+            User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM), is_active=True)
+            .first()
+        )
+        if user is None:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        for claim, valor in CustomTokenObtainPairSerializer.claims_do_utilizador(user).items():
+            refresh[claim] = valor
+        # O super() valida e roda este token (mesmo jti) e emite o access a partir dele
+        attrs['refresh'] = str(refresh)
+        return super().validate(attrs)
@@ -24,6 +24,7 @@ from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 
+from core.authentication import perfil_do_utilizador
 from core.permissions import (
     IsGestor,
     IsGestorOuEncarregado,
@@ -55,24 +56,6 @@ from core.serializers import (
 )
 
 
-def _perfil_do_user(user):
-    """
-    Devolve o perfil de core associado ao utilizador autenticado.
-    Usado nas actions /me dos ViewSets de perfil.
-    """
-    PERFIL_ATTR = {
-        'ALUNO': 'perfil_aluno',
-        'MOTORISTA': 'perfil_motorista',
-        'MONITOR': 'perfil_monitor',
-        'GESTOR': 'perfil_gestor',
-        'ENCARREGADO': 'perfil_encarregado',
-    }
-    attr = PERFIL_ATTR.get(user.role)
-    if not attr:
-        return None
-    return getattr(user, attr, None)
-
-
 class UserViewSet(
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -226,7 +209,7 @@ class EncarregadoViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
         """Perfil do encarregado autenticado."""
-        perfil = _perfil_do_user(request.user)
+        perfil = perfil_do_utilizador(request.user)
         if not perfil or request.user.role != 'ENCARREGADO':
             return Response(
                 {'erro': 'Perfil de encarregado não encontrado.'},
@@ -286,7 +269,7 @@ class AlunoViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
         """Perfil do aluno autenticado."""
-        perfil = _perfil_do_user(request.user)
+        perfil = perfil_do_utilizador(request.user)
         if not perfil or request.user.role != 'ALUNO':
             return Response(
                 {'erro': 'Perfil de aluno não encontrado.'},
@@ -372,7 +355,7 @@ class MotoristaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
         """Perfil do motorista autenticado."""
-        perfil = _perfil_do_user(request.user)
+        perfil = perfil_do_utilizador(request.user)
         if not perfil or request.user.role != 'MOTORISTA':
             return Response(
                 {'erro': 'Perfil de motorista não encontrado.'},
@@ -444,7 +427,7 @@ class GestorViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
         """Perfil do gestor autenticado."""
-        perfil = _perfil_do_user(request.user)
+        perfil = perfil_do_utilizador(request.user)
         if not perfil or request.user.role != 'GESTOR':
             return Response(
                 {'erro': 'Perfil de gestor não encontrado.'},
@@ -546,7 +529,7 @@ class MonitorViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
         """Perfil do monitor autenticado."""
-        perfil = _perfil_do_user(request.user)
+        perfil = perfil_do_utilizador(request.user)
         if not perfil or request.user.role != 'MONITOR':
             return Response(
                 {'erro': 'Perfil de monitor não encontrado.'},
@@ -5,7 +5,8 @@ Administração Django para o módulo financeiro.
 
 Registos: ConfiguracaoFinanceira, Categoria, Transacao,
           Funcionario, Mensalidade, Recibo, LogNotificacoes,
-          FolhaPagamento, DespesaVeiculo, DespesaGeral, BalancoMensal
+          FolhaPagamento, DespesaVeiculo, DespesaGeral,
+          ResumoFinanceiroMensal, BalancoMensal
 """
 
 from datetime import date
@@ -25,6 +26,7 @@ from financeiro.models import (
     LogNotificacoes,
     Mensalidade,
     Recibo,
+    ResumoFinanceiroMensal,
     Transacao,
 )
 
@@ -402,6 +404,42 @@ class DespesaGeralAdmin(admin.ModelAdmin):
         return super().has_delete_permission(request, obj)
 
 
+@admin.register(ResumoFinanceiroMensal)
+class ResumoFinanceiroMensalAdmin(admin.ModelAdmin):
+    """Agregados materializados — só leitura; recalculáveis por acção."""
+
+    list_display = (
+        'mes_referencia_display',
+        'total_previsto', 'total_recebido', 'total_em_divida',
+        'total_despesas_display', 'actualizado_em',
+    )
+    date_hierarchy = 'mes_referencia'
+
+    def get_readonly_fields(self, request, obj=None):
+        return [f.name for f in self.model._meta.fields]
+
+    @admin.display(description='Mês')
+    def mes_referencia_display(self, obj):
+        return obj.mes_referencia.strftime('%m/%Y')
+
+    @admin.display(description='Total Despesas')
+    def total_despesas_display(self, obj):
+        return f"{obj.total_despesas} MT"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    actions = ['reconstruir_action']
+
+    @admin.action(description='Recalcular o(s) mês(es) seleccionado(s)')
+    def reconstruir_action(self, request, queryset):
+        total = ResumoFinanceiroMensal.reconstruir(queryset.values_list('mes_referencia', flat=True))
+        self.message_user(request, f'{total} resumo(s) recalculado(s).')
+
+
 @admin.register(BalancoMensal)
 class BalancoMensalAdmin(admin.ModelAdmin):
     list_display = (
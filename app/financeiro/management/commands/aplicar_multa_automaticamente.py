@@ -56,21 +56,16 @@ class Command(BaseCommand):
             )
         )
 
-        aplicadas = 0
         for m in a_multar:
             self.stdout.write(
                 f'  {m.aluno.user.nome} — {m.mes_referente.strftime("%m/%Y")} '
                 f'| Saldo: {m.saldo_devedor} MT'
             )
-            if dry_run:
-                aplicadas += 1
-                continue
 
-            Mensalidade.objects.filter(pk=m.pk).update(
-                multa_atraso=config.valor_multa_fixa,
-                estado='ATRASADO',
-            )
-            aplicadas += 1
+        if dry_run:
+            aplicadas = len(a_multar)
+        else:
+            aplicadas = len(Mensalidade.objects.aplicar_multas_em_lote(hoje=hoje))
 
         if dry_run:
             self.stdout.write(
@@ -0,0 +1,68 @@
+"""
+financeiro/management/commands/benchmark_recibos.py
+===================================================
+Mede a velocidade de renderização dos recibos (recibos/segundo).
+
+Compara o renderizador partilhado do processo com a construção de um
+renderizador novo por recibo (o custo que se pagava antes de cachear
+estilos e rodapé). Não toca na base de dados: usa instâncias em memória.
+
+Uso:
+  python manage.py benchmark_recibos
+  python manage.py benchmark_recibos --n 500
+"""
+
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Mede quantos recibos PDF por segundo o renderizador gera.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--n', type=int, default=200,
+                            help='Número de recibos a renderizar (default: 200).')
+
+    def handle(self, *args, **options):
+        from core.models import Aluno, Encarregado, User
+        from financeiro.models import Mensalidade, Recibo
+        from financeiro.pdf_utils import RenderizadorRecibo, obter_renderizador
+
+        n = max(1, options['n'])
+        encarregado = Encarregado(user=User(nome='Encarregado Exemplo', email='enc@exemplo.co.mz'))
+        pares = []
+        for i in range(n):
+            aluno = Aluno(
+                encarregado=encarregado,
+                user=User(nome=f'Aluno {i}', email=f'aluno{i}@exemplo.co.mz'),
+                escola_dest='Escola Primária Central', classe='5',
+            )
+            mensalidade = Mensalidade(
+                aluno=aluno, mes_referente=date(2025, 1, 1),
+                valor_base=Decimal('2500.00'), valor_pago_acumulado=Decimal('2500.00'),
+                data_ultimo_pagamento=timezone.now(), estado='PAGO',
+            )
+            pares.append((mensalidade, Recibo(
+                mensalidade=mensalidade, codigo_recibo=f'REC-2025-{i:04X}',
+                data_emissao=timezone.now(),
+            )))
+
+        obter_renderizador()  # a construção única não entra na medição
+
+        def _medir(renderizar) -> float:
+            inicio = time.perf_counter()
+            for mensalidade, recibo in pares:
+                renderizar(mensalidade, recibo)
+            return n / (time.perf_counter() - inicio)
+
+        cacheado = _medir(obter_renderizador().renderizar)
+        sem_cache = _medir(lambda m, r: RenderizadorRecibo().renderizar(m, r))
+
+        self.stdout.write(f'Recibos renderizados: {n}')
+        self.stdout.write(f'  Renderizador partilhado : {cacheado:8.1f} recibos/s')
+        self.stdout.write(f'  Renderizador por recibo : {sem_cache:8.1f} recibos/s')
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Ganho: {cacheado / sem_cache:.2f}x'))
@@ -51,10 +51,7 @@ class Command(BaseCommand):
         funcionarios = (
             Funcionario.objects
             .filter(ativo=True)
-            .exclude(
-                pagamentos__mes_referente__month=mes,
-                pagamentos__mes_referente__year=ano,
-            )
+            .exclude(pk__in=FolhaPagamento.objects.do_mes(mes, ano).values('funcionario_id'))
             .select_related('user')
         )
 
@@ -17,6 +17,8 @@ class Command(BaseCommand):
                             help='Mês a gerar (default: mês actual).')
         parser.add_argument('--ano', type=int, default=None,
                             help='Ano a gerar (default: ano actual).')
+        parser.add_argument('--lote', type=int, default=None,
+                            help='Mensalidades por INSERT (default: 500).')
         parser.add_argument('--dry-run', action='store_true',
                             help='Mostra quantas seriam geradas sem criar nada.')
 
@@ -35,8 +37,7 @@ class Command(BaseCommand):
 
         # Conta quantos alunos activos ainda não têm mensalidade para este mês
         alunos_sem_mensalidade = Aluno.objects.filter(ativo=True).exclude(
-            historico_mensalidades__mes_referente__month=mes,
-            historico_mensalidades__mes_referente__year=ano,
+            pk__in=Mensalidade.objects.do_mes(mes, ano).values('aluno_id'),
         )
         total_a_gerar = alunos_sem_mensalidade.count()
 
@@ -64,7 +65,14 @@ class Command(BaseCommand):
             )
             return
 
-        total_criadas = Mensalidade.objects.gerar_mensalidades_mes(mes, ano)
+        def _progresso(indice, criadas, segundos):
+            self.stdout.write(f'  Lote {indice}: {criadas} mensalidade(s) em {segundos:.3f}s')
+
+        total_criadas = Mensalidade.objects.gerar_mensalidades_mes(
+            mes, ano,
+            tamanho_lote=options['lote'],
+            ao_concluir_lote=_progresso,
+        )
 
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,61 @@
+"""
+financeiro/management/commands/gerar_recibos_pendentes.py
+=========================================================
+Gera os PDFs dos recibos reservados que ainda não têm ficheiro.
+
+Normalmente cada pagamento agenda o seu próprio PDF; este comando
+recupera os que ficaram para trás (worker em baixo, broker indisponível)
+e, no início do mês, despacha-os em lotes para gerar_pdfs_recibos_lote.
+
+Uso:
+  python manage.py gerar_recibos_pendentes
+  python manage.py gerar_recibos_pendentes --lote 100
+  python manage.py gerar_recibos_pendentes --sincrono
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+
+class Command(BaseCommand):
+    help = 'Gera os PDFs dos recibos que ainda não têm ficheiro.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50,
+                            help='Recibos por task (default: 50).')
+        parser.add_argument('--sincrono', action='store_true',
+                            help='Gera no próprio processo em vez de usar o Celery.')
+
+    def handle(self, *args, **options):
+        from financeiro.models import Recibo
+        from financeiro.tasks import gerar_pdfs_recibos_lote
+
+        tamanho = max(1, options['lote'])
+        ids = list(
+            Recibo.objects
+            .filter(Q(arquivo='') | Q(arquivo__isnull=True))
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+        if not ids:
+            self.stdout.write(self.style.SUCCESS('Nenhum recibo pendente.'))
+            return
+
+        lotes = [ids[i:i + tamanho] for i in range(0, len(ids), tamanho)]
+        self.stdout.write(
+            self.style.WARNING(f'\n● {len(ids)} recibo(s) pendente(s) em {len(lotes)} lote(s).')
+        )
+
+        if options['sincrono']:
+            gerados = 0
+            for indice, lote in enumerate(lotes, start=1):
+                resultado = gerar_pdfs_recibos_lote(lote)
+                gerados += resultado['gerados']
+                self.stdout.write(f'  Lote {indice}: {resultado["gerados"]} gerado(s)')
+            self.stdout.write(self.style.SUCCESS(f'\n✓ {gerados} recibo(s) gerado(s).'))
+            return
+
+        for lote in lotes:
+            gerar_pdfs_recibos_lote.delay(lote)
+        self.stdout.write(self.style.SUCCESS(f'\n✓ {len(lotes)} lote(s) enviado(s) para o Celery.'))
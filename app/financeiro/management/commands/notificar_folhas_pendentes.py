@@ -37,11 +37,8 @@ class Command(BaseCommand):
 
         pendentes = (
             FolhaPagamento.objects
-            .filter(
-                status='PENDENTE',
-                mes_referente__month=mes,
-                mes_referente__year=ano,
-            )
+            .do_mes(mes, ano)
+            .filter(status='PENDENTE')
             .select_related('funcionario__user')
             .order_by('funcionario__user__nome')
         )
@@ -37,11 +37,8 @@ class Command(BaseCommand):
         # Mensalidades do mês corrente ainda não pagas
         pendentes = (
             Mensalidade.objects
-            .filter(
-                mes_referente__month=hoje.month,
-                mes_referente__year=hoje.year,
-                estado__in=('PENDENTE', 'PAGO_PARCIAL'),
-            )
+            .do_mes(hoje.month, hoje.year)
+            .filter(estado__in=('PENDENTE', 'PAGO_PARCIAL'))
             .select_related('aluno__user', 'aluno__encarregado__user')
         )
 
@@ -0,0 +1,45 @@
+"""
+financeiro/management/commands/reconstruir_resumos_mensais.py
+=============================================================
+Recalcula a tabela ResumoFinanceiroMensal a partir dos livros
+(mensalidades, despesas gerais, despesas da frota e folhas).
+
+Os resumos são mantidos pelos signals a cada escrita; este comando
+corrige desvios causados por alterações feitas fora do ORM ou com
+QuerySet.update(), e preenche a tabela depois da migração.
+
+Uso:
+  python manage.py reconstruir_resumos_mensais
+  python manage.py reconstruir_resumos_mensais --mes 4 --ano 2025
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os agregados financeiros mensais a partir dos livros.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', type=int, default=None,
+                            help='Mês a recalcular (default: todos os meses com movimento).')
+        parser.add_argument('--ano', type=int, default=None,
+                            help='Ano do mês a recalcular (default: ano actual).')
+
+    def handle(self, *args, **options):
+        from financeiro.models import ResumoFinanceiroMensal
+
+        mes = options['mes']
+        ano = options['ano'] or date.today().year
+
+        if mes is not None and not (1 <= mes <= 12):
+            self.stdout.write(self.style.ERROR('Mês inválido. Use 1-12.'))
+            return
+
+        meses = [date(ano, mes, 1)] if mes else None
+        total = ResumoFinanceiroMensal.reconstruir(meses)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {total} resumo(s) mensal(is) recalculado(s).')
+        )
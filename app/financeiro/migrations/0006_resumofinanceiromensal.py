@@ -0,0 +1,41 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0005_auto_20260325_0312'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoFinanceiroMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes_referencia', models.DateField(help_text='Primeiro dia do mês', unique=True)),
+                ('actualizado_em', models.DateTimeField(auto_now=True)),
+                ('total_previsto', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_recebido', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_pago_integral', models.DecimalField(decimal_places=2, default=0, help_text='Valor recebido das mensalidades totalmente pagas', max_digits=12)),
+                ('total_multas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_descontos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_em_divida', models.DecimalField(decimal_places=2, default=0, help_text='Saldo devedor das mensalidades não pagas nem isentas', max_digits=12)),
+                ('total_por_receber', models.DecimalField(decimal_places=2, default=0, help_text='Valor base das mensalidades ainda não pagas', max_digits=12)),
+                ('qtd_pagas', models.PositiveIntegerField(default=0)),
+                ('qtd_pendentes', models.PositiveIntegerField(default=0)),
+                ('qtd_atrasadas', models.PositiveIntegerField(default=0)),
+                ('qtd_isentas', models.PositiveIntegerField(default=0)),
+                ('qtd_parciais', models.PositiveIntegerField(default=0)),
+                ('total_despesas_gerais', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_despesas_frota', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_folha_salarial', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Resumo Financeiro Mensal',
+                'verbose_name_plural': 'Resumos Financeiros Mensais',
+                'ordering': ['-mes_referencia'],
+            },
+        ),
+    ]
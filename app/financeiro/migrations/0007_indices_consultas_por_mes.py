@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0006_resumofinanceiromensal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='despesageral',
+            index=models.Index(fields=['pago', 'data_vencimento'], name='idx_despesa_geral_pago_venc'),
+        ),
+        migrations.AddIndex(
+            model_name='despesaveiculo',
+            index=models.Index(fields=['data'], name='idx_despesa_veiculo_data'),
+        ),
+        migrations.AddIndex(
+            model_name='folhapagamento',
+            index=models.Index(fields=['status', 'mes_referente'], name='idx_folha_status_mes'),
+        ),
+        migrations.AddIndex(
+            model_name='mensalidade',
+            index=models.Index(fields=['estado', 'mes_referente'], name='idx_mensalidade_estado_mes'),
+        ),
+        migrations.AddIndex(
+            model_name='mensalidade',
+            index=models.Index(fields=['aluno', 'estado'], name='idx_mensalidade_aluno_estado'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['status', 'data_pagamento'], name='idx_transacao_status_pag'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0007_indices_consultas_por_mes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensalidade',
+            index=models.Index(fields=['-mes_referente', '-id'], name='idx_mensalidade_mes_id'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['-data_vencimento', '-id'], name='idx_transacao_venc_id'),
+        ),
+    ]
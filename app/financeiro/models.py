@@ -5,7 +5,8 @@ Sistema de Transporte Escolar — Módulo Financeiro
 
 Modelos: ConfiguracaoFinanceira, Categoria, Transacao,
          Funcionario, Mensalidade, Recibo, LogNotificacoes,
-         FolhaPagamento, DespesaVeiculo, DespesaGeral, BalancoMensal
+         FolhaPagamento, DespesaVeiculo, DespesaGeral,
+         ResumoFinanceiroMensal, BalancoMensal
 
 REGRA DE DEPENDÊNCIAS:
   financeiro → core
@@ -17,18 +18,71 @@ mas nunca é importado por eles.
 """
 
 import calendar
+import copy
+import logging
+import time
 import uuid
 from datetime import date
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.core.validators import MinValueValidator
 from django.db import models, transaction
-from django.db.models import Count, F, Sum
+from django.db.models import Case, Count, F, Q, Sum, Value, When
 from django.utils import timezone
 
+logger = logging.getLogger(__name__)
+
+
+# ──────────────────────────────────────────────
+# CONSULTAS POR MÊS
+# ──────────────────────────────────────────────
+
+def intervalo_mes(mes: int, ano: int):
+    """
+    Devolve (inicio, fim) do mês — intervalo semiaberto [dia 1, dia 1 do
+    mês seguinte). Filtrar com __gte/__lt usa o índice btree da coluna;
+    __month/__year viram EXTRACT(...) e obrigam a um scan.
+    """
+    inicio = date(ano, mes, 1)
+    if mes == 12:
+        return inicio, date(ano + 1, 1, 1)
+    return inicio, date(ano, mes + 1, 1)
+
+
+class PorMesQuerySet(models.QuerySet):
+    """QuerySet com filtro mensal por intervalo sobre `campo_mes`."""
+
+    campo_mes = None
+
+    def do_mes(self, mes: int, ano: int, campo: str = None):
+        inicio, fim = intervalo_mes(mes, ano)
+        campo = campo or self.campo_mes
+        return self.filter(**{f'{campo}__gte': inicio, f'{campo}__lt': fim})
+
+
+class TransacaoQuerySet(PorMesQuerySet):
+    campo_mes = 'data_vencimento'
+
+
+class MensalidadeQuerySet(PorMesQuerySet):
+    campo_mes = 'mes_referente'
+
+
+class FolhaPagamentoQuerySet(PorMesQuerySet):
+    campo_mes = 'mes_referente'
+
+
+class DespesaVeiculoQuerySet(PorMesQuerySet):
+    campo_mes = 'data'
+
+
+class DespesaGeralQuerySet(PorMesQuerySet):
+    campo_mes = 'data_vencimento'
+
 
 # ──────────────────────────────────────────────
 # CONFIGURAÇÃO FINANCEIRA  (singleton)
@@ -80,12 +134,67 @@ class ConfiguracaoFinanceira(models.Model):
         """Impede a eliminação da configuração global."""
         pass
 
+    # ------------------------------------------------------------------
+    # Cache do singleton
+    # ------------------------------------------------------------------
+    # Cópia local por processo + carimbo de versão no Redis. O save()
+    # (signal em financeiro/signals.py) limpa a cópia local e incrementa a
+    # versão, o que invalida as cópias dos restantes workers. A versão só é
+    # relida do Redis a cada CACHE_INTERVALO segundos — loops e signals
+    # leem a configuração sem tocar na BD nem no Redis.
+    #
+    # Dentro de uma transacção a linha lida pode ainda não estar gravada
+    # (um save() no mesmo bloco): se o bloco for revertido, o incremento
+    # da versão, agendado para o commit, nunca corre. Por isso a cópia
+    # local só é preenchida fora de transacções.
+
+    CACHE_VERSAO_KEY = 'financeiro:configuracao:versao'
+    CACHE_INTERVALO = 5
+    _cache_local = {'obj': None, 'versao': None, 'verificado_em': 0.0}
+
     @classmethod
     def get_solo(cls):
-        """Obtém (ou cria) a configuração única."""
+        """Obtém (ou cria) a configuração única, servida pela cache local."""
+        local = cls._cache_local
+        agora = time.monotonic()
+
+        if local['obj'] is not None and agora - local['verificado_em'] < cls.CACHE_INTERVALO:
+            return copy.copy(local['obj'])
+
+        versao = cls._versao_cache()
+        if local['obj'] is not None and versao is not None and versao == local['versao']:
+            local['verificado_em'] = agora
+            return copy.copy(local['obj'])
+
         obj, _ = cls.objects.get_or_create(pk=1)
+        if versao is not None and not transaction.get_connection().in_atomic_block:
+            local.update(obj=copy.copy(obj), versao=versao, verificado_em=agora)
         return obj
 
+    @classmethod
+    def _versao_cache(cls):
+        """Versão actual no Redis, ou None se a cache estiver indisponível."""
+        try:
+            return cache.get_or_set(cls.CACHE_VERSAO_KEY, 1, timeout=None)
+        except Exception as exc:
+            logger.warning('Cache indisponível ao ler a versão da configuração: %s', exc)
+            return None
+
+    @classmethod
+    def limpar_cache_local(cls):
+        cls._cache_local.update(obj=None, versao=None, verificado_em=0.0)
+
+    @classmethod
+    def invalidar_cache(cls):
+        """Limpa a cópia local e incrementa a versão partilhada no Redis."""
+        cls.limpar_cache_local()
+        try:
+            cache.incr(cls.CACHE_VERSAO_KEY)
+        except ValueError:
+            cache.set(cls.CACHE_VERSAO_KEY, 1, timeout=None)
+        except Exception as exc:
+            logger.warning('Cache indisponível ao invalidar a configuração: %s', exc)
+
     def data_limite_para_mes(self, mes_referente: date) -> date:
         """Data limite de pagamento para um dado mês, respeitando o último dia."""
         ultimo_dia = calendar.monthrange(mes_referente.year, mes_referente.month)[1]
@@ -166,10 +275,17 @@ class Transacao(models.Model):
     # Referência opcional a qualquer objeto externo (FolhaPagamento.pk, etc.)
     referencia_externa_id = models.PositiveBigIntegerField(null=True, blank=True)
 
+    objects = TransacaoQuerySet.as_manager()
+
     class Meta:
         verbose_name        = 'Transação'
         verbose_name_plural = 'Transações'
         ordering            = ['-data_vencimento']
+        indexes             = [
+            models.Index(fields=['status', 'data_pagamento'], name='idx_transacao_status_pag'),
+            # Paginação por cursor (core.pagination.TransacaoPagination)
+            models.Index(fields=['-data_vencimento', '-id'], name='idx_transacao_venc_id'),
+        ]
 
     def clean(self):
         if self.pk:
@@ -357,60 +473,165 @@ class Funcionario(models.Model):
 # MENSALIDADE MANAGER
 # ──────────────────────────────────────────────
 
-class MensalidadeManager(models.Manager):
+class MensalidadeManager(models.Manager.from_queryset(MensalidadeQuerySet)):
 
     def total_devedor_mes(self, mes: int, ano: int) -> Decimal:
-        resultado = (
-            self.filter(mes_referente__month=mes, mes_referente__year=ano)
-            .exclude(estado__in=['PAGO', 'ISENTO'])
-            .aggregate(
-                total_pendente=Sum(
-                    F('valor_base') + F('multa_atraso') - F('desconto') - F('valor_pago_acumulado'),
-                    output_field=models.DecimalField()
-                )
-            )
-        )
-        return resultado['total_pendente'] or Decimal('0.00')
-
-    def resumo_estatistico(self, mes: int, ano: int):
-        return (
-            self.filter(mes_referente__month=mes, mes_referente__year=ano)
-            .values('estado')
-            .annotate(qtd=Count('id'))
-        )
-
-    def gerar_mensalidades_mes(self, mes: int, ano: int) -> int:
+        return ResumoFinanceiroMensal.obter(mes, ano).total_em_divida
+
+    def resumo_estatistico(self, mes: int, ano: int) -> list:
+        """Contagem por estado, lida do ResumoFinanceiroMensal."""
+        resumo = ResumoFinanceiroMensal.obter(mes, ano)
+        contagens = [
+            ('PAGO', resumo.qtd_pagas),
+            ('PENDENTE', resumo.qtd_pendentes),
+            ('ATRASADO', resumo.qtd_atrasadas),
+            ('ISENTO', resumo.qtd_isentas),
+            ('PAGO_PARCIAL', resumo.qtd_parciais),
+        ]
+        return [{'estado': estado, 'qtd': qtd} for estado, qtd in contagens if qtd]
+
+    # Nº de mensalidades inseridas por INSERT no gerar_mensalidades_mes
+    TAMANHO_LOTE = 500
+
+    def gerar_mensalidades_mes(self, mes: int, ano: int, tamanho_lote: int = None,
+                               ao_concluir_lote=None) -> int:
         """
         Gera mensalidades para todos os alunos activos sem registo
         para o mês/ano especificado.
 
-        CORRECÇÃO: substituído bulk_create por create() individual.
-        O bulk_create bypassa o save() do modelo, impedindo a geração
-        automática do nr_fatura (campo unique obrigatório para auditoria).
-        O custo de performance é negligenciável para o volume típico
-        de alunos de uma escola.
+        Motor set-based:
+          - uma query para ler (id, mensalidade) dos alunos sem registo
+          - nr_fatura pré-calculado em Python (Mensalidade.gerar_nr_fatura),
+            o mesmo formato usado pelo save() — o bulk_create deixa de
+            produzir mensalidades sem fatura
+          - INSERTs em lotes de `tamanho_lote` dentro de uma única transacção
+
+        Signals: o bulk_create não dispara pre_save/post_save. Para registos
+        novos os receivers de estado/multa/recibo não têm efeito (todos saem
+        cedo quando não há pk ou quando created=True); são repostos o log —
+        uma linha por lote, com o tempo gasto — e o ResumoFinanceiroMensal,
+        recalculado uma vez depois do commit.
+
+        Unicidade: unique_together (aluno, mes_referente) e nr_fatura unique
+        continuam garantidos pela BD; um conflito aborta a transacção toda.
+
+        `ao_concluir_lote(indice, criadas, segundos)` é chamado após cada lote
+        (usado pelo management command para mostrar o progresso).
         """
         from core.models import Aluno
 
-        alunos_sem_mensalidade = Aluno.objects.filter(ativo=True).exclude(
-            historico_mensalidades__mes_referente__month=mes,
-            historico_mensalidades__mes_referente__year=ano,
-        )
+        tamanho_lote = tamanho_lote or self.TAMANHO_LOTE
         data_ref = date(ano, mes, 1)
-        criadas  = 0
 
+        alunos = (
+            Aluno.objects.filter(ativo=True)
+            .exclude(pk__in=self.do_mes(mes, ano).values('aluno_id'))
+            .order_by('pk')
+            .values_list('pk', 'mensalidade')
+        )
+
+        faturas = set()
+        novas = []
+        for aluno_id, valor in alunos:
+            nr_fatura = self.model.gerar_nr_fatura(data_ref, aluno_id)
+            while nr_fatura in faturas:
+                nr_fatura = self.model.gerar_nr_fatura(data_ref, aluno_id)
+            faturas.add(nr_fatura)
+            novas.append(self.model(
+                aluno_id=aluno_id,
+                mes_referente=data_ref,
+                valor_base=valor,
+                estado='PENDENTE',
+                nr_fatura=nr_fatura,
+            ))
+
+        criadas = 0
         with transaction.atomic():
-            for aluno in alunos_sem_mensalidade:
-                self.create(
-                    aluno=aluno,
-                    mes_referente=data_ref,
-                    valor_base=aluno.mensalidade,
-                    estado='PENDENTE',
+            for indice, inicio in enumerate(range(0, len(novas), tamanho_lote), start=1):
+                lote = novas[inicio:inicio + tamanho_lote]
+                t0 = time.perf_counter()
+                self.bulk_create(lote)
+                segundos = time.perf_counter() - t0
+                criadas += len(lote)
+
+                logger.info(
+                    'Mensalidades %02d/%d — lote %d: %d criada(s) em %.3fs.',
+                    mes, ano, indice, len(lote), segundos,
                 )
-                criadas += 1
+                if ao_concluir_lote:
+                    ao_concluir_lote(indice, len(lote), segundos)
+
+            if criadas:
+                ResumoFinanceiroMensal.agendar_actualizacao(data_ref, 'mensalidades')
 
         return criadas
 
+    def aplicar_multas_em_lote(self, mes: int = None, ano: int = None, hoje: date = None) -> list:
+        """
+        Aplica a multa fixa a todas as mensalidades vencidas sem multa e
+        devolve a lista de ids afectados (para notificações em massa).
+
+        Motor set-based — equivalente a verificar_e_aplicar_multa() linha a
+        linha, mas com O(nº de meses) queries em vez de O(nº de linhas):
+          - ConfiguracaoFinanceira lida uma única vez
+          - data limite calculada uma vez por mes_referente
+          - por cada mês vencido: SELECT ... FOR UPDATE dos ids e um único
+            UPDATE condicional (multa + estado)
+
+        O estado final segue atualizar_estado(): PAGO_PARCIAL se já houve
+        pagamentos, ATRASADO caso contrário. O UPDATE não dispara signals —
+        depois de a multa estar aplicada só o ResumoFinanceiroMensal precisa
+        de ser actualizado, uma vez por mês e depois do commit.
+
+        `mes`/`ano` restringem a um único mês de referência.
+        """
+        config = ConfiguracaoFinanceira.get_solo()
+        hoje = hoje or date.today()
+
+        candidatas = (
+            self.filter(multa_atraso=0)
+            .exclude(estado__in=['PAGO', 'ISENTO'])
+            # saldo_devedor > 0 com multa a zero
+            .filter(valor_base__gt=F('desconto') + F('valor_pago_acumulado'))
+        )
+        if mes and ano:
+            candidatas = candidatas.do_mes(mes, ano)
+
+        meses = (
+            candidatas.order_by('mes_referente')
+            .values_list('mes_referente', flat=True)
+            .distinct()
+        )
+
+        afectadas = []
+        with transaction.atomic():
+            for mes_referente in meses:
+                if hoje <= config.data_limite_para_mes(mes_referente):
+                    continue
+
+                lote = candidatas.filter(mes_referente=mes_referente)
+                ids = list(lote.select_for_update().values_list('pk', flat=True))
+                if not ids:
+                    continue
+
+                self.filter(pk__in=ids).update(
+                    multa_atraso=config.valor_multa_fixa,
+                    estado=Case(
+                        When(valor_pago_acumulado__gt=0, then=Value('PAGO_PARCIAL')),
+                        default=Value('ATRASADO'),
+                        output_field=models.CharField(),
+                    ),
+                )
+                afectadas.extend(ids)
+                ResumoFinanceiroMensal.agendar_actualizacao(mes_referente, 'mensalidades')
+
+                logger.info(
+                    'Multas %s: %d aplicada(s) de %s MT.',
+                    mes_referente.strftime('%m/%Y'), len(ids), config.valor_multa_fixa,
+                )
+
+        return afectadas
+
     def aluno_tem_acesso_bloqueado(self, aluno) -> bool:
         """
         Verifica se o aluno tem 3 ou mais mensalidades em atraso.
@@ -472,6 +693,12 @@ class Mensalidade(models.Model):
         verbose_name = "Mensalidade"
         verbose_name_plural = "Mensalidades"
         ordering = ['-mes_referente']
+        indexes = [
+            models.Index(fields=['estado', 'mes_referente'], name='idx_mensalidade_estado_mes'),
+            models.Index(fields=['aluno', 'estado'], name='idx_mensalidade_aluno_estado'),
+            # Paginação por cursor (core.pagination.MensalidadePagination)
+            models.Index(fields=['-mes_referente', '-id'], name='idx_mensalidade_mes_id'),
+        ]
 
     # ------------------------------------------------------------------
     # Properties
@@ -518,6 +745,7 @@ class Mensalidade(models.Model):
 
         with transaction.atomic():
             obj = Mensalidade.objects.select_for_update().get(pk=self.pk)
+            estado_anterior = obj.estado
             obj.valor_pago_acumulado += valor_dec
             obj.data_ultimo_pagamento = timezone.now()
             obj.atualizar_estado()
@@ -536,25 +764,27 @@ class Mensalidade(models.Model):
                 aluno=obj.aluno,
             )
 
-            if obj.estado == 'PAGO' and not Recibo.objects.filter(mensalidade=obj).exists():
-                recibo = obj._gerar_recibo_automatico()
-                # Disparar tasks assíncronas após criação do recibo
-                if recibo:
-                    try:
-                        from financeiro.tasks import (
-                            enviar_notificacao_pagamento,
-                            gerar_pdf_recibo_task,
-                            invalidar_cache_dashboard,
-                        )
-                        # Gerar PDF em background (não bloqueia o request)
-                        gerar_pdf_recibo_task.delay(recibo.pk)
-                        # Notificar encarregado
-                        enviar_notificacao_pagamento.delay(obj.pk)
-                        # Invalidar cache do dashboard
-                        invalidar_cache_dashboard.delay()
-                    except Exception:
-                        # Se Celery não estiver disponível, continua sem erro
-                        pass
+            if obj.estado == 'PAGO' and estado_anterior != 'PAGO':
+                # O signal emitir_recibo_ao_pagar normalmente já reservou o
+                # recibo no save() acima; aqui é só a rede de segurança.
+                obj._gerar_recibo_automatico()
+                # Só depois do commit — o lock da mensalidade não espera
+                # pelo Celery nem por SMS.
+                transaction.on_commit(obj._disparar_tasks_pagamento)
+
+    def _disparar_tasks_pagamento(self):
+        try:
+            from financeiro.tasks import (
+                enviar_notificacao_pagamento,
+                invalidar_cache_dashboard,
+            )
+            # Notificar encarregado
+            enviar_notificacao_pagamento.delay(self.pk)
+            # Invalidar cache do dashboard
+            invalidar_cache_dashboard.delay()
+        except Exception:
+            # Se Celery não estiver disponível, continua sem erro
+            pass
 
     # ------------------------------------------------------------------
     # Multas
@@ -580,34 +810,19 @@ class Mensalidade(models.Model):
     # ------------------------------------------------------------------
 
     def _gerar_recibo_automatico(self) -> 'Recibo | None':
+        """
+        Reserva o Recibo (linha + código) e agenda o PDF para depois do commit.
+
+        Não renderiza nada aqui: corre dentro do select_for_update de
+        registrar_pagamento e o PDF é gerado uma única vez, no Celery
+        (gerar_pdf_recibo_task). Devolve None se o recibo já existir.
+        """
         if Recibo.objects.filter(mensalidade=self).exists():
             return None
 
         recibo = Recibo(mensalidade=self)
-        recibo.save()  # gera codigo_recibo primeiro
-
-        try:
-            from financeiro.pdf_utils import gerar_pdf_recibo
-            pdf_bytes = gerar_pdf_recibo(self, recibo)
-            nome = f"recibo_{self.aluno.id}_{self.mes_referente.strftime('%Y%m')}.pdf"
-            recibo.arquivo.save(nome, ContentFile(pdf_bytes), save=True)
-        except Exception as exc:
-            # Se o reportlab falhar, guarda fallback em texto
-            import logging
-            logging.getLogger(__name__).error(
-                'Erro ao gerar PDF do recibo %s: %s', recibo.codigo_recibo, exc
-            )
-            conteudo = (
-                f"RECIBO DE PAGAMENTO\n"
-                f"Codigo : {recibo.codigo_recibo}\n"
-                f"Aluno : {self.aluno.user.nome}\n"
-                f"Mes : {self.mes_referente.strftime('%m/%Y')}\n"
-                f"Valor : {self.valor_pago_acumulado} MT\n"
-                f"Data : {date.today().strftime('%d/%m/%Y')}\n"
-            )
-            nome = f"recibo_{self.aluno.id}_{self.mes_referente.strftime('%Y%m')}.txt"
-            recibo.arquivo.save(nome, ContentFile(conteudo.encode('utf-8')), save=True)
-
+        recibo.save()  # gera codigo_recibo
+        transaction.on_commit(recibo.agendar_arquivo)
         return recibo
 
     # ------------------------------------------------------------------
@@ -618,15 +833,20 @@ class Mensalidade(models.Model):
         cat, _ = Categoria.objects.get_or_create(nome='Mensalidade', tipo='RECEITA')
         return cat
 
+    @staticmethod
+    def gerar_nr_fatura(mes_referente: date, aluno_id: int) -> str:
+        """Formato: FAT-YYYYMM-{aluno_id}-{hex6}."""
+        return (
+            f"FAT-{mes_referente.strftime('%Y%m')}"
+            f"-{aluno_id}"
+            f"-{uuid.uuid4().hex[:6].upper()}"
+        )
+
     def save(self, *args, **kwargs):
         if self.mes_referente:
             self.mes_referente = self.mes_referente.replace(day=1)
         if not self.nr_fatura:
-            self.nr_fatura = (
-                f"FAT-{self.mes_referente.strftime('%Y%m')}"
-                f"-{self.aluno_id}"
-                f"-{uuid.uuid4().hex[:6].upper()}"
-            )
+            self.nr_fatura = self.gerar_nr_fatura(self.mes_referente, self.aluno_id)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -681,6 +901,47 @@ class Recibo(models.Model):
                     break
         super().save(*args, **kwargs)
 
+    @property
+    def nome_arquivo(self) -> str:
+        m = self.mensalidade
+        return f"recibo_{m.aluno_id}_{m.mes_referente.strftime('%Y%m')}"
+
+    def agendar_arquivo(self):
+        """Envia a geração do ficheiro para o Celery (sem falhar o pedido)."""
+        try:
+            from financeiro.tasks import gerar_pdf_recibo_task
+            gerar_pdf_recibo_task.delay(self.pk)
+        except Exception as exc:
+            logger.error('Não foi possível agendar o PDF do recibo %s: %s', self.codigo_recibo, exc)
+
+    def gerar_arquivo(self) -> str:
+        """
+        Renderiza o PDF e guarda-o em `arquivo`. Idempotente: se o ficheiro
+        já existir não volta a renderizar.
+        """
+        if self.arquivo:
+            return self.arquivo.name
+
+        mensalidade = self.mensalidade
+        try:
+            from financeiro.pdf_utils import gerar_pdf_recibo
+            pdf_bytes = gerar_pdf_recibo(mensalidade, self)
+            self.arquivo.save(f'{self.nome_arquivo}.pdf', ContentFile(pdf_bytes), save=True)
+        except Exception as exc:
+            # Se o reportlab falhar, guarda fallback em texto
+            logger.error('Erro ao gerar PDF do recibo %s: %s', self.codigo_recibo, exc)
+            conteudo = (
+                f"RECIBO DE PAGAMENTO\n"
+                f"Codigo : {self.codigo_recibo}\n"
+                f"Aluno : {mensalidade.aluno.user.nome}\n"
+                f"Mes : {mensalidade.mes_referente.strftime('%m/%Y')}\n"
+                f"Valor : {mensalidade.valor_pago_acumulado} MT\n"
+                f"Data : {date.today().strftime('%d/%m/%Y')}\n"
+            )
+            self.arquivo.save(f'{self.nome_arquivo}.txt', ContentFile(conteudo.encode('utf-8')), save=True)
+
+        return self.arquivo.name
+
     def __str__(self):
         return f"Recibo {self.codigo_recibo} — {self.mensalidade.aluno.user.nome}"
 
@@ -713,10 +974,15 @@ class FolhaPagamento(models.Model):
         null=True, blank=True,
     )
 
+    objects = FolhaPagamentoQuerySet.as_manager()
+
     class Meta:
         unique_together = ('funcionario', 'mes_referente')
         verbose_name = "Folha de Pagamento"
         verbose_name_plural = "Folhas de Pagamento"
+        indexes = [
+            models.Index(fields=['status', 'mes_referente'], name='idx_folha_status_mes'),
+        ]
 
     def confirmar_pagamento(self, metodo: str = 'TRANSFERENCIA'):
         """Gera a transação de despesa e marca como pago."""
@@ -793,10 +1059,15 @@ class DespesaVeiculo(models.Model):
         related_name='despesa_veiculo',
     )
 
+    objects = DespesaVeiculoQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Despesa de Veículo"
         verbose_name_plural = "Despesas de Veículos"
         ordering = ['-data']
+        indexes = [
+            models.Index(fields=['data'], name='idx_despesa_veiculo_data'),
+        ]
 
     def clean(self):
         if self.pk:
@@ -854,10 +1125,15 @@ class DespesaGeral(models.Model):
         related_name='despesa_geral',
     )
 
+    objects = DespesaGeralQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Despesa Geral"
         verbose_name_plural = "Despesas Gerais"
         ordering = ['-data_vencimento']
+        indexes = [
+            models.Index(fields=['pago', 'data_vencimento'], name='idx_despesa_geral_pago_venc'),
+        ]
 
     def registrar_pagamento(self, metodo: str = 'DINHEIRO'):
         if self.pago:
@@ -896,6 +1172,206 @@ class DespesaGeral(models.Model):
         return f"{self.descricao} — {self.valor} MT ({estado})"
 
 
+# ──────────────────────────────────────────────
+# RESUMO FINANCEIRO MENSAL  (agregados materializados)
+# ──────────────────────────────────────────────
+
+class ResumoFinanceiroMensal(models.Model):
+    """
+    Totais financeiros de um mês, mantidos a cada escrita nos livros.
+
+    Uma linha por mês, dividida em quatro secções (mensalidades, despesas
+    gerais, despesas da frota e folha salarial). Cada escrita agenda o
+    recálculo da secção e do mês afectados para depois do commit
+    (agendar_actualizacao): um SUM sobre o intervalo
+    [dia 1, dia 1 do mês seguinte), que usa os índices.
+
+    O recálculo corre fora da transacção de quem escreveu, numa transacção
+    curta com a linha bloqueada (SELECT ... FOR UPDATE) — dois pagamentos
+    concorrentes no mesmo mês não esperam um pelo outro, e como cada
+    recálculo só começa depois do seu commit nenhum perde actualizações.
+    O recálculo é idempotente: várias escritas no mesmo mês repetem-no,
+    sem mudar o resultado. Até ao commit, os leitores vêem os totais
+    anteriores.
+
+    Quem actualiza:
+      - signals post_save/post_delete de Mensalidade, DespesaGeral,
+        DespesaVeiculo e FolhaPagamento (financeiro/signals.py)
+      - caminhos em lote que não disparam signals
+        (gerar_mensalidades_mes, aplicar_multas_em_lote)
+
+    Leitores (dashboard, gerar_balanco, resumo_financeiro_mes,
+    total_devedor_mes) usam ResumoFinanceiroMensal.obter(mes, ano).
+    Alterações feitas com QuerySet.update() noutros sítios não são
+    vistas — `manage.py reconstruir_resumos_mensais` recalcula tudo.
+    """
+
+    SECOES = ('mensalidades', 'despesas_gerais', 'despesas_frota', 'folha')
+
+    mes_referencia = models.DateField(unique=True, help_text="Primeiro dia do mês")
+    actualizado_em = models.DateTimeField(auto_now=True)
+
+    # Mensalidades
+    total_previsto = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_recebido = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_pago_integral = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Valor recebido das mensalidades totalmente pagas",
+    )
+    total_multas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_descontos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_em_divida = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Saldo devedor das mensalidades não pagas nem isentas",
+    )
+    total_por_receber = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Valor base das mensalidades ainda não pagas",
+    )
+    qtd_pagas = models.PositiveIntegerField(default=0)
+    qtd_pendentes = models.PositiveIntegerField(default=0)
+    qtd_atrasadas = models.PositiveIntegerField(default=0)
+    qtd_isentas = models.PositiveIntegerField(default=0)
+    qtd_parciais = models.PositiveIntegerField(default=0)
+
+    # Despesas
+    total_despesas_gerais = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_despesas_frota = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_folha_salarial = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Resumo Financeiro Mensal"
+        verbose_name_plural = "Resumos Financeiros Mensais"
+        ordering = ['-mes_referencia']
+
+    # ------------------------------------------------------------------
+    # Cálculo
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _calcular_secao(cls, secao: str, mes: int, ano: int) -> dict:
+        zero = Decimal('0.00')
+
+        if secao == 'mensalidades':
+            nao_pagas = ~Q(estado__in=['PAGO', 'ISENTO'])
+            r = Mensalidade.objects.do_mes(mes, ano).aggregate(
+                total_previsto=Sum('valor_base'),
+                total_recebido=Sum('valor_pago_acumulado'),
+                total_pago_integral=Sum('valor_pago_acumulado', filter=Q(estado='PAGO')),
+                total_multas=Sum('multa_atraso'),
+                total_descontos=Sum('desconto'),
+                total_em_divida=Sum(
+                    F('valor_base') + F('multa_atraso') - F('desconto') - F('valor_pago_acumulado'),
+                    filter=nao_pagas,
+                    output_field=models.DecimalField(),
+                ),
+                total_por_receber=Sum('valor_base', filter=~Q(estado='PAGO')),
+                qtd_pagas=Count('id', filter=Q(estado='PAGO')),
+                qtd_pendentes=Count('id', filter=Q(estado='PENDENTE')),
+                qtd_atrasadas=Count('id', filter=Q(estado='ATRASADO')),
+                qtd_isentas=Count('id', filter=Q(estado='ISENTO')),
+                qtd_parciais=Count('id', filter=Q(estado='PAGO_PARCIAL')),
+            )
+            return {
+                k: (v if v is not None else (0 if k.startswith('qtd_') else zero))
+                for k, v in r.items()
+            }
+
+        if secao == 'despesas_gerais':
+            qs = DespesaGeral.objects.do_mes(mes, ano).filter(pago=True)
+            return {'total_despesas_gerais': qs.aggregate(s=Sum('valor'))['s'] or zero}
+
+        if secao == 'despesas_frota':
+            qs = DespesaVeiculo.objects.do_mes(mes, ano)
+            return {'total_despesas_frota': qs.aggregate(s=Sum('valor'))['s'] or zero}
+
+        if secao == 'folha':
+            qs = FolhaPagamento.objects.do_mes(mes, ano).filter(status='PAGO')
+            return {'total_folha_salarial': qs.aggregate(s=Sum('valor_total'))['s'] or zero}
+
+        raise ValueError(f"Secção desconhecida: {secao}")
+
+    @classmethod
+    def actualizar(cls, data: date, secoes=None) -> 'ResumoFinanceiroMensal':
+        """
+        Recalcula as secções indicadas (default: todas) do mês de `data`.
+        Se a linha ainda não existir é criada com todas as secções.
+        """
+        mes, ano = data.month, data.year
+
+        with transaction.atomic():
+            obj, criado = cls.objects.select_for_update().get_or_create(
+                mes_referencia=date(ano, mes, 1),
+            )
+            if criado or not secoes:
+                secoes = cls.SECOES
+
+            campos = {}
+            for secao in secoes:
+                campos.update(cls._calcular_secao(secao, mes, ano))
+
+            for campo, valor in campos.items():
+                setattr(obj, campo, valor)
+            obj.save(update_fields=list(campos) + ['actualizado_em'])
+
+        return obj
+
+    @classmethod
+    def agendar_actualizacao(cls, data: date, secao: str) -> None:
+        """
+        Agenda actualizar(data, [secao]) para depois do commit da transacção
+        corrente (ou corre já, fora de uma transacção).
+        """
+        def recalcular():
+            try:
+                cls.actualizar(data, secoes=[secao])
+            except Exception as exc:
+                logger.error('Erro ao actualizar o resumo de %s (%s): %s', data.strftime('%m/%Y'), secao, exc)
+
+        transaction.on_commit(recalcular)
+
+    @classmethod
+    def obter(cls, mes: int, ano: int) -> 'ResumoFinanceiroMensal':
+        """Leitura O(1) do resumo; calcula-o na primeira vez que é pedido."""
+        try:
+            return cls.objects.get(mes_referencia=date(ano, mes, 1))
+        except cls.DoesNotExist:
+            return cls.actualizar(date(ano, mes, 1))
+
+    @classmethod
+    def reconstruir(cls, meses=None) -> int:
+        """
+        Recalcula todos os meses indicados ou, por omissão, todos os meses
+        com movimento em qualquer um dos livros.
+        """
+        if meses is None:
+            meses = set(Mensalidade.objects.dates('mes_referente', 'month'))
+            meses |= set(DespesaGeral.objects.dates('data_vencimento', 'month'))
+            meses |= set(DespesaVeiculo.objects.dates('data', 'month'))
+            meses |= set(FolhaPagamento.objects.dates('mes_referente', 'month'))
+
+        meses = sorted(m.replace(day=1) for m in meses)
+        for mes_referencia in meses:
+            cls.actualizar(mes_referencia)
+        return len(meses)
+
+    # ------------------------------------------------------------------
+    # Derivados
+    # ------------------------------------------------------------------
+
+    @property
+    def total_divida(self) -> Decimal:
+        total = self.total_previsto + self.total_multas - self.total_descontos - self.total_recebido
+        return max(total, Decimal('0.00'))
+
+    @property
+    def total_despesas(self) -> Decimal:
+        return self.total_despesas_gerais + self.total_despesas_frota + self.total_folha_salarial
+
+    def __str__(self):
+        return f"Resumo {self.mes_referencia.strftime('%m/%Y')}"
+
+
 # ──────────────────────────────────────────────
 # BALANÇO MENSAL
 # ──────────────────────────────────────────────
@@ -933,34 +1409,17 @@ class BalancoMensal(models.Model):
     @classmethod
     def gerar_balanco(cls, mes: int, ano: int) -> 'BalancoMensal':
         """
-        Calcula e persiste os totais de todas as tabelas financeiras
-        para o mês indicado. Cria também uma Transação de resumo.
+        Persiste os totais do mês indicado, lidos do ResumoFinanceiroMensal.
+        Cria também uma Transação de resumo.
         """
         data_ref = date(ano, mes, 1)
 
-        mensalidades = Mensalidade.objects.filter(
-            mes_referente__month=mes, mes_referente__year=ano
-        )
-        previsto = mensalidades.aggregate(s=Sum('valor_base'))['s'] or Decimal('0.00')
-        pagas    = (
-            mensalidades.filter(estado='PAGO')
-            .aggregate(s=Sum('valor_pago_acumulado'))['s'] or Decimal('0.00')
-        )
-        gerais   = (
-            DespesaGeral.objects
-            .filter(pago=True, data_vencimento__month=mes, data_vencimento__year=ano)
-            .aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
-        )
-        frota    = (
-            DespesaVeiculo.objects
-            .filter(data__month=mes, data__year=ano)
-            .aggregate(s=Sum('valor'))['s'] or Decimal('0.00')
-        )
-        salarios = (
-            FolhaPagamento.objects
-            .filter(status='PAGO', mes_referente__month=mes, mes_referente__year=ano)
-            .aggregate(s=Sum('valor_total'))['s'] or Decimal('0.00')
-        )
+        resumo = ResumoFinanceiroMensal.obter(mes, ano)
+        previsto = resumo.total_previsto
+        pagas = resumo.total_pago_integral
+        gerais = resumo.total_despesas_gerais
+        frota = resumo.total_despesas_frota
+        salarios = resumo.total_folha_salarial
 
         total_saidas = gerais + frota + salarios
         resultado = pagas - total_saidas
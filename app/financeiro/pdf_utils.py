@@ -13,21 +13,29 @@ Função principal:
   gerar_pdf_recibo(mensalidade, recibo) -> bytes
     Devolve os bytes do PDF gerado, prontos para guardar num FileField.
 
+As partes estáticas (folha de estilos, TableStyle, rodapé desenhado no
+canvas) são construídas uma vez por processo em RenderizadorRecibo;
+por recibo só se monta o conteúdo variável. Para muitos recibos de uma
+vez ver financeiro.tasks.gerar_pdfs_recibos_lote.
+
 Uso em models.py:
   from financeiro.pdf_utils import gerar_pdf_recibo
   from django.core.files.base import ContentFile
 
   pdf_bytes = gerar_pdf_recibo(mensalidade, recibo)
-  recibo.arquivo_pdf.save(nome, ContentFile(pdf_bytes), save=False)
+  recibo.arquivo.save(nome, ContentFile(pdf_bytes), save=False)
 """
 
+import copy
 import io
 from datetime import date
+from functools import lru_cache
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.platypus import (
     HRFlowable,
     Paragraph,
@@ -46,166 +54,76 @@ COR_CINZA = colors.HexColor('#717d7e')   # cinza texto secundário
 COR_BORDA = colors.HexColor('#aed6f1')   # borda tabela
 
 
-def gerar_pdf_recibo(mensalidade, recibo) -> bytes:
-    """
-    Gera o PDF de um recibo de pagamento.
+TEXTO_RODAPE = (
+    'Este documento é gerado automaticamente pelo Sistema de Transporte Escolar. '
+    'Guarde-o como comprovativo de pagamento.'
+)
 
-    Parâmetros:
-        mensalidade — instância de financeiro.Mensalidade (estado=PAGO)
-        recibo      — instância de financeiro.Recibo
 
-    Devolve:
-        bytes do PDF gerado
+class RenderizadorRecibo:
     """
-    buffer = io.BytesIO()
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=2 * cm,
-        leftMargin=2 * cm,
-        topMargin=2 * cm,
-        bottomMargin=2 * cm,
-        title=f"Recibo {recibo.codigo_recibo}",
-        author="Sistema de Transporte Escolar",
-    )
-
-    styles = getSampleStyleSheet()
-    story = []
-
-    # ── Estilos customizados ───────────────────────────────────────────────────
-
-    estilo_titulo = ParagraphStyle(
-        'Titulo',
-        parent=styles['Normal'],
-        fontSize=20,
-        textColor=COR_PRIMARIA,
-        fontName='Helvetica-Bold',
-        spaceAfter=4,
-    )
-    estilo_subtitulo = ParagraphStyle(
-        'Subtitulo',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=COR_SECUNDARIA,
-        fontName='Helvetica',
-        spaceAfter=2,
-    )
-    estilo_label = ParagraphStyle(
-        'Label',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=COR_CINZA,
-        fontName='Helvetica',
-        spaceAfter=1,
-    )
-    estilo_valor = ParagraphStyle(
-        'Valor',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.black,
-        fontName='Helvetica-Bold',
-        spaceAfter=6,
-    )
-    estilo_total = ParagraphStyle(
-        'Total',
-        parent=styles['Normal'],
-        fontSize=16,
-        textColor=COR_SUCESSO,
-        fontName='Helvetica-Bold',
-        alignment=1,  # centrado
-    )
-    estilo_codigo = ParagraphStyle(
-        'Codigo',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=COR_CINZA,
-        fontName='Helvetica',
-        alignment=1,
-    )
-    estilo_rodape = ParagraphStyle(
-        'Rodape',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=COR_CINZA,
-        fontName='Helvetica',
-        alignment=1,
-    )
-
-    # ── Cabeçalho ─────────────────────────────────────────────────────────────
-
-    # Tabela de cabeçalho: nome da escola à esquerda, info do recibo à direita
-    cabecalho_data = [[
-        Paragraph('Sistema de Transporte Escolar', estilo_titulo),
-        Paragraph(
-            f'RECIBO<br/>'
-            f'<font size="9" color="#717d7e">{recibo.codigo_recibo}</font>',
-            ParagraphStyle('ReciboCab', parent=estilo_titulo,
-                           alignment=2, fontSize=18)
-        ),
-    ]]
-    tabela_cabecalho = Table(cabecalho_data, colWidths=['60%', '40%'])
-    tabela_cabecalho.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    story.append(tabela_cabecalho)
-
-    story.append(HRFlowable(
-        width='100%', thickness=2,
-        color=COR_PRIMARIA, spaceAfter=12
-    ))
-
-    # ── Badge PAGO ────────────────────────────────────────────────────────────
-
-    story.append(Paragraph(
-        '<font color="#1e8449"><b>✓ PAGAMENTO CONFIRMADO</b></font>',
-        ParagraphStyle('Badge', parent=styles['Normal'],
-                       fontSize=12, alignment=1, spaceAfter=16,
-                       backColor=colors.HexColor('#eafaf1'),
-                       borderColor=COR_SUCESSO, borderWidth=1,
-                       borderPadding=6)
-    ))
-
-    # ── Dados do aluno e pagamento ─────────────────────────────────────────────
-
-    aluno = mensalidade.aluno
-    encarregado = aluno.encarregado
-
-    dados = [
-        # Linha 1
-        [
-            [Paragraph('ALUNO', estilo_label),
-             Paragraph(aluno.user.nome, estilo_valor)],
-            [Paragraph('ENCARREGADO', estilo_label),
-             Paragraph(encarregado.user.nome if encarregado else '—', estilo_valor)],
-        ],
-        # Linha 2
-        [
-            [Paragraph('MÊS DE REFERÊNCIA', estilo_label),
-             Paragraph(mensalidade.mes_referente.strftime('%B de %Y').title(), estilo_valor)],
-            [Paragraph('DATA DE PAGAMENTO', estilo_label),
-             Paragraph(
-                 mensalidade.data_ultimo_pagamento.strftime('%d/%m/%Y')
-                 if mensalidade.data_ultimo_pagamento else date.today().strftime('%d/%m/%Y'),
-                 estilo_valor
-             )],
-        ],
-        # Linha 3
-        [
-            [Paragraph('ESCOLA DESTINO', estilo_label),
-             Paragraph(aluno.escola_dest or '—', estilo_valor)],
-            [Paragraph('CLASSE', estilo_label),
-             Paragraph(str(aluno.classe) if aluno.classe else '—', estilo_valor)],
-        ],
-    ]
-
-    for linha in dados:
-        tabela_linha = Table(
-            [[_celula_para_paragrafo(linha[0]), _celula_para_paragrafo(linha[1])]],
-            colWidths=['50%', '50%']
+    Renderizador de recibos com as partes estáticas pré-construídas.
+
+    Uma instância por processo (obter_renderizador()); os objectos
+    guardados aqui só são lidos durante o build, por isso podem ser
+    partilhados entre recibos.
+    """
+
+    MARGEM = 2 * cm
+
+    def __init__(self):
+        normal = getSampleStyleSheet()['Normal']
+
+        # ── Estilos de parágrafo ───────────────────────────────────────────────
+        self.estilo_titulo = ParagraphStyle(
+            'Titulo',
+            parent=normal,
+            fontSize=20,
+            textColor=COR_PRIMARIA,
+            fontName='Helvetica-Bold',
+            spaceAfter=4,
+        )
+        self.estilo_recibo_cab = ParagraphStyle(
+            'ReciboCab', parent=self.estilo_titulo, alignment=2, fontSize=18,
         )
-        tabela_linha.setStyle(TableStyle([
+        self.estilo_label = ParagraphStyle(
+            'Label',
+            parent=normal,
+            fontSize=8,
+            textColor=COR_CINZA,
+            fontName='Helvetica',
+            spaceAfter=1,
+        )
+        self.estilo_valor = ParagraphStyle(
+            'Valor',
+            parent=normal,
+            fontSize=10,
+            textColor=colors.black,
+            fontName='Helvetica-Bold',
+            spaceAfter=6,
+        )
+        self.estilo_codigo = ParagraphStyle(
+            'Codigo',
+            parent=normal,
+            fontSize=9,
+            textColor=COR_CINZA,
+            fontName='Helvetica',
+            alignment=1,
+        )
+        self.estilo_badge = ParagraphStyle(
+            'Badge', parent=normal,
+            fontSize=12, alignment=1, spaceAfter=16,
+            backColor=colors.HexColor('#eafaf1'),
+            borderColor=COR_SUCESSO, borderWidth=1,
+            borderPadding=6,
+        )
+
+        # ── Estilos de tabela ──────────────────────────────────────────────────
+        self.estilo_tabela_cabecalho = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ])
+        self.estilo_tabela_linha = TableStyle([
             ('BACKGROUND', (0, 0), (-1, -1), COR_FUNDO_LINHA),
             ('ROUNDEDCORNERS', [4]),
             ('TOPPADDING', (0, 0), (-1, -1), 8),
@@ -213,83 +131,206 @@ def gerar_pdf_recibo(mensalidade, recibo) -> bytes:
             ('LEFTPADDING', (0, 0), (-1, -1), 10),
             ('RIGHTPADDING', (0, 0), (-1, -1), 10),
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
-        story.append(tabela_linha)
-        story.append(Spacer(1, 6))
-
-    story.append(Spacer(1, 8))
-
-    # ── Tabela de valores ─────────────────────────────────────────────────────
-
-    linhas_valores = [
-        ['Descrição', 'Valor'],
-        ['Mensalidade base', f'{mensalidade.valor_base:.2f} MT'],
-    ]
-
-    if mensalidade.multa_atraso > 0:
-        linhas_valores.append(['Multa de atraso', f'{mensalidade.multa_atraso:.2f} MT'])
-
-    if mensalidade.desconto > 0:
-        linhas_valores.append(['Desconto', f'- {mensalidade.desconto:.2f} MT'])
-
-    linhas_valores.append(['TOTAL PAGO', f'{mensalidade.valor_pago_acumulado:.2f} MT'])
-
-    tabela_valores = Table(linhas_valores, colWidths=['70%', '30%'])
-    tabela_valores.setStyle(TableStyle([
-        # Cabeçalho
-        ('BACKGROUND', (0, 0), (-1, 0), COR_PRIMARIA),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        # Linhas de detalhe
-        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -2), 10),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, COR_FUNDO_LINHA]),
-        # Linha total
-        ('BACKGROUND', (0, -1), (-1, -1), COR_SUCESSO),
-        ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, -1), (-1, -1), 12),
-        # Padding geral
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-        # Bordas
-        ('GRID', (0, 0), (-1, -1), 0.5, COR_BORDA),
-        ('BOX', (0, 0), (-1, -1), 1, COR_PRIMARIA),
-    ]))
-    story.append(tabela_valores)
-    story.append(Spacer(1, 20))
-
-    # ── Rodapé ────────────────────────────────────────────────────────────────
-
-    story.append(HRFlowable(
-        width='100%', thickness=1,
-        color=COR_BORDA, spaceAfter=8
-    ))
-    story.append(Paragraph(
-        f'Código do recibo: <b>{recibo.codigo_recibo}</b> &nbsp;|&nbsp; '
-        f'Emitido em: <b>{recibo.data_emissao.strftime("%d/%m/%Y %H:%M") if recibo.data_emissao else date.today().strftime("%d/%m/%Y")}</b>',
-        estilo_codigo
-    ))
-    story.append(Spacer(1, 4))
-    story.append(Paragraph(
-        'Este documento é gerado automaticamente pelo Sistema de Transporte Escolar. '
-        'Guarde-o como comprovativo de pagamento.',
-        estilo_rodape
-    ))
-
-    # ── Build ─────────────────────────────────────────────────────────────────
-
-    doc.build(story)
-    return buffer.getvalue()
-
-
-def _celula_para_paragrafo(celula: list) -> 'Table':
-    """Converte uma lista de [label, valor] num bloco vertical."""
-    return Table(
-        [[p] for p in celula],
-        colWidths=['100%']
-    )
+        ])
+        self.estilo_tabela_valores = TableStyle([
+            # Cabeçalho
+            ('BACKGROUND', (0, 0), (-1, 0), COR_PRIMARIA),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            # Linhas de detalhe
+            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -2), 10),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, COR_FUNDO_LINHA]),
+            # Linha total
+            ('BACKGROUND', (0, -1), (-1, -1), COR_SUCESSO),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 12),
+            # Padding geral
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            # Bordas
+            ('GRID', (0, 0), (-1, -1), 0.5, COR_BORDA),
+            ('BOX', (0, 0), (-1, -1), 1, COR_PRIMARIA),
+        ])
+
+        # ── Parágrafos fixos, já interpretados (copiados por recibo) ─────────
+        self._titulo = Paragraph('Sistema de Transporte Escolar', self.estilo_titulo)
+        self._badge = Paragraph(
+            '<font color="#1e8449"><b>✓ PAGAMENTO CONFIRMADO</b></font>',
+            self.estilo_badge,
+        )
+        self._labels = {
+            label: Paragraph(label, self.estilo_label)
+            for label in (
+                'ALUNO', 'ENCARREGADO', 'MÊS DE REFERÊNCIA',
+                'DATA DE PAGAMENTO', 'ESCOLA DESTINO', 'CLASSE',
+            )
+        }
+
+        # ── Rodapé fixo: linhas já partidas à largura útil da página ──────────
+        largura_util = A4[0] - 2 * self.MARGEM
+        self._linhas_rodape = _quebrar_texto(TEXTO_RODAPE, 'Helvetica', 8, largura_util)
+
+    # ------------------------------------------------------------------
+    # Desenho no canvas (partes que não mudam entre recibos)
+    # ------------------------------------------------------------------
+
+    def _desenhar_pagina(self, canvas, doc):
+        canvas.saveState()
+        # Faixa superior
+        canvas.setFillColor(COR_PRIMARIA)
+        canvas.rect(0, A4[1] - 0.4 * cm, A4[0], 0.4 * cm, stroke=0, fill=1)
+        # Rodapé
+        canvas.setStrokeColor(COR_BORDA)
+        canvas.setLineWidth(1)
+        y = self.MARGEM - 0.2 * cm
+        canvas.line(self.MARGEM, y, A4[0] - self.MARGEM, y)
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(COR_CINZA)
+        for linha in self._linhas_rodape:
+            y -= 10
+            canvas.drawCentredString(A4[0] / 2, y, linha)
+        canvas.restoreState()
+
+    # ------------------------------------------------------------------
+    # Conteúdo variável
+    # ------------------------------------------------------------------
+
+    def _celula(self, label: str, valor: str) -> list:
+        """Bloco vertical [label, valor] — a célula da tabela empilha-os."""
+        return [copy.copy(self._labels[label]), Paragraph(valor, self.estilo_valor)]
+
+    def _story(self, mensalidade, recibo) -> list:
+        story = []
+
+        # ── Cabeçalho ─────────────────────────────────────────────────────────
+        tabela_cabecalho = Table([[
+            copy.copy(self._titulo),
+            Paragraph(
+                f'RECIBO<br/>'
+                f'<font size="9" color="#717d7e">{recibo.codigo_recibo}</font>',
+                self.estilo_recibo_cab,
+            ),
+        ]], colWidths=['60%', '40%'])
+        tabela_cabecalho.setStyle(self.estilo_tabela_cabecalho)
+        story.append(tabela_cabecalho)
+        story.append(HRFlowable(width='100%', thickness=2, color=COR_PRIMARIA, spaceAfter=12))
+
+        # ── Badge PAGO ────────────────────────────────────────────────────────
+        story.append(copy.copy(self._badge))
+
+        # ── Dados do aluno e pagamento ────────────────────────────────────────
+        aluno = mensalidade.aluno
+        encarregado = aluno.encarregado
+        data_pagamento = mensalidade.data_ultimo_pagamento or date.today()
+
+        dados = [
+            (('ALUNO', aluno.user.nome),
+             ('ENCARREGADO', encarregado.user.nome if encarregado else '—')),
+            (('MÊS DE REFERÊNCIA', mensalidade.mes_referente.strftime('%B de %Y').title()),
+             ('DATA DE PAGAMENTO', data_pagamento.strftime('%d/%m/%Y'))),
+            (('ESCOLA DESTINO', aluno.escola_dest or '—'),
+             ('CLASSE', str(aluno.classe) if aluno.classe else '—')),
+        ]
+        for esquerda, direita in dados:
+            tabela_linha = Table(
+                [[self._celula(*esquerda), self._celula(*direita)]],
+                colWidths=['50%', '50%'],
+            )
+            tabela_linha.setStyle(self.estilo_tabela_linha)
+            story.append(tabela_linha)
+            story.append(Spacer(1, 6))
+
+        story.append(Spacer(1, 8))
+
+        # ── Tabela de valores ─────────────────────────────────────────────────
+        linhas_valores = [
+            ['Descrição', 'Valor'],
+            ['Mensalidade base', f'{mensalidade.valor_base:.2f} MT'],
+        ]
+        if mensalidade.multa_atraso > 0:
+            linhas_valores.append(['Multa de atraso', f'{mensalidade.multa_atraso:.2f} MT'])
+        if mensalidade.desconto > 0:
+            linhas_valores.append(['Desconto', f'- {mensalidade.desconto:.2f} MT'])
+        linhas_valores.append(['TOTAL PAGO', f'{mensalidade.valor_pago_acumulado:.2f} MT'])
+
+        tabela_valores = Table(linhas_valores, colWidths=['70%', '30%'])
+        tabela_valores.setStyle(self.estilo_tabela_valores)
+        story.append(tabela_valores)
+        story.append(Spacer(1, 20))
+
+        # ── Código e data de emissão ──────────────────────────────────────────
+        emitido = (
+            recibo.data_emissao.strftime('%d/%m/%Y %H:%M')
+            if recibo.data_emissao else date.today().strftime('%d/%m/%Y')
+        )
+        story.append(Paragraph(
+            f'Código do recibo: <b>{recibo.codigo_recibo}</b> &nbsp;|&nbsp; '
+            f'Emitido em: <b>{emitido}</b>',
+            self.estilo_codigo,
+        ))
+        return story
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def renderizar(self, mensalidade, recibo) -> bytes:
+        """Devolve os bytes do PDF de um recibo."""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=self.MARGEM,
+            leftMargin=self.MARGEM,
+            topMargin=self.MARGEM,
+            bottomMargin=self.MARGEM + 1 * cm,
+            title=f"Recibo {recibo.codigo_recibo}",
+            author="Sistema de Transporte Escolar",
+        )
+        doc.build(
+            self._story(mensalidade, recibo),
+            onFirstPage=self._desenhar_pagina,
+            onLaterPages=self._desenhar_pagina,
+        )
+        return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def obter_renderizador() -> RenderizadorRecibo:
+    """Renderizador partilhado do processo (construído na primeira chamada)."""
+    return RenderizadorRecibo()
+
+
+def gerar_pdf_recibo(mensalidade, recibo) -> bytes:
+    """
+    Gera o PDF de um recibo de pagamento.
+
+    Parâmetros:
+        mensalidade — instância de financeiro.Mensalidade (estado=PAGO)
+        recibo      — instância de financeiro.Recibo
+
+    Devolve:
+        bytes do PDF gerado
+    """
+    return obter_renderizador().renderizar(mensalidade, recibo)
+
+
+def _quebrar_texto(texto: str, fonte: str, tamanho: float, largura: float) -> list:
+    """Parte `texto` em linhas que cabem em `largura` pontos."""
+    linhas, actual = [], ''
+    for palavra in texto.split():
+        candidata = f'{actual} {palavra}'.strip()
+        if actual and stringWidth(candidata, fonte, tamanho) > largura:
+            linhas.append(actual)
+            actual = palavra
+        else:
+            actual = candidata
+    if actual:
+        linhas.append(actual)
+    return linhas
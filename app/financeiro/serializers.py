@@ -307,10 +307,8 @@ class MensalidadeWriteSerializer(serializers.ModelSerializer):
         pk = self.instance.pk if self.instance else None
 
         if aluno and mes_referente:
-            qs = Mensalidade.objects.filter(
-                aluno=aluno,
-                mes_referente__month=mes_referente.month,
-                mes_referente__year=mes_referente.year,
+            qs = Mensalidade.objects.filter(aluno=aluno).do_mes(
+                mes_referente.month, mes_referente.year,
             )
             if pk:
                 qs = qs.exclude(pk=pk)
@@ -364,10 +362,8 @@ class FolhaPagamentoWriteSerializer(serializers.ModelSerializer):
         pk = self.instance.pk if self.instance else None
 
         if funcionario and mes_referente:
-            qs = FolhaPagamento.objects.filter(
-                funcionario=funcionario,
-                mes_referente__month=mes_referente.month,
-                mes_referente__year=mes_referente.year,
+            qs = FolhaPagamento.objects.filter(funcionario=funcionario).do_mes(
+                mes_referente.month, mes_referente.year,
             )
             if pk:
                 qs = qs.exclude(pk=pk)
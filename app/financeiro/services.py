@@ -11,6 +11,7 @@ from financeiro.models import (
     Funcionario,
     LogNotificacoes,
     Mensalidade,
+    ResumoFinanceiroMensal,
 )
 
 
@@ -116,27 +117,24 @@ def aplicar_multas_mensais(mes, ano):
     """
     Verifica e aplica multas a todas as mensalidades pendentes/atrasadas
     do mês indicado que já passaram do dia limite.
+
+    A multa é aplicada em lote (Mensalidade.objects.aplicar_multas_em_lote);
+    as notificações são enviadas depois, lendo as mensalidades afectadas
+    numa única query.
     """
+    ids = Mensalidade.objects.aplicar_multas_em_lote(mes, ano)
+
     mensalidades = (
         Mensalidade.objects
-        .filter(
-            mes_referente__month=mes,
-            mes_referente__year=ano,
-        )
-        .exclude(estado__in=['PAGO', 'ISENTO'])
+        .filter(pk__in=ids)
         .select_related('aluno__user', 'aluno__encarregado__user')
     )
-
-    aplicadas = 0
     for mensalidade in mensalidades:
-        multa_aplicada = mensalidade.verificar_e_aplicar_multa()
-        if multa_aplicada:
-            aplicadas += 1
-            try:
-                enviar_notificacao_multa(mensalidade)
-            except Exception as e:
-                print(f"[AVISO] Falha ao notificar mensalidade {mensalidade.pk}: {e}")
-    return aplicadas
+        try:
+            enviar_notificacao_multa(mensalidade)
+        except Exception as e:
+            print(f"[AVISO] Falha ao notificar mensalidade {mensalidade.pk}: {e}")
+    return len(ids)
 
 
 def resumo_financeiro_mes(mes, ano):
@@ -144,33 +142,19 @@ def resumo_financeiro_mes(mes, ano):
     Retorna um dicionário com o resumo financeiro do mês:
     total previsto, total recebido, total em dívida e total de multas aplicadas.
 
-    OPTIMIZADO: uma única query agregada em vez de múltiplas contagens separadas
+    Lido do ResumoFinanceiroMensal — sem agregações sobre as mensalidades.
     """
-    from django.db.models import Sum, Count, Q
-    from decimal import Decimal
-
-    resultado = Mensalidade.objects.filter(
-        mes_referente__month=mes,
-        mes_referente__year=ano,
-    ).aggregate(
-        total_previsto=Sum('valor_base'),
-        total_recebido=Sum('valor_pago_acumulado'),
-        total_multas=Sum('multa_atraso'),
-        total_descontos=Sum('desconto'),
-        qtd_pagas=Count('id', filter=Q(estado='PAGO')),
-        qtd_pendentes=Count('id', filter=Q(estado='PENDENTE')),
-        qtd_atrasadas=Count('id', filter=Q(estado='ATRASADO')),
-        qtd_isentas=Count('id', filter=Q(estado='ISENTO')),
-        qtd_parciais=Count('id', filter=Q(estado='PAGO_PARCIAL')),
-    )
-
-    for chave in resultado:
-        if resultado[chave] is None:
-            resultado[chave] = Decimal('0.00') if 'total' in chave else 0
-
-    total_divida = (
-        (resultado['total_previsto'] + resultado['total_multas']) - resultado['total_descontos'] - resultado['total_recebido']
-    )
-    resultado['total_divida'] = max(total_divida, Decimal('0.00'))
-
-    return resultado
+    resumo = ResumoFinanceiroMensal.obter(mes, ano)
+
+    return {
+        'total_previsto': resumo.total_previsto,
+        'total_recebido': resumo.total_recebido,
+        'total_multas': resumo.total_multas,
+        'total_descontos': resumo.total_descontos,
+        'qtd_pagas': resumo.qtd_pagas,
+        'qtd_pendentes': resumo.qtd_pendentes,
+        'qtd_atrasadas': resumo.qtd_atrasadas,
+        'qtd_isentas': resumo.qtd_isentas,
+        'qtd_parciais': resumo.qtd_parciais,
+        'total_divida': resumo.total_divida,
+    }
@@ -11,7 +11,8 @@ o arranque do Django, resultando em UnboundLocalError ou AppRegistryNotReady.
 import logging
 from datetime import date
 from django.dispatch import receiver
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 
 logger = logging.getLogger(__name__)
 
@@ -26,11 +27,7 @@ def gerar_mensalidade_ao_criar_aluno(sender, instance, created, **kwargs):
     hoje = date.today()
     data_ref = hoje.replace(day=1)
 
-    existe = Mensalidade.objects.filter(
-        aluno=instance,
-        mes_referente__month=hoje.month,
-        mes_referente__year=hoje.year,
-    ).exists()
+    existe = Mensalidade.objects.filter(aluno=instance).do_mes(hoje.month, hoje.year).exists()
 
     if not existe:
         try:
@@ -112,11 +109,93 @@ def emitir_recibo_ao_pagar(sender, instance, created, **kwargs):
 
     try:
         instance._gerar_recibo_automatico()
-        logger.info('Recibo gerado para a mensalidade %s (aluno=%s).', instance.nr_fatura or instance.pk, instance.aluno.user.nome)
+        logger.info('Recibo reservado para a mensalidade %s (aluno=%s).', instance.nr_fatura or instance.pk, instance.aluno.user.nome)
     except Exception as exc:
         logger.error('Erro ao gerar recibo para %s: %s', instance.nr_fatura or instance.pk, exc)
 
 
+@receiver(post_save, sender='financeiro.ConfiguracaoFinanceira')
+@receiver(post_delete, sender='financeiro.ConfiguracaoFinanceira')
+def invalidar_cache_configuracao(sender, **kwargs):
+    # A cópia local sai já; a versão no Redis só sobe depois do commit,
+    # para que outros workers não voltem a ler a linha antiga.
+    sender.limpar_cache_local()
+    transaction.on_commit(sender.invalidar_cache)
+
+
+# ──────────────────────────────────────────────
+# RESUMO FINANCEIRO MENSAL
+# ──────────────────────────────────────────────
+# Registados depois de aplicar_multa_automatica para que o recálculo
+# já veja a multa aplicada pelo UPDATE desse receiver.
+
+def _guardar_data_anterior(sender, instance, campo, update_fields):
+    # A data gravada antes desta escrita: se o registo mudar de mês, o mês
+    # antigo também tem de ser recalculado.
+    if not instance.pk or (update_fields is not None and campo not in update_fields):
+        return
+    instance._data_resumo_anterior = (
+        sender.objects.filter(pk=instance.pk).values_list(campo, flat=True).first()
+    )
+
+
+def _actualizar_resumo(secao, instance, campo):
+    # O recálculo corre depois do commit, fora da transacção (e dos locks)
+    # de quem escreveu.
+    from financeiro.models import ResumoFinanceiroMensal
+
+    data = getattr(instance, campo)
+    ResumoFinanceiroMensal.agendar_actualizacao(data, secao)
+
+    anterior = instance.__dict__.pop('_data_resumo_anterior', None)
+    if anterior and (anterior.year, anterior.month) != (data.year, data.month):
+        ResumoFinanceiroMensal.agendar_actualizacao(anterior, secao)
+
+
+@receiver(pre_save, sender='financeiro.Mensalidade')
+def data_anterior_mensalidade(sender, instance, update_fields=None, **kwargs):
+    _guardar_data_anterior(sender, instance, 'mes_referente', update_fields)
+
+
+@receiver(post_save, sender='financeiro.Mensalidade')
+@receiver(post_delete, sender='financeiro.Mensalidade')
+def resumo_mensalidade(sender, instance, **kwargs):
+    _actualizar_resumo('mensalidades', instance, 'mes_referente')
+
+
+@receiver(pre_save, sender='financeiro.DespesaGeral')
+def data_anterior_despesa_geral(sender, instance, update_fields=None, **kwargs):
+    _guardar_data_anterior(sender, instance, 'data_vencimento', update_fields)
+
+
+@receiver(post_save, sender='financeiro.DespesaGeral')
+@receiver(post_delete, sender='financeiro.DespesaGeral')
+def resumo_despesa_geral(sender, instance, **kwargs):
+    _actualizar_resumo('despesas_gerais', instance, 'data_vencimento')
+
+
+@receiver(pre_save, sender='financeiro.DespesaVeiculo')
+def data_anterior_despesa_veiculo(sender, instance, update_fields=None, **kwargs):
+    _guardar_data_anterior(sender, instance, 'data', update_fields)
+
+
+@receiver(post_save, sender='financeiro.DespesaVeiculo')
+@receiver(post_delete, sender='financeiro.DespesaVeiculo')
+def resumo_despesa_veiculo(sender, instance, **kwargs):
+    _actualizar_resumo('despesas_frota', instance, 'data')
+
+
+@receiver(pre_save, sender='financeiro.FolhaPagamento')
+def data_anterior_folha_pagamento(sender, instance, update_fields=None, **kwargs):
+    _guardar_data_anterior(sender, instance, 'mes_referente', update_fields)
+
+
+@receiver(post_save, sender='financeiro.FolhaPagamento')
+@receiver(post_delete, sender='financeiro.FolhaPagamento')
+def resumo_folha_pagamento(sender, instance, **kwargs):
+    _actualizar_resumo('folha', instance, 'mes_referente')
+
+
 @receiver(post_save, sender='financeiro.FolhaPagamento')
 def log_folha_pagamento(sender, instance, created, **kwargs):
     if created:
@@ -5,8 +5,11 @@ Tasks Celery do módulo financeiro.
 
 Tasks assíncronas (chamadas via .delay() ou .apply_async()):
   - gerar_pdf_recibo_task            → gera PDF após pagamento completo
+  - gerar_pdfs_recibos_lote          → gera N PDFs numa só invocação
   - enviar_notificacao_pagamento     → SMS ao encarregado após pagamento
   - enviar_sms_mensalidade_atraso    → SMS para um encarregado específico
+  - enviar_lote_sms                  → um lote do pipeline de SMS em massa
+  - resumir_envio_sms                → callback do chord do pipeline
 
 Tasks periódicas (agendadas pelo Celery Beat):
   - gerar_mensalidades_mes           → dia 1 de cada mês às 07:00
@@ -17,10 +20,12 @@ Tasks periódicas (agendadas pelo Celery Beat):
 """
 
 import logging
+from collections import defaultdict
 from datetime import date, timedelta
+from itertools import groupby
 
-from celery import shared_task
-from django.core.files.base import ContentFile
+from celery import chord, shared_task
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -38,40 +43,79 @@ logger = logging.getLogger(__name__)
 def gerar_pdf_recibo_task(self, recibo_id: int):
     """
     Gera o PDF de um recibo de pagamento de forma assíncrona.
-    Chamada após Mensalidade.registrar_pagamento() quando estado=PAGO.
+    Agendada via transaction.on_commit quando o recibo é reservado
+    (Mensalidade._gerar_recibo_automatico). É o único sítio que renderiza.
     """
     try:
+        from django.db import transaction
+
         from financeiro.models import Recibo
-        from financeiro.pdf_utils import gerar_pdf_recibo
-
-        recibo = Recibo.objects.select_related(
-            'mensalidade__aluno__user',
-            'mensalidade__aluno__encarregado__user',
-        ).get(pk=recibo_id)
-        mensalidade = recibo.mensalidade
-
-        if recibo.arquivo_pdf and recibo.arquivo_pdf.name.endswith('.pdf'):
-            logger.info('Recibo %s já tem PDF — ignorado.', recibo.codigo_recibo)
-            return recibo.arquivo_pdf.name
-
-        pdf_bytes = gerar_pdf_recibo(mensalidade, recibo)
-        nome = (
-            f"recibo_{mensalidade.aluno.id}"
-            f"_{mensalidade.mes_referente.strftime('%Y%m')}.pdf"
-        )
-        recibo.arquivo_pdf.save(nome, ContentFile(pdf_bytes), save=True)
+
+        with transaction.atomic():
+            # Lock só no recibo: duas entregas da mesma task não renderizam duas vezes
+            recibo = (
+                Recibo.objects
+                .select_for_update(of=('self',))
+                .select_related('mensalidade__aluno__user')
+                .get(pk=recibo_id)
+            )
+            if recibo.arquivo:
+                logger.info('Recibo %s já tem ficheiro — ignorado.', recibo.codigo_recibo)
+                return recibo.arquivo.name
+
+            nome = recibo.gerar_arquivo()
 
         logger.info(
             'PDF gerado: recibo=%s aluno=%s',
-            recibo.codigo_recibo, mensalidade.aluno.user.nome
+            recibo.codigo_recibo, recibo.mensalidade.aluno.user.nome
         )
-        return recibo.arquivo_pdf.name
+        return nome
 
     except Exception as exc:
         logger.error('Erro ao gerar PDF do recibo %s: %s', recibo_id, exc)
         raise self.retry(exc=exc)
 
 
+@shared_task(name='financeiro.tasks.gerar_pdfs_recibos_lote')
+def gerar_pdfs_recibos_lote(recibo_ids: list) -> dict:
+    """
+    Gera os PDFs de vários recibos numa só invocação do worker.
+
+    Uma query para todos os recibos e o renderizador partilhado do processo
+    (pdf_utils.obter_renderizador). Recibos que já têm ficheiro, ou que
+    outro worker está a renderizar, são saltados. Cada recibo corre no seu
+    savepoint: um erro de BD num deles não aborta a transacção dos restantes.
+    """
+    from django.db import transaction
+    from django.db.models import Q
+
+    from financeiro.models import Recibo
+
+    gerados, erros = 0, 0
+    with transaction.atomic():
+        recibos = (
+            Recibo.objects
+            .filter(pk__in=recibo_ids)
+            .filter(Q(arquivo='') | Q(arquivo__isnull=True))
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related(
+                'mensalidade__aluno__user',
+                'mensalidade__aluno__encarregado__user',
+            )
+        )
+        for recibo in recibos:
+            try:
+                with transaction.atomic():
+                    recibo.gerar_arquivo()
+                gerados += 1
+            except Exception as exc:
+                logger.error('Erro ao gerar PDF do recibo %s: %s', recibo.codigo_recibo, exc)
+                erros += 1
+
+    logger.info('Lote de recibos: %d gerado(s), %d erro(s).', gerados, erros)
+    return {'gerados': gerados, 'erros': erros}
+
+
 @shared_task(
     bind=True,
     max_retries=3,
@@ -175,68 +219,75 @@ def aplicar_multas_automaticas():
     """
     from financeiro.models import Mensalidade
 
-    pendentes = Mensalidade.objects.filter(
-        estado__in=['PENDENTE', 'ATRASADO'],
-        multa_atraso=0,
-    )
+    ids = Mensalidade.objects.aplicar_multas_em_lote()
 
-    aplicadas = 0
-    for m in pendentes:
-        if m.verificar_e_aplicar_multa():
-            aplicadas += 1
-
-    logger.info('aplicar_multas_automaticas: %d multa(s) aplicada(s).', aplicadas)
-    return {'aplicadas': aplicadas}
+    logger.info('aplicar_multas_automaticas: %d multa(s) aplicada(s).', len(ids))
+    # Os ids ficam só no log: o resultado é gravado no backend de resultados
+    logger.debug('aplicar_multas_automaticas: mensalidades multadas %s.', ids)
+    return {'aplicadas': len(ids)}
 
 
 @shared_task(name='financeiro.tasks.notificar_mensalidades_atraso')
 def notificar_mensalidades_atraso():
     """
     Envia SMS aos encarregados de alunos com mensalidades em atraso.
+    Um único SMS por encarregado, com todas as mensalidades em atraso
+    dos seus educandos (ver _mensagem_atraso).
     Agendada: diário às 09:00.
     """
-    from core.sms import enviar_sms_bulk
-    from financeiro.models import LogNotificacoes, Mensalidade
+    from financeiro.models import Mensalidade
 
-    atrasadas = Mensalidade.objects.filter(
-        estado='ATRASADO'
-    ).select_related('aluno__user', 'aluno__encarregado__user')
+    atrasadas = (
+        Mensalidade.objects
+        .filter(estado='ATRASADO', aluno__encarregado__telefone__isnull=False)
+        .select_related('aluno__user', 'aluno__encarregado__user')
+        .order_by('aluno__encarregado_id', 'aluno__user__nome', 'mes_referente')
+    )
 
-    notificadas = 0
-    for m in atrasadas:
-        encarregado = m.aluno.encarregado
-        if not encarregado or not encarregado.telefone:
+    itens = []
+    total_mensalidades = 0
+    for _, grupo in groupby(atrasadas.iterator(), key=lambda m: m.aluno.encarregado_id):
+        grupo = list(grupo)
+        encarregado = grupo[0].aluno.encarregado
+        if not encarregado.telefone:
             continue
 
-        mensagem = (
+        itens.append({
+            'mensalidade_ids': [m.pk for m in grupo],
+            'destino': str(encarregado.telefone),
+            'mensagem': _mensagem_atraso(grupo),
+        })
+        total_mensalidades += len(grupo)
+
+    lotes = despachar_sms_em_lote(itens, 'notificar_mensalidades_atraso')
+
+    logger.info(
+        'notificar_mensalidades_atraso: %d SMS (%d mensalidade(s)) em %d lote(s).',
+        len(itens), total_mensalidades, lotes,
+    )
+    return {'notificadas': len(itens), 'mensalidades': total_mensalidades, 'lotes': lotes}
+
+
+def _mensagem_atraso(mensalidades: list) -> str:
+    """Texto do aviso de atraso para as mensalidades de um encarregado."""
+    if len(mensalidades) == 1:
+        m = mensalidades[0]
+        return (
             f"AVISO: A mensalidade de {m.aluno.user.nome} "
             f"ref. {m.mes_referente.strftime('%m/%Y')} esta em atraso. "
             f"Divida: {m.saldo_devedor} MT. "
             f"Contacte a escola."
         )
 
-        resultado = enviar_sms(
-            destinatario=str(encarregado.telefone),
-            mensagem=mensagem,
-        )
-
-        LogNotificacoes.objects.create(
-            mensalidade=m,
-            tipo='SMS',
-            destino=str(encarregado.telefone),
-            sucesso=resultado['sucesso'],
-            resposta_server=(
-                f"operador={resultado.get('operador')} "
-                f"id={resultado.get('messageId','-')} "
-                f"erro={resultado.get('erro','-')}"
-            ),
-        )
-        notificadas += 1
-
-    logger.info(
-        'notificar_mensalidades_atraso: %d SMS enviado(s).', notificadas
+    linhas = '; '.join(
+        f"{m.aluno.user.nome} {m.mes_referente.strftime('%m/%Y')}: {m.saldo_devedor} MT"
+        for m in mensalidades
+    )
+    total = sum(m.saldo_devedor for m in mensalidades)
+    return (
+        f"AVISO: {len(mensalidades)} mensalidades em atraso. {linhas}. "
+        f"Divida total: {total} MT. Contacte a escola."
     )
-    return {'notificadas': notificadas}
 
 
 @shared_task(name='financeiro.tasks.notificar_mensalidades_a_vencer')
@@ -245,8 +296,7 @@ def notificar_mensalidades_a_vencer():
     Envia SMS para mensalidades que vencem nos próximos 5 dias.
     Agendada: diário às 09:30.
     """
-    from core.sms import enviar_sms
-    from financeiro.models import ConfiguracaoFinanceira, LogNotificacoes, Mensalidade
+    from financeiro.models import ConfiguracaoFinanceira, Mensalidade
 
     config = ConfiguracaoFinanceira.get_solo()
     hoje = date.today()
@@ -256,8 +306,8 @@ def notificar_mensalidades_a_vencer():
         estado='PENDENTE'
     ).select_related('aluno__user', 'aluno__encarregado__user')
 
-    notificadas = 0
-    for m in pendentes:
+    itens = []
+    for m in pendentes.iterator():
         data_limite = config.data_limite_para_mes(m.mes_referente)
         if not (hoje <= data_limite <= em_5_dias):
             continue
@@ -266,35 +316,118 @@ def notificar_mensalidades_a_vencer():
         if not encarregado or not encarregado.telefone:
             continue
 
-        mensagem = (
-            f"LEMBRETE: Mensalidade de {m.aluno.user.nome} "
-            f"ref. {m.mes_referente.strftime('%m/%Y')} "
-            f"vence em {data_limite.strftime('%d/%m/%Y')}. "
-            f"Valor: {m.saldo_devedor} MT."
-        )
+        itens.append({
+            'mensalidade_ids': [m.pk],
+            'destino': str(encarregado.telefone),
+            'mensagem': (
+                f"LEMBRETE: Mensalidade de {m.aluno.user.nome} "
+                f"ref. {m.mes_referente.strftime('%m/%Y')} "
+                f"vence em {data_limite.strftime('%d/%m/%Y')}. "
+                f"Valor: {m.saldo_devedor} MT."
+            ),
+        })
 
-        resultado = enviar_sms(
-            destinatario=str(encarregado.telefone),
-            mensagem=mensagem,
-        )
+    lotes = despachar_sms_em_lote(itens, 'notificar_mensalidades_a_vencer')
 
-        LogNotificacoes.objects.create(
-            mensalidade=m,
+    logger.info(
+        'notificar_mensalidades_a_vencer: %d SMS em %d lote(s).', len(itens), lotes
+    )
+    return {'notificadas': len(itens), 'lotes': lotes}
+
+
+# ══════════════════════════════════════════════
+# PIPELINE DE SMS EM LOTE
+# ══════════════════════════════════════════════
+#
+# notificar_* → despachar_sms_em_lote → chord(enviar_lote_sms × N) → resumir_envio_sms
+#
+# Cada item é uma mensagem para um destinatário, serializável em JSON:
+#   {'mensalidade_ids': [int, ...], 'destino': str, 'mensagem': str}
+# Um item pode cobrir várias mensalidades (aviso agregado por encarregado);
+# o log continua a ter uma linha por mensalidade.
+#
+# Os lotes correm em paralelo nos workers. Dentro de um lote, cada mensagem
+# é dividida em segmentos de 160 caracteres (core.sms.segmentar_mensagem);
+# segmentos com o mesmo texto partilham um único pedido ao gateway
+# (enviar_sms_bulk) e o log é gravado com um único bulk_create.
+
+def despachar_sms_em_lote(itens: list, origem: str, tamanho_lote: int = None) -> int:
+    """
+    Divide `itens` em lotes de SMS_TAMANHO_LOTE e dispara um chord:
+    um enviar_lote_sms por lote, seguido de resumir_envio_sms.
+    Devolve o número de lotes despachados.
+    """
+    tamanho_lote = tamanho_lote or getattr(settings, 'SMS_TAMANHO_LOTE', 100)
+    lotes = [itens[i:i + tamanho_lote] for i in range(0, len(itens), tamanho_lote)]
+    if not lotes:
+        return 0
+
+    chord([enviar_lote_sms.s(lote) for lote in lotes])(resumir_envio_sms.s(origem))
+    return len(lotes)
+
+
+def _resposta_servidor(resultado: dict) -> str:
+    return (
+        f"operador={resultado.get('operador')} "
+        f"id={resultado.get('messageId', '-')} "
+        f"erro={resultado.get('erro', '-')}"
+    )
+
+
+@shared_task(name='financeiro.tasks.enviar_lote_sms')
+def enviar_lote_sms(itens: list):
+    """
+    Envia um lote de notificações e regista o resultado em LogNotificacoes.
+    Um item só conta como enviado se todos os seus segmentos o forem.
+    """
+    from core.sms import enviar_sms_bulk, normalizar_numero, segmentar_mensagem
+    from financeiro.models import LogNotificacoes
+
+    por_segmento = defaultdict(list)
+    for indice, item in enumerate(itens):
+        for segmento in segmentar_mensagem(item['mensagem']):
+            por_segmento[segmento].append(indice)
+
+    # Resultado por item: o primeiro segmento falhado ou o último com sucesso
+    resultados_item = {}
+    for segmento, indices in por_segmento.items():
+        destinos = list(dict.fromkeys(itens[i]['destino'] for i in indices))
+        resultados = {r['numero']: r for r in enviar_sms_bulk(destinos, segmento)}
+
+        for i in indices:
+            chave = normalizar_numero(itens[i]['destino']) or itens[i]['destino']
+            resultado = resultados.get(chave, {'sucesso': False, 'erro': 'Sem resposta'})
+            if resultados_item.get(i, {}).get('sucesso', True):
+                resultados_item[i] = resultado
+
+    logs = [
+        LogNotificacoes(
+            mensalidade_id=mensalidade_id,
             tipo='SMS',
-            destino=str(encarregado.telefone),
-            sucesso=resultado['sucesso'],
-            resposta_server=(
-                f"operador={resultado.get('operador')} "
-                f"id={resultado.get('messageId','-')} "
-                f"erro={resultado.get('erro','-')}"
-            ),
+            destino=item['destino'],
+            sucesso=resultados_item[i]['sucesso'],
+            resposta_server=_resposta_servidor(resultados_item[i]),
         )
-        notificadas += 1
+        for i, item in enumerate(itens)
+        for mensalidade_id in item['mensalidade_ids']
+    ]
+    LogNotificacoes.objects.bulk_create(logs)
+
+    enviadas = sum(1 for r in resultados_item.values() if r['sucesso'])
+    return {'enviadas': enviadas, 'falhadas': len(itens) - enviadas}
+
+
+@shared_task(name='financeiro.tasks.resumir_envio_sms')
+def resumir_envio_sms(resultados: list, origem: str):
+    """Callback do chord — agrega os totais de todos os lotes."""
+    enviadas = sum(r['enviadas'] for r in resultados)
+    falhadas = sum(r['falhadas'] for r in resultados)
 
     logger.info(
-        'notificar_mensalidades_a_vencer: %d SMS enviado(s).', notificadas
+        '%s: %d SMS enviado(s), %d falhado(s) em %d lote(s).',
+        origem, enviadas, falhadas, len(resultados),
     )
-    return {'notificadas': notificadas}
+    return {'origem': origem, 'enviadas': enviadas, 'falhadas': falhadas}
 
 
 @shared_task(name='financeiro.tasks.notificar_folhas_pendentes')
@@ -11,7 +11,7 @@ Executar:
 import datetime
 from io import StringIO
 from decimal import Decimal
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from rest_framework import status
 from django.core.management import call_command
 from django.core.exceptions import ValidationError
@@ -21,6 +21,7 @@ from tests.factories import (
     criar_aluno,
     criar_categoria,
     criar_config_financeira,
+    criar_encarregado,
     criar_funcionario,
     criar_mensalidade,
     criar_motorista,
@@ -77,6 +78,68 @@ class ConfiguracaoFinanceiraTests(TestCase):
         self.assertTrue(ConfiguracaoFinanceira.objects.filter(pk=pk).exists())
 
 
+class ConfiguracaoFinanceiraCacheTests(TransactionTestCase):
+    """
+    Cache local do get_solo com carimbo de versão. TransactionTestCase:
+    a cópia local só é preenchida fora de transacções.
+    """
+
+    def setUp(self):
+        from financeiro.models import ConfiguracaoFinanceira
+        criar_config_financeira()
+        ConfiguracaoFinanceira.limpar_cache_local()
+
+    def test_segunda_leitura_nao_faz_queries(self):
+        from financeiro.models import ConfiguracaoFinanceira
+        ConfiguracaoFinanceira.get_solo()
+        with self.assertNumQueries(0):
+            ConfiguracaoFinanceira.get_solo()
+
+    def test_save_invalida_cache(self):
+        from financeiro.models import ConfiguracaoFinanceira
+        cfg = ConfiguracaoFinanceira.get_solo()
+        cfg.valor_multa_fixa = Decimal('750.00')
+        cfg.save()
+        self.assertEqual(ConfiguracaoFinanceira.get_solo().valor_multa_fixa, Decimal('750.00'))
+
+    def test_nova_versao_no_redis_invalida_copia_local(self):
+        from django.core.cache import cache
+        from financeiro.models import ConfiguracaoFinanceira
+        ConfiguracaoFinanceira.get_solo()
+        # Outro worker gravou a configuração: linha alterada e versão incrementada
+        ConfiguracaoFinanceira.objects.filter(pk=1).update(valor_multa_fixa=Decimal('900.00'))
+        cache.incr(ConfiguracaoFinanceira.CACHE_VERSAO_KEY)
+        ConfiguracaoFinanceira._cache_local['verificado_em'] = 0.0
+
+        self.assertEqual(ConfiguracaoFinanceira.get_solo().valor_multa_fixa, Decimal('900.00'))
+
+    def test_alterar_copia_devolvida_nao_afecta_cache(self):
+        from financeiro.models import ConfiguracaoFinanceira
+        ConfiguracaoFinanceira.get_solo().valor_multa_fixa = Decimal('1.00')
+        self.assertEqual(ConfiguracaoFinanceira.get_solo().valor_multa_fixa, Decimal('500.00'))
+
+    def test_rollback_nao_deixa_configuracao_revertida_na_cache(self):
+        from django.db import transaction
+        from financeiro.models import ConfiguracaoFinanceira
+        cfg = ConfiguracaoFinanceira.get_solo()
+        try:
+            with transaction.atomic():
+                cfg.valor_multa_fixa = Decimal('750.00')
+                cfg.save()
+                self.assertEqual(ConfiguracaoFinanceira.get_solo().valor_multa_fixa, Decimal('750.00'))
+                raise RuntimeError('revertido')
+        except RuntimeError:
+            pass
+        self.assertEqual(ConfiguracaoFinanceira.get_solo().valor_multa_fixa, Decimal('500.00'))
+
+    def test_leitura_dentro_de_transaccao_nao_preenche_a_cache(self):
+        from django.db import transaction
+        from financeiro.models import ConfiguracaoFinanceira
+        with transaction.atomic():
+            ConfiguracaoFinanceira.get_solo()
+        self.assertIsNone(ConfiguracaoFinanceira._cache_local['obj'])
+
+
 class TransacaoTests(TestCase):
 
     def setUp(self):
@@ -264,6 +327,404 @@ class MensalidadeManagerTests(TestCase):
         self.assertGreaterEqual(total, Decimal('0.00'))
 
 
+class ConsultaPorMesTests(TestCase):
+    """Filtro mensal por intervalo semiaberto (do_mes)."""
+
+    def test_intervalo_mes_dezembro_passa_ao_ano_seguinte(self):
+        from financeiro.models import intervalo_mes
+        self.assertEqual(
+            intervalo_mes(12, 2030),
+            (datetime.date(2030, 12, 1), datetime.date(2031, 1, 1)),
+        )
+
+    def test_do_mes_usa_intervalo_e_nao_extract(self):
+        from financeiro.models import Mensalidade
+        sql = str(Mensalidade.objects.do_mes(3, 2030).query)
+        self.assertIn('2030-03-01', sql)
+        self.assertIn('2030-04-01', sql)
+        self.assertNotIn('EXTRACT', sql.upper())
+        self.assertNotIn('DJANGO_DATE_EXTRACT', sql.upper())
+
+    def test_do_mes_limites(self):
+        from financeiro.models import DespesaGeral
+        cat = criar_categoria('Água', 'DESPESA')
+        for dia in (datetime.date(2030, 2, 28), datetime.date(2030, 3, 1),
+                    datetime.date(2030, 3, 31), datetime.date(2030, 4, 1)):
+            DespesaGeral.objects.create(
+                descricao=str(dia), valor=Decimal('10.00'), data_vencimento=dia, categoria=cat,
+            )
+        self.assertEqual(
+            sorted(DespesaGeral.objects.do_mes(3, 2030).values_list('descricao', flat=True)),
+            ['2030-03-01', '2030-03-31'],
+        )
+
+
+class GerarMensalidadesEmLoteTests(TestCase):
+    """Motor set-based do MensalidadeManager.gerar_mensalidades_mes."""
+
+    def setUp(self):
+        criar_config_financeira()
+        self.alunos = [self._criar_aluno(i) for i in range(5)]
+        self.mes_ref = datetime.date(datetime.date.today().year + 1, 3, 1)
+
+    def _criar_aluno(self, i):
+        enc = criar_encarregado(user=criar_user(role='ENCARREGADO', email=f'enc_lote{i}@teste.co.mz'))
+        return criar_aluno(
+            encarregado=enc,
+            user=criar_user(role='ALUNO', email=f'aluno_lote{i}@teste.co.mz'),
+            mensalidade=Decimal('2000.00') + i,
+        )
+
+    def test_gera_uma_por_aluno_com_valor_do_aluno(self):
+        from financeiro.models import Mensalidade
+        criadas = Mensalidade.objects.gerar_mensalidades_mes(self.mes_ref.month, self.mes_ref.year)
+        self.assertEqual(criadas, 5)
+        for aluno in self.alunos:
+            m = Mensalidade.objects.get(aluno=aluno, mes_referente=self.mes_ref)
+            self.assertEqual(m.valor_base, aluno.mensalidade)
+            self.assertEqual(m.estado, 'PENDENTE')
+
+    def test_nr_fatura_preenchido_e_unico(self):
+        from financeiro.models import Mensalidade
+        Mensalidade.objects.gerar_mensalidades_mes(self.mes_ref.month, self.mes_ref.year, tamanho_lote=2)
+        faturas = list(
+            Mensalidade.objects.filter(mes_referente=self.mes_ref).values_list('nr_fatura', flat=True)
+        )
+        self.assertEqual(len(faturas), 5)
+        self.assertEqual(len(set(faturas)), 5)
+        self.assertTrue(all(f.startswith(f"FAT-{self.mes_ref.strftime('%Y%m')}-") for f in faturas))
+
+    def test_callback_recebe_um_evento_por_lote(self):
+        from financeiro.models import Mensalidade
+        lotes = []
+        Mensalidade.objects.gerar_mensalidades_mes(
+            self.mes_ref.month, self.mes_ref.year,
+            tamanho_lote=2,
+            ao_concluir_lote=lambda i, n, s: lotes.append((i, n)),
+        )
+        self.assertEqual(lotes, [(1, 2), (2, 2), (3, 1)])
+
+    def test_segunda_execucao_nao_duplica(self):
+        from financeiro.models import Mensalidade
+        Mensalidade.objects.gerar_mensalidades_mes(self.mes_ref.month, self.mes_ref.year)
+        self.assertEqual(
+            Mensalidade.objects.gerar_mensalidades_mes(self.mes_ref.month, self.mes_ref.year), 0
+        )
+
+    def test_numero_de_queries_nao_cresce_com_alunos(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from financeiro.models import Mensalidade
+
+        with CaptureQueriesContext(connection) as ctx:
+            Mensalidade.objects.gerar_mensalidades_mes(self.mes_ref.month, self.mes_ref.year)
+        # SELECT dos alunos + INSERT do lote + recálculo do ResumoFinanceiroMensal
+        # (+ savepoints) — constante, independente do nº de alunos
+        self.assertLessEqual(len(ctx.captured_queries), 15)
+
+
+class AplicarMultasEmLoteTests(TestCase):
+    """Motor set-based do MensalidadeManager.aplicar_multas_em_lote."""
+
+    def setUp(self):
+        from financeiro.models import Mensalidade
+        criar_config_financeira()
+        self.hoje = datetime.date(2030, 6, 5)
+        self.alunos = [self._criar_aluno(i) for i in range(3)]
+        # Remove as mensalidades do mês corrente geradas pelo signal do Aluno
+        Mensalidade.objects.all().delete()
+
+    def _criar_aluno(self, i):
+        enc = criar_encarregado(user=criar_user(role='ENCARREGADO', email=f'enc_multa{i}@teste.co.mz'))
+        return criar_aluno(
+            encarregado=enc,
+            user=criar_user(role='ALUNO', email=f'aluno_multa{i}@teste.co.mz'),
+        )
+
+    def _mensalidade(self, aluno, mes_referente, **kwargs):
+        from financeiro.models import Mensalidade
+        kwargs.setdefault('valor_base', Decimal('2500.00'))
+        return Mensalidade.objects.create(aluno=aluno, mes_referente=mes_referente, **kwargs)
+
+    def test_aplica_apenas_apos_data_limite(self):
+        vencida = self._mensalidade(self.alunos[0], datetime.date(2030, 5, 1))
+        no_prazo = self._mensalidade(self.alunos[1], datetime.date(2030, 6, 1))
+
+        from financeiro.models import Mensalidade
+        ids = Mensalidade.objects.aplicar_multas_em_lote(hoje=self.hoje)
+
+        self.assertEqual(ids, [vencida.pk])
+        vencida.refresh_from_db()
+        no_prazo.refresh_from_db()
+        self.assertEqual(vencida.multa_atraso, Decimal('500.00'))
+        self.assertEqual(vencida.estado, 'ATRASADO')
+        self.assertEqual(no_prazo.multa_atraso, Decimal('0.00'))
+
+    def test_ignora_pagas_isentas_e_ja_multadas(self):
+        from financeiro.models import Mensalidade
+        mes = datetime.date(2030, 4, 1)
+        self._mensalidade(self.alunos[0], mes, estado='PAGO', valor_pago_acumulado=Decimal('2500.00'))
+        self._mensalidade(self.alunos[1], mes, estado='ISENTO')
+        self._mensalidade(self.alunos[2], mes, multa_atraso=Decimal('500.00'))
+
+        self.assertEqual(Mensalidade.objects.aplicar_multas_em_lote(hoje=self.hoje), [])
+
+    def test_pagamento_parcial_mantem_pago_parcial(self):
+        from financeiro.models import Mensalidade
+        m = self._mensalidade(
+            self.alunos[0], datetime.date(2030, 5, 1),
+            estado='PAGO_PARCIAL', valor_pago_acumulado=Decimal('1000.00'),
+        )
+        Mensalidade.objects.aplicar_multas_em_lote(hoje=self.hoje)
+        m.refresh_from_db()
+        self.assertEqual(m.estado, 'PAGO_PARCIAL')
+        self.assertEqual(m.saldo_devedor, Decimal('2000.00'))
+
+    def test_filtro_por_mes(self):
+        from financeiro.models import Mensalidade
+        abril = self._mensalidade(self.alunos[0], datetime.date(2030, 4, 1))
+        self._mensalidade(self.alunos[0], datetime.date(2030, 5, 1))
+
+        ids = Mensalidade.objects.aplicar_multas_em_lote(4, 2030, hoje=self.hoje)
+        self.assertEqual(ids, [abril.pk])
+
+    def test_queries_proporcionais_ao_numero_de_meses(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from financeiro.models import Mensalidade
+
+        for aluno in self.alunos:
+            self._mensalidade(aluno, datetime.date(2030, 4, 1))
+            self._mensalidade(aluno, datetime.date(2030, 5, 1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            ids = Mensalidade.objects.aplicar_multas_em_lote(hoje=self.hoje)
+
+        self.assertEqual(len(ids), 6)
+        # meses distintos + (SELECT ids + UPDATE + recálculo do resumo) por mês
+        # (+ savepoints) — independente do nº de mensalidades
+        self.assertLessEqual(len(ctx.captured_queries), 18)
+
+
+class ResumoFinanceiroMensalTests(TestCase):
+    """Agregados mensais mantidos pelos signals."""
+
+    def setUp(self):
+        from financeiro.models import Mensalidade
+        criar_config_financeira()
+        self.mes = datetime.date(2031, 2, 1)
+        enc = criar_encarregado(user=criar_user(role='ENCARREGADO', email='enc_resumo@teste.co.mz'))
+        self.aluno = criar_aluno(
+            encarregado=enc,
+            user=criar_user(role='ALUNO', email='aluno_resumo@teste.co.mz'),
+        )
+        # O recálculo corre depois do commit — que o TestCase nunca faz
+        with self.captureOnCommitCallbacks(execute=True):
+            self.m = Mensalidade.objects.create(
+                aluno=self.aluno, mes_referente=self.mes, valor_base=Decimal('2500.00'),
+            )
+
+    def _resumo(self):
+        from financeiro.models import ResumoFinanceiroMensal
+        return ResumoFinanceiroMensal.objects.get(mes_referencia=self.mes)
+
+    def test_criar_mensalidade_actualiza_resumo(self):
+        resumo = self._resumo()
+        self.assertEqual(resumo.total_previsto, Decimal('2500.00'))
+        self.assertEqual(resumo.total_em_divida, Decimal('2500.00'))
+        self.assertEqual(resumo.qtd_pendentes, 1)
+
+    def test_pagamento_actualiza_resumo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.m.registrar_pagamento(Decimal('1000.00'), 'DINHEIRO')
+        resumo = self._resumo()
+        self.assertEqual(resumo.total_recebido, Decimal('1000.00'))
+        self.assertEqual(resumo.total_em_divida, Decimal('1500.00'))
+        self.assertEqual(resumo.qtd_parciais, 1)
+
+    def test_despesa_geral_paga_entra_no_resumo(self):
+        from financeiro.models import DespesaGeral
+        with self.captureOnCommitCallbacks(execute=True):
+            d = DespesaGeral.objects.create(
+                descricao='Renda', valor=Decimal('8000.00'),
+                data_vencimento=self.mes.replace(day=15),
+                categoria=criar_categoria('Renda', 'DESPESA'),
+            )
+        self.assertEqual(self._resumo().total_despesas_gerais, Decimal('0.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            d.registrar_pagamento()
+        self.assertEqual(self._resumo().total_despesas_gerais, Decimal('8000.00'))
+
+    def test_leitores_nao_agregam_mensalidades(self):
+        from financeiro.models import Mensalidade
+        from financeiro.services import resumo_financeiro_mes
+        with self.assertNumQueries(1):
+            resumo = resumo_financeiro_mes(self.mes.month, self.mes.year)
+        self.assertEqual(resumo['total_divida'], Decimal('2500.00'))
+        with self.assertNumQueries(1):
+            Mensalidade.objects.total_devedor_mes(self.mes.month, self.mes.year)
+
+    def test_comando_reconstroi_resumo_desactualizado(self):
+        from financeiro.models import Mensalidade
+        Mensalidade.objects.filter(pk=self.m.pk).update(valor_base=Decimal('3000.00'))
+        self.assertEqual(self._resumo().total_previsto, Decimal('2500.00'))
+
+        call_command('reconstruir_resumos_mensais', stdout=StringIO())
+        self.assertEqual(self._resumo().total_previsto, Decimal('3000.00'))
+
+    def test_recalculo_so_depois_do_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.m.registrar_pagamento(Decimal('1000.00'), 'DINHEIRO')
+            # Dentro da transacção o resumo ainda tem os totais anteriores
+            self.assertEqual(self._resumo().total_recebido, Decimal('0.00'))
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self.assertEqual(self._resumo().total_recebido, Decimal('1000.00'))
+
+    def test_varias_escritas_na_transaccao(self):
+        from financeiro.models import Mensalidade, ResumoFinanceiroMensal
+        with self.captureOnCommitCallbacks(execute=True):
+            for valor in ('500.00', '500.00', '500.00'):
+                self.m.refresh_from_db()
+                self.m.registrar_pagamento(Decimal(valor), 'DINHEIRO')
+            Mensalidade.objects.create(
+                aluno=self.aluno, mes_referente=self.mes.replace(month=3),
+                valor_base=Decimal('2500.00'),
+            )
+        self.assertEqual(self._resumo().total_recebido, Decimal('1500.00'))
+        marco = ResumoFinanceiroMensal.objects.get(mes_referencia=self.mes.replace(month=3))
+        self.assertEqual(marco.total_previsto, Decimal('2500.00'))
+
+    def test_mudar_de_mes_recalcula_o_mes_antigo(self):
+        from financeiro.models import DespesaGeral, FolhaPagamento, Funcionario, ResumoFinanceiroMensal
+        user = criar_user(role='MOTORISTA', email='mot_resumo@teste.co.mz')
+        funcionario = Funcionario.objects.create(
+            user=user, nuit='123456789', salario_base=Decimal('15000.00'),
+            motorista_perfil=criar_motorista(user=user),
+        )
+        marco = self.mes.replace(month=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            despesa = DespesaGeral.objects.create(
+                descricao='Renda', valor=Decimal('8000.00'), pago=True,
+                data_vencimento=self.mes.replace(day=15),
+                categoria=criar_categoria('Renda', 'DESPESA'),
+            )
+            folha = FolhaPagamento.objects.create(
+                funcionario=funcionario, mes_referente=self.mes,
+                valor_total=Decimal('15000.00'), status='PAGO',
+            )
+        self.assertEqual(self._resumo().total_despesas_gerais, Decimal('8000.00'))
+        self.assertEqual(self._resumo().total_folha_salarial, Decimal('15000.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            despesa.data_vencimento = marco.replace(day=15)
+            despesa.save()
+            folha.mes_referente = marco
+            folha.save()
+
+        self.assertEqual(self._resumo().total_despesas_gerais, Decimal('0.00'))
+        self.assertEqual(self._resumo().total_folha_salarial, Decimal('0.00'))
+        resumo_marco = ResumoFinanceiroMensal.objects.get(mes_referencia=marco)
+        self.assertEqual(resumo_marco.total_despesas_gerais, Decimal('8000.00'))
+        self.assertEqual(resumo_marco.total_folha_salarial, Decimal('15000.00'))
+
+
+@override_settings(SMS_BACKEND='local', SMS_TAMANHO_LOTE=2)
+class PipelineSmsEmLoteTests(TestCase):
+    """Pipeline de SMS: lotes em chord, gateway local e log em bulk_create."""
+
+    def setUp(self):
+        from app.celery import app
+        from core.sms import gateway_local
+        from financeiro.models import Mensalidade
+
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', eager)
+        gateway_local.limpar()
+        self.gateway = gateway_local
+
+        criar_config_financeira()
+        self.mensalidades = []
+        for i in range(3):
+            enc = criar_encarregado(
+                user=criar_user(role='ENCARREGADO', email=f'enc_sms{i}@teste.co.mz'),
+                telefone=f'+25884123456{i}',
+            )
+            aluno = criar_aluno(
+                encarregado=enc,
+                user=criar_user(role='ALUNO', email=f'aluno_sms{i}@teste.co.mz', nome=f'Aluno {i}'),
+            )
+            Mensalidade.objects.filter(aluno=aluno).delete()
+            self.mensalidades.append(Mensalidade.objects.create(
+                aluno=aluno, mes_referente=datetime.date(2030, 1, 1),
+                valor_base=Decimal('2500.00'), estado='ATRASADO',
+            ))
+
+    def test_notificar_atraso_divide_em_lotes_e_regista_log(self):
+        from financeiro.models import LogNotificacoes
+        from financeiro.tasks import notificar_mensalidades_atraso
+
+        resultado = notificar_mensalidades_atraso()
+
+        self.assertEqual(resultado, {'notificadas': 3, 'mensalidades': 3, 'lotes': 2})
+        self.assertEqual(len(self.gateway.enviados), 3)
+        self.assertEqual(LogNotificacoes.objects.filter(tipo='SMS', sucesso=True).count(), 3)
+
+    def test_mesmo_texto_partilha_um_pedido_ao_gateway(self):
+        from financeiro.models import LogNotificacoes
+        from financeiro.tasks import enviar_lote_sms
+
+        itens = [
+            {'mensalidade_ids': [m.pk], 'destino': str(m.aluno.encarregado.telefone), 'mensagem': 'Aviso geral'}
+            for m in self.mensalidades
+        ]
+        with self.assertNumQueries(1):
+            resultado = enviar_lote_sms(itens)
+
+        self.assertEqual(resultado, {'enviadas': 3, 'falhadas': 0})
+        self.assertEqual(len(self.gateway.enviados), 1)
+        self.assertEqual(len(self.gateway.enviados[0]['recipients']), 3)
+        self.assertEqual(LogNotificacoes.objects.count(), 3)
+
+    def test_numero_invalido_fica_registado_como_falha(self):
+        from financeiro.models import LogNotificacoes
+        from financeiro.tasks import enviar_lote_sms
+
+        m = self.mensalidades[0]
+        resultado = enviar_lote_sms([{'mensalidade_ids': [m.pk], 'destino': '12345', 'mensagem': 'x'}])
+
+        self.assertEqual(resultado, {'enviadas': 0, 'falhadas': 1})
+        self.assertEqual(self.gateway.enviados, [])
+        self.assertFalse(LogNotificacoes.objects.get(mensalidade=m).sucesso)
+
+    def test_encarregado_com_varios_educandos_recebe_um_sms(self):
+        from financeiro.models import LogNotificacoes, Mensalidade
+        from financeiro.tasks import notificar_mensalidades_atraso
+
+        enc = self.mensalidades[0].aluno.encarregado
+        for i in range(3):
+            irmao = criar_aluno(
+                encarregado=enc,
+                user=criar_user(role='ALUNO', email=f'irmao_sms{i}@teste.co.mz', nome=f'Irmao {i}'),
+            )
+            Mensalidade.objects.filter(aluno=irmao).update(estado='ATRASADO')
+
+        resultado = notificar_mensalidades_atraso()
+
+        self.assertEqual(resultado['notificadas'], 3)
+        self.assertEqual(resultado['mensalidades'], 6)
+        para_enc = [e for e in self.gateway.enviados if str(enc.telefone) in e['recipients']]
+        # Mensagem agregada com 4 mensalidades excede 160 caracteres → segmentos
+        self.assertGreater(len(para_enc), 1)
+        self.assertTrue(all(len(e['message']) <= 160 for e in para_enc))
+        self.assertTrue(para_enc[0]['message'].startswith('(1/'))
+        self.assertEqual(
+            LogNotificacoes.objects.filter(destino=str(enc.telefone), sucesso=True).count(), 4
+        )
+
+
 # ══════════════════════════════════════════════
 # RECIBO
 # ══════════════════════════════════════════════
@@ -291,6 +752,178 @@ class ReciboTests(TestCase):
         self.assertEqual(Recibo.objects.filter(mensalidade=m).count(), 1)
 
 
+@override_settings(SMS_BACKEND='local')
+class ReciboAssincronoTests(BaseAPITestCase):
+    """O pagamento só reserva o recibo; o PDF é gerado uma vez, no Celery, após o commit."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        from app.celery import app
+        from financeiro.models import Mensalidade
+
+        super().setUp()
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', eager)
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        media_override = self.settings(MEDIA_ROOT=media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        criar_config_financeira()
+        criar_categoria('Mensalidade', 'RECEITA')
+        self.autenticar_como_gestor(email='gestor_recibo@teste.co.mz')
+        aluno = criar_aluno(
+            mensalidade=Decimal('2500.00'),
+            encarregado=criar_encarregado(
+                user=criar_user(role='ENCARREGADO', email='enc_recibo@teste.co.mz'),
+            ),
+            user=criar_user(role='ALUNO', email='aluno_recibo@teste.co.mz'),
+        )
+        Mensalidade.objects.filter(aluno=aluno).delete()
+        self.mensalidade = Mensalidade.objects.create(
+            aluno=aluno, mes_referente=datetime.date(2030, 1, 1),
+            valor_base=Decimal('2500.00'),
+        )
+
+    def _pagar(self):
+        return self.client.post(
+            f'/api/v1/mensalidades/{self.mensalidade.pk}/pagar/',
+            {'valor': '2500.00', 'metodo': 'TRANSFERENCIA'},
+        )
+
+    def test_pagamento_so_reserva_recibo_e_agenda_pdf(self):
+        from unittest.mock import patch
+        from financeiro.models import Recibo
+
+        with patch('financeiro.pdf_utils.gerar_pdf_recibo') as render:
+            with self.captureOnCommitCallbacks() as callbacks:
+                resp = self._pagar()
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            render.assert_not_called()
+
+        recibo = Recibo.objects.get(mensalidade=self.mensalidade)
+        self.assertTrue(recibo.codigo_recibo.startswith('REC-'))
+        self.assertFalse(recibo.arquivo)
+        self.assertTrue(callbacks)
+
+    def test_recibo_devolve_202_ate_existir_ficheiro(self):
+        url = f'/api/v1/mensalidades/{self.mensalidade.pk}/recibo/'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._pagar()
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIn('codigo_recibo', resp.data)
+
+        for callback in callbacks:
+            callback()
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'application/pdf')
+
+    def test_pdf_renderizado_uma_unica_vez(self):
+        from unittest.mock import patch
+        from financeiro.models import Recibo
+        from financeiro.tasks import gerar_pdf_recibo_task
+
+        with patch('financeiro.pdf_utils.gerar_pdf_recibo', return_value=b'%PDF-1.4') as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                self._pagar()
+            recibo = Recibo.objects.get(mensalidade=self.mensalidade)
+            gerar_pdf_recibo_task.delay(recibo.pk)
+
+        self.assertEqual(render.call_count, 1)
+        recibo.refresh_from_db()
+        self.assertTrue(recibo.arquivo.name.endswith('.pdf'))
+
+
+class RenderizadorReciboTests(TestCase):
+    """Renderizador partilhado, geração em lote e benchmark."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        from financeiro.models import Mensalidade, Recibo
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        media_override = self.settings(MEDIA_ROOT=media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        criar_config_financeira()
+        self.recibos = []
+        for i in range(3):
+            aluno = criar_aluno(
+                encarregado=criar_encarregado(
+                    user=criar_user(role='ENCARREGADO', email=f'enc_pdf{i}@teste.co.mz'),
+                ),
+                user=criar_user(role='ALUNO', email=f'aluno_pdf{i}@teste.co.mz'),
+            )
+            Mensalidade.objects.filter(aluno=aluno).delete()
+            m = Mensalidade.objects.create(
+                aluno=aluno, mes_referente=datetime.date(2030, 1, 1),
+                valor_base=Decimal('2500.00'), valor_pago_acumulado=Decimal('2500.00'),
+                estado='PAGO',
+            )
+            self.recibos.append(Recibo.objects.create(mensalidade=m))
+
+    def test_renderizador_partilhado_gera_pdf(self):
+        from financeiro.pdf_utils import gerar_pdf_recibo, obter_renderizador
+
+        self.assertIs(obter_renderizador(), obter_renderizador())
+        recibo = self.recibos[0]
+        self.assertTrue(gerar_pdf_recibo(recibo.mensalidade, recibo).startswith(b'%PDF'))
+
+    def test_lote_gera_so_os_pendentes(self):
+        from django.core.files.base import ContentFile
+        from financeiro.tasks import gerar_pdfs_recibos_lote
+
+        self.recibos[0].arquivo.save('existente.pdf', ContentFile(b'%PDF'), save=True)
+        out = StringIO()
+        call_command('gerar_recibos_pendentes', '--sincrono', '--lote', '1', stdout=out)
+
+        self.assertIn('2 recibo(s) pendente(s) em 2 lote(s)', out.getvalue())
+        for recibo in self.recibos:
+            recibo.refresh_from_db()
+            self.assertTrue(recibo.arquivo.name.endswith('.pdf'))
+        self.assertEqual(
+            gerar_pdfs_recibos_lote([r.pk for r in self.recibos]),
+            {'gerados': 0, 'erros': 0},
+        )
+
+    def test_erro_de_bd_num_recibo_nao_afecta_o_lote(self):
+        from unittest.mock import patch
+        from financeiro.models import Recibo
+        from financeiro.tasks import gerar_pdfs_recibos_lote
+
+        gerar_arquivo = Recibo.gerar_arquivo
+        primeiro = min(r.pk for r in self.recibos)
+
+        def falhar_no_primeiro(recibo):
+            if recibo.pk == primeiro:
+                # Segundo recibo para a mesma mensalidade: IntegrityError
+                Recibo.objects.create(mensalidade=recibo.mensalidade)
+            return gerar_arquivo(recibo)
+
+        with patch.object(Recibo, 'gerar_arquivo', autospec=True, side_effect=falhar_no_primeiro):
+            resultado = gerar_pdfs_recibos_lote([r.pk for r in self.recibos])
+
+        self.assertEqual(resultado, {'gerados': 2, 'erros': 1})
+        for recibo in self.recibos:
+            recibo.refresh_from_db()
+            self.assertEqual(bool(recibo.arquivo), recibo.pk != primeiro)
+
+    def test_benchmark_reporta_recibos_por_segundo(self):
+        out = StringIO()
+        call_command('benchmark_recibos', '--n', '2', stdout=out)
+        self.assertIn('recibos/s', out.getvalue())
+
+
 # ══════════════════════════════════════════════
 # SIGNAL — MENSALIDADE AUTOMÁTICA AO CRIAR ALUNO
 # ══════════════════════════════════════════════
@@ -363,6 +996,85 @@ class MensalidadeAPITests(BaseAPITestCase):
         self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class DespesasPendentesStreamTests(BaseAPITestCase):
+    """GET /despesas-gerais/pendentes/ — array JSON escrito aos lotes."""
+
+    def setUp(self):
+        super().setUp()
+        from financeiro.models import DespesaGeral
+        self.autenticar_como_gestor(email='gestor_stream@teste.co.mz')
+        cat = criar_categoria('Água', 'DESPESA')
+        self.pendentes = [
+            DespesaGeral.objects.create(
+                descricao=f'Despesa {i}', valor=Decimal('10.00'),
+                data_vencimento=datetime.date(2030, 3, i + 1), categoria=cat,
+            )
+            for i in range(5)
+        ]
+        DespesaGeral.objects.filter(pk=self.pendentes[0].pk).update(pago=True)
+
+    def _json(self, resp):
+        import json
+        return json.loads(b''.join(resp.streaming_content))
+
+    def test_pendentes_em_stream(self):
+        resp = self.client.get('/api/v1/despesas-gerais/pendentes/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp['Content-Type'], 'application/json')
+        self.assertEqual(
+            sorted(d['id'] for d in self._json(resp)),
+            sorted(d.pk for d in self.pendentes[1:]),
+        )
+
+    def test_lotes_pequenos_dao_o_mesmo_array(self):
+        from core.streaming import resposta_json_em_stream
+        from financeiro.models import DespesaGeral
+        from financeiro.serializers import DespesaGeralSerializer
+        qs = DespesaGeral.objects.select_related('categoria').order_by('pk')
+
+        with self.assertNumQueries(1):  # um só SELECT, lido aos lotes de 2
+            dados = self._json(resposta_json_em_stream(qs, DespesaGeralSerializer, tamanho_lote=2))
+        self.assertEqual(dados, self._json(resposta_json_em_stream(qs, DespesaGeralSerializer)))
+        self.assertEqual(len(dados), 5)
+
+    def test_queryset_vazio_da_array_vazio(self):
+        from core.streaming import resposta_json_em_stream
+        from financeiro.models import DespesaGeral
+        from financeiro.serializers import DespesaGeralSerializer
+        resp = resposta_json_em_stream(DespesaGeral.objects.none(), DespesaGeralSerializer)
+        self.assertEqual(self._json(resp), [])
+
+
+class ResumoMesParametrosTests(BaseAPITestCase):
+    """?mes fora de 1-12 dá 400 nos resumos mensais (e não um 500)."""
+
+    def setUp(self):
+        super().setUp()
+        self.autenticar_como_gestor(email='gestor_resumo_mes@teste.co.mz')
+
+    def test_resumo_mensalidades_mes_invalido(self):
+        for mes in ('0', '13'):
+            resp = self.client.get('/api/v1/mensalidades/resumo-mes/', {'mes': mes, 'ano': '2030'})
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('erro', resp.data)
+
+    def test_resumo_folhas_mes_invalido(self):
+        for mes in ('0', '13'):
+            resp = self.client.get('/api/v1/folhas/resumo-mes/', {'mes': mes, 'ano': '2030'})
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_resumo_folhas_mes_valido_sem_folhas(self):
+        resp = self.client.get('/api/v1/folhas/resumo-mes/', {'mes': '12', 'ano': '2030'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['qtd_pago'], 0)
+
+    def test_resumo_mensalidades_mes_valido(self):
+        resp = self.client.get('/api/v1/mensalidades/resumo-mes/', {'mes': '3', 'ano': '2030'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['mes'], '03/2030')
+
+
 # ══════════════════════════════════════════════
 # API — DASHBOARD
 # ══════════════════════════════════════════════
@@ -1,7 +1,7 @@
 from datetime import date
 from decimal import Decimal
 from django.db.models import Sum
-from financeiro.models import Transacao, Mensalidade
+from financeiro.models import ResumoFinanceiroMensal, Transacao
 
 
 class FinanceiroService:
@@ -16,26 +16,17 @@ class FinanceiroService:
         receitas = Transacao.objects.filter(
             categoria__tipo='RECEITA',
             status='PAGO',
-            data_pagamento__month=mes,
-            data_pagamento__year=ano
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+        ).do_mes(mes, ano, campo='data_pagamento').aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
 
         # 2. Total de Despesas (Folhas de Pagamento confirmadas no mês)
         despesas = Transacao.objects.filter(
             categoria__tipo='DESPESA',
             status='PAGO',
-            data_pagamento__month=mes,
-            data_pagamento__year=ano
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+        ).do_mes(mes, ano, campo='data_pagamento').aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
 
         # 3. Previsão de Receita (O que ainda está PENDENTE ou ATRASADO)
         # Útil para saber quanto dinheiro ainda deve entrar
-        previsao_entrada = Mensalidade.objects.filter(
-            mes_referente__month=mes,
-            mes_referente__year=ano
-        ).exclude(estado='PAGO').aggregate(
-            total=Sum('valor_base')
-        )['total'] or Decimal('0.00')
+        previsao_entrada = ResumoFinanceiroMensal.obter(mes, ano).total_por_receber
 
         saldo_atual = receitas - despesas
 
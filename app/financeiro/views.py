@@ -17,7 +17,6 @@ ViewSets:
 
 from datetime import date
 
-from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Count, Q, Sum
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -32,10 +31,13 @@ from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 
+from core.pagination import MensalidadePagination, TransacaoPagination
 from core.permissions import (
     IsGestor,
     PodeLerMensalidade,
+    filtrar_por_role,
 )
+from core.streaming import resposta_json_em_stream
 from rest_framework.response import Response
 
 from financeiro.models import (
@@ -143,9 +145,12 @@ class TransacaoViewSet(viewsets.ModelViewSet):
     GET    /transacoes/resumo/         → totais por tipo e status
     GET    /transacoes/em-atraso/      → transacções vencidas não pagas
     GET    /transacoes/por-aluno/      → receitas de um aluno específico
+
+    A lista é paginada por cursor (?cursor=...); ?contar=1 inclui o total.
     """
 
     permission_classes = [IsAuthenticated]
+    pagination_class   = TransacaoPagination
     filter_backends    = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class    = TransacaoFilter
     search_fields      = ['descricao', 'aluno__user__nome']
@@ -327,15 +332,18 @@ class MensalidadeViewSet(viewsets.ModelViewSet):
     GET    /mensalidades/{id}/                 → detalhe completo
     PUT/PATCH /mensalidades/{id}/              → editar (admin)
     DELETE /mensalidades/{id}/                 → eliminar (admin, só PENDENTE)
-    GET    /mensalidades/do-mes/               → mensalidades de um mês (?mes=M&ano=A)
-    GET    /mensalidades/em-atraso/            → mensalidades atrasadas
+    GET    /mensalidades/do-mes/               → mensalidades de um mês (?mes=M&ano=A, stream)
+    GET    /mensalidades/em-atraso/            → mensalidades atrasadas (stream)
     POST   /mensalidades/{id}/pagar/           → registar pagamento
     POST   /mensalidades/{id}/aplicar-multa/   → aplicar multa
     POST   /mensalidades/gerar/                → gerar mensalidades em massa
     GET    /mensalidades/resumo-mes/           → contagem por estado (?mes=M&ano=A)
+
+    A lista é paginada por cursor (?cursor=...); ?contar=1 inclui o total.
     """
 
     permission_classes = [IsAuthenticated]
+    pagination_class = MensalidadePagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = MensalidadeFilter
     search_fields = ['aluno__user__nome', 'nr_fatura']
@@ -343,33 +351,14 @@ class MensalidadeViewSet(viewsets.ModelViewSet):
     ordering = ['-mes_referente']
 
     def get_queryset(self):
-        user = self.request.user
-
         qs = (
             Mensalidade.objects
             .select_related('aluno__user', 'aluno__encarregado__user')
             .prefetch_related('recibo_emitido')
         )
-
-        # Utilizador anónimo ou sem autenticação — devolve queryset vazio
-        # (o drf-spectacular usa AnonymousUser ao gerar o schema)
-        if not user or not user.is_authenticated:
-            return qs.none()
-
-        # Encarregados vêem apenas as mensalidades dos seus alunos
-        try:
-            encarregado = user.perfil_encarregado
-            return qs.filter(aluno__encarregado=encarregado)
-        except (ObjectDoesNotExist, AttributeError):
-            pass
-
-        try:
-            aluno = user.perfil_aluno
-            return qs.filter(aluno=aluno)
-        except (ObjectDoesNotExist, AttributeError):
-            pass
-
-        return qs
+        # Encarregado: mensalidades dos seus alunos; aluno: as suas.
+        # Anónimos (drf-spectacular) recebem um queryset vazio.
+        return filtrar_por_role(qs, self.request)
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -416,19 +405,14 @@ class MensalidadeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        qs = self.get_queryset().filter(
-            mes_referente__month=mes,
-            mes_referente__year=ano,
-        )
-        serializer = MensalidadeListSerializer(qs, many=True)
-        return Response(serializer.data)
+        qs = self.get_queryset().do_mes(mes, ano)
+        return resposta_json_em_stream(qs, MensalidadeListSerializer, context=self.get_serializer_context())
 
     @action(detail=False, methods=['get'], url_path='em-atraso')
     def em_atraso(self, request):
         """Mensalidades com estado ATRASADO."""
         qs = self.get_queryset().filter(estado='ATRASADO')
-        serializer = MensalidadeListSerializer(qs, many=True)
-        return Response(serializer.data)
+        return resposta_json_em_stream(qs, MensalidadeListSerializer, context=self.get_serializer_context())
 
     @action(detail=True, methods=['post'], url_path='pagar')
     def pagar(self, request, pk=None):
@@ -486,8 +470,8 @@ class MensalidadeViewSet(viewsets.ModelViewSet):
 
         GET /api/v1/mensalidades/{id}/recibo/
         → 200 application/pdf  (recibo existente)
-        → 404 se a mensalidade ainda não está paga ou recibo não existe
-        → 202 se o recibo ainda está a ser gerado (fallback)
+        → 404 se a mensalidade ainda não está paga
+        → 202 enquanto o PDF está a ser gerado no Celery
         """
         from django.http import FileResponse, HttpResponse
         from financeiro.models import Recibo
@@ -502,7 +486,7 @@ class MensalidadeViewSet(viewsets.ModelViewSet):
 
         try:
             recibo = mensalidade.recibo_emitido
-        except Exception:
+        except Recibo.DoesNotExist:
             recibo = mensalidade._gerar_recibo_automatico()
             if not recibo:
                 return Response(
@@ -512,8 +496,12 @@ class MensalidadeViewSet(viewsets.ModelViewSet):
 
         if not recibo.arquivo:
             return Response(
-                {'erro': 'Ficheiro do recibo não encontrado.'},
-                status=status.HTTP_404_NOT_FOUND
+                {
+                    'codigo_recibo': recibo.codigo_recibo,
+                    'mensagem': 'O recibo está a ser gerado. Tente novamente dentro de instantes.',
+                },
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Retry-After': '5'},
             )
 
         nome_ficheiro = f"recibo_{recibo.codigo_recibo}.pdf"
@@ -600,6 +588,12 @@ class MensalidadeViewSet(viewsets.ModelViewSet):
         except (TypeError, ValueError):
             return Response({'erro': 'Parâmetros inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if not (1 <= mes <= 12) or not (1 <= ano < 9999):
+            return Response(
+                {'erro': 'Mês (1-12) ou ano inválido.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         resumo = Mensalidade.objects.resumo_estatistico(mes, ano)
         total_devedor = Mensalidade.objects.total_devedor_mes(mes, ano)
 
@@ -625,7 +619,7 @@ class FolhaPagamentoViewSet(viewsets.ModelViewSet):
     DELETE /folhas/{id}/                 → eliminar (admin, só PENDENTE)
     POST   /folhas/{id}/confirmar/       → confirmar pagamento
     GET    /folhas/resumo-mes/           → totais do mês (?mes=M&ano=A)
-    GET    /folhas/pendentes/            → folhas por pagar
+    GET    /folhas/pendentes/            → folhas por pagar (stream)
     """
 
     permission_classes = [IsGestor]
@@ -685,9 +679,13 @@ class FolhaPagamentoViewSet(viewsets.ModelViewSet):
         except (TypeError, ValueError):
             return Response({'erro': 'Parâmetros inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        qs = self.get_queryset().filter(
-            mes_referente__month=mes, mes_referente__year=ano
-        )
+        if not (1 <= mes <= 12) or not (1 <= ano < 9999):
+            return Response(
+                {'erro': 'Mês (1-12) ou ano inválido.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        qs = self.get_queryset().do_mes(mes, ano)
         totais = qs.aggregate(
             total_pago=Sum('valor_total', filter=Q(status='PAGO')),
             total_pendente=Sum('valor_total', filter=Q(status='PENDENTE')),
@@ -706,8 +704,7 @@ class FolhaPagamentoViewSet(viewsets.ModelViewSet):
     def pendentes(self, request):
         """Folhas salariais ainda não pagas."""
         qs = self.get_queryset().filter(status='PENDENTE')
-        serializer = FolhaPagamentoSerializer(qs, many=True)
-        return Response(serializer.data)
+        return resposta_json_em_stream(qs, FolhaPagamentoSerializer, context=self.get_serializer_context())
 
 
 class DespesaVeiculoViewSet(viewsets.ModelViewSet):
@@ -828,7 +825,7 @@ class DespesaGeralViewSet(viewsets.ModelViewSet):
     PUT/PATCH /despesas-gerais/{id}/          → editar (só se não paga)
     DELETE /despesas-gerais/{id}/             → eliminar (só se não paga)
     POST   /despesas-gerais/{id}/pagar/       → registar pagamento
-    GET    /despesas-gerais/pendentes/        → despesas ainda não pagas
+    GET    /despesas-gerais/pendentes/        → despesas ainda não pagas (stream)
     GET    /despesas-gerais/resumo/           → totais por categoria
     """
 
@@ -873,8 +870,7 @@ class DespesaGeralViewSet(viewsets.ModelViewSet):
     def pendentes(self, request):
         """Despesas ainda não pagas."""
         qs = self.get_queryset().filter(pago=False)
-        serializer = DespesaGeralSerializer(qs, many=True)
-        return Response(serializer.data)
+        return resposta_json_em_stream(qs, DespesaGeralSerializer, context=self.get_serializer_context())
 
     @action(detail=False, methods=['get'], url_path='resumo')
     def resumo(self, request):
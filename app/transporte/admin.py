@@ -3,12 +3,15 @@ transporte/admin.py
 ===================
 Administração Django para o módulo transporte.
 
-Registos: Veiculo, Rota, TransporteAluno, Manutencao, Abastecimento
+Registos: Veiculo, Rota, TransporteAluno, RegistoEmbarque, Manutencao, Abastecimento,
+          ConsumoVeiculo
 """
 
 from django.contrib import admin
 from django.utils.html import format_html
-from transporte.models import Abastecimento, Manutencao, Rota, TransporteAluno, Veiculo
+from transporte.models import (
+    Abastecimento, ConsumoVeiculo, Manutencao, RegistoEmbarque, Rota, TransporteAluno, Veiculo,
+)
 
 
 def _badge_bool(valor, label_sim='Sim', label_nao='Não'):
@@ -214,6 +217,29 @@ class TransporteAlunoAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(RegistoEmbarque)
+class RegistoEmbarqueAdmin(admin.ModelAdmin):
+    """Auditoria de check-ins — só leitura."""
+
+    list_display = (
+        'transporte', 'status_anterior', 'status',
+        'registado_por', 'registado_em', 'recebido_em',
+    )
+    list_filter = ('status', 'recebido_em')
+    search_fields = ('transporte__aluno__user__nome', 'transporte__rota__nome')
+    list_select_related = ('transporte__aluno__user', 'transporte__rota', 'registado_por')
+    date_hierarchy = 'recebido_em'
+
+    def get_readonly_fields(self, request, obj=None):
+        return [f.name for f in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Manutencao)
 class ManutencaoAdmin(admin.ModelAdmin):
     list_display = (
@@ -276,3 +302,27 @@ class AbastecimentoAdmin(admin.ModelAdmin):
             )
         }),
     )
+
+
+@admin.register(ConsumoVeiculo)
+class ConsumoVeiculoAdmin(admin.ModelAdmin):
+    """Totais de combustível materializados — só leitura."""
+
+    list_display = (
+        'veiculo', 'registos', 'km_inicial', 'km_final',
+        'litros_apos_inicial', 'custo_total', 'consumo_display', 'actualizado_em',
+    )
+    search_fields = ('veiculo__matricula',)
+
+    def get_readonly_fields(self, request, obj=None):
+        return [f.name for f in self.model._meta.fields]
+
+    @admin.display(description='Consumo')
+    def consumo_display(self, obj):
+        return f"{obj.consumo_medio:.2f} km/l"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,116 @@
+"""
+transporte/documentos.py
+========================
+Validade de documentos da frota e dos motoristas numa única query.
+
+Documentos verificados:
+  SEGURO     — Veiculo.data_validade_seguro
+  INSPECAO   — Veiculo.data_validade_inspecao
+  MANIFESTO  — Veiculo.data_validade_manifesto
+  CARTA      — Motorista.validade_da_carta
+
+Cada documento é um SELECT sobre os registos activos com validade até ao
+limite (servido pelos índices parciais `... WHERE ativo`); os SELECT são
+juntos com UNION ALL e ordenados pela validade — uma ida à BD por
+execução, seja qual for o número de veículos e motoristas.
+
+Partilhado pelas tasks notificar_documentos_veiculo / notificar_cartas_conducao,
+pelos management commands com o mesmo nome e pelo endpoint
+/veiculos/documentos-a-vencer/.
+
+Uso:
+  from transporte.documentos import documentos_a_expirar
+  resultado = documentos_a_expirar(dias=30, documentos=DOCUMENTOS_VEICULO)
+  resultado['vencidos'][0]['referencia']
+"""
+
+import datetime
+
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from core.models import Motorista
+from transporte.models import Veiculo
+
+# documento → (modelo, campo de validade, descrição)
+DOCUMENTOS = {
+    'SEGURO': (Veiculo, 'data_validade_seguro', 'Seguro'),
+    'INSPECAO': (Veiculo, 'data_validade_inspecao', 'Inspecção'),
+    'MANIFESTO': (Veiculo, 'data_validade_manifesto', 'Manifesto'),
+    'CARTA': (Motorista, 'validade_da_carta', 'Carta de condução'),
+}
+DOCUMENTOS_VEICULO = ('SEGURO', 'INSPECAO', 'MANIFESTO')
+
+# Maior antecedência aceite (dias), ~10 anos — acima disso a data limite
+# sai do intervalo de datetime.date
+DIAS_MAXIMO = 3650
+
+_COLUNAS = ('documento', 'objeto_id', 'referencia', 'detalhe', 'email', 'validade')
+
+
+def documentos_a_expirar(dias: int = 30, documentos=None, hoje: datetime.date = None) -> dict:
+    """
+    Documentos vencidos ou a vencer nos próximos `dias` dias.
+
+    Devolve:
+      {'data': hoje, 'limite': hoje + dias,
+       'vencidos': [item, ...], 'a_vencer': [item, ...]}
+
+    Cada item:
+      {'documento': 'SEGURO', 'descricao': 'Seguro',
+       'tipo': 'VEICULO' | 'MOTORISTA', 'id': pk,
+       'referencia': matrícula ou nome do motorista,
+       'detalhe': marca e modelo (veículos), 'email': e-mail (motoristas),
+       'validade': date, 'dias': dias até à validade (negativo se vencido)}
+    """
+    hoje = hoje or timezone.localdate()
+    limite = hoje + datetime.timedelta(days=dias)
+    documentos = documentos or tuple(DOCUMENTOS)
+
+    resultado = {'data': hoje, 'limite': limite, 'vencidos': [], 'a_vencer': []}
+    partes = [_consulta(documento, limite) for documento in documentos]
+    if not partes:
+        return resultado
+
+    consulta = partes[0].union(*partes[1:], all=True) if len(partes) > 1 else partes[0]
+    for linha in consulta.order_by('validade', 'documento', 'objeto_id'):
+        item = dict(zip(_COLUNAS, linha))
+        modelo, _, descricao = DOCUMENTOS[item['documento']]
+        item.update(
+            descricao=descricao,
+            tipo='VEICULO' if modelo is Veiculo else 'MOTORISTA',
+            id=item.pop('objeto_id'),
+            dias=(item['validade'] - hoje).days,
+        )
+        resultado['vencidos' if item['validade'] < hoje else 'a_vencer'].append(item)
+    return resultado
+
+
+def _consulta(documento: str, limite: datetime.date):
+    """SELECT de um documento, com as colunas de _COLUNAS pela mesma ordem."""
+    modelo, campo, _ = DOCUMENTOS[documento]
+    texto = CharField()
+    if modelo is Veiculo:
+        referencia = F('matricula')
+        detalhe = Concat(F('marca'), Value(' '), F('modelo'), output_field=texto)
+        email = Value('', output_field=texto)
+    else:
+        referencia = F('user__nome')
+        detalhe = Value('', output_field=texto)
+        email = F('user__email')
+
+    return (
+        modelo.objects
+        .filter(ativo=True, **{f'{campo}__lte': limite})
+        .order_by()
+        .annotate(
+            documento=Value(documento, output_field=texto),
+            objeto_id=F('pk'),
+            referencia=referencia,
+            detalhe=detalhe,
+            email=email,
+            validade=F(campo),
+        )
+        .values_list(*_COLUNAS)
+    )
@@ -0,0 +1,132 @@
+"""
+transporte/estatisticas.py
+==========================
+Métricas da frota calculadas com um número fixo de queries.
+
+Os métodos do modelo (Veiculo.consumo_medio, custo_por_quilometro,
+vagas_disponiveis, em_manutencao, precisa_manutencao...) fazem cada um as
+suas queries — para um veículo chega, para a frota inteira multiplica.
+Aqui as mesmas métricas saem de três queries, seja qual for o número
+de veículos:
+
+  1. os próprios veículos (as vagas vêm do contador lugares_ocupados)
+  2. consumo        — totais de combustível já mantidos em ConsumoVeiculo
+  3. manutenções    — custo, pendentes e km da última revisão concluída
+
+Uso:
+  from transporte.estatisticas import estatisticas_veiculos
+  stats = estatisticas_veiculos(Veiculo.objects.filter(ativo=True))
+  stats[veiculo.pk]['consumo_medio_km_l']
+"""
+
+from decimal import Decimal
+
+from django.db.models import Count, Max, Q, Sum
+
+from transporte.models import ConsumoVeiculo, Manutencao
+
+
+def estatisticas_veiculos(veiculos) -> dict:
+    """
+    Métricas de cada veículo em `veiculos` (queryset ou lista), por pk.
+
+    As chaves de cada entrada são as do endpoint /veiculos/{id}/estatisticas/.
+    """
+    veiculos = list(veiculos)
+    ids = [v.pk for v in veiculos]
+    if not ids:
+        return {}
+
+    combustivel = _combustivel_por_veiculo(ids)
+    manutencao = _manutencao_por_veiculo(ids)
+
+    resultado = {}
+    for v in veiculos:
+        comb = combustivel.get(v.pk, {})
+        manut = manutencao.get(v.pk, {})
+
+        consumo = comb.get('consumo', 0.0)
+        custo_combustivel = comb.get('custo', Decimal('0'))
+        custo_manutencao = manut.get('custo', Decimal('0'))
+        em_manutencao = manut.get('pendentes', 0) > 0
+
+        km_ultima_revisao = manut.get('km_ultima_revisao')
+        km_desde_revisao = (
+            v.quilometragem_atual - km_ultima_revisao
+            if km_ultima_revisao is not None else v.quilometragem_atual
+        )
+
+        custo_por_km = 0.0
+        if v.quilometragem_atual:
+            custo_por_km = round(
+                float(custo_combustivel + custo_manutencao) / v.quilometragem_atual, 2
+            )
+
+        resultado[v.pk] = {
+            'matricula': v.matricula,
+            'quilometragem_atual': v.quilometragem_atual,
+            'consumo_medio_km_l': round(consumo, 2),
+            'custo_por_km_mzn': custo_por_km,
+            'autonomia_estimada_km': consumo * v.capacidade_tanque if consumo > 0 else 0.0,
+            'custo_total_combustivel_mzn': float(custo_combustivel),
+            'vagas_disponiveis': v.vagas_disponiveis,
+            'em_manutencao': em_manutencao,
+            'precisa_manutencao': (
+                not em_manutencao and km_desde_revisao >= v.km_proxima_revisao
+            ),
+            'documentacao_em_dia': v.document_em_dia(),
+        }
+    return resultado
+
+
+def estatisticas_veiculo(veiculo) -> dict:
+    """Atalho para um único veículo."""
+    return estatisticas_veiculos([veiculo])[veiculo.pk]
+
+
+# ──────────────────────────────────────────────
+# Queries por tabela (uma cada)
+# ──────────────────────────────────────────────
+
+def _combustivel_por_veiculo(ids: list) -> dict:
+    """
+    Consumo médio (km/l) e custo de combustível por veículo, lidos dos
+    totais mantidos em ConsumoVeiculo. Veículos ainda sem linha são
+    calculados de uma vez (window functions em ConsumoVeiculo._totais).
+    """
+    linhas = {c.veiculo_id: c for c in ConsumoVeiculo.objects.filter(veiculo_id__in=ids)}
+    em_falta = [pk for pk in ids if pk not in linhas]
+    if em_falta:
+        ConsumoVeiculo.reconstruir(em_falta)
+        linhas.update(
+            (c.veiculo_id, c) for c in ConsumoVeiculo.objects.filter(veiculo_id__in=em_falta)
+        )
+    return {
+        veiculo_id: {'consumo': c.consumo_medio, 'custo': c.custo_total}
+        for veiculo_id, c in linhas.items()
+    }
+
+
+def _manutencao_por_veiculo(ids: list) -> dict:
+    """Custo total, manutenções em curso e km da última revisão concluída."""
+    linhas = (
+        Manutencao.objects
+        .filter(veiculo_id__in=ids)
+        .order_by()
+        .values('veiculo_id')
+        .annotate(
+            custo_total=Sum('custo'),
+            pendentes=Count('id', filter=Q(concluida=False)),
+            km_ultima_revisao=Max(
+                'quilometragem_no_momento_revisao', filter=Q(concluida=True)
+            ),
+        )
+    )
+    return {
+        linha['veiculo_id']: {
+            'custo': linha['custo_total'] or Decimal('0'),
+            'pendentes': linha['pendentes'],
+            'km_ultima_revisao': linha['km_ultima_revisao'],
+        }
+        for linha in linhas
+    }
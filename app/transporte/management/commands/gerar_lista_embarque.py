@@ -0,0 +1,62 @@
+"""
+transporte/management/commands/gerar_lista_embarque.py
+=======================================================
+Gera a lista de embarque do dia: um registo PENDENTE por aluno inscrito
+em cada rota activa (veículo activo e sem manutenção em curso).
+
+Corre todas as manhãs pelo Celery Beat (gerar_lista_embarque_diaria);
+este comando serve para gerar dias específicos ou recuperar um dia falhado.
+
+Uso:
+  python manage.py gerar_lista_embarque
+  python manage.py gerar_lista_embarque --data 2025-04-14
+  python manage.py gerar_lista_embarque --dry-run
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Gera os registos PENDENTE do dia para todos os alunos inscritos nas rotas activas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', type=str, default=None,
+                            help='Dia a gerar, AAAA-MM-DD (default: hoje).')
+        parser.add_argument('--lote', type=int, default=None,
+                            help='Registos por INSERT (default: 500).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Mostra quantos seriam criados sem criar nada.')
+
+    def handle(self, *args, **options):
+        from transporte.models import TransporteAluno
+
+        data = datetime.date.today()
+        if options['data']:
+            try:
+                data = datetime.date.fromisoformat(options['data'])
+            except ValueError:
+                self.stdout.write(self.style.ERROR('Data inválida. Use AAAA-MM-DD.'))
+                return
+
+        dry_run = options['dry_run']
+        if dry_run:
+            self.stdout.write(self.style.WARNING('[DRY-RUN] Nenhum registo será criado.\n'))
+
+        resultado = TransporteAluno.objects.gerar_lista_diaria(
+            data, tamanho_lote=options['lote'], dry_run=dry_run,
+        )
+
+        for rota_id in resultado['rotas_ignoradas']:
+            self.stdout.write(
+                self.style.WARNING(f'  ✗ Rota {rota_id} ignorada (veículo inactivo ou em manutenção)')
+            )
+
+        verbo = 'seriam criados' if dry_run else 'tentado(s)'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✓ {resultado["tentados"]} registo(s) {verbo} para {data.strftime("%d/%m/%Y")} '
+                f'em {resultado["rotas"]} rota(s); {resultado["registos_do_dia"]} registo(s) no dia.'
+            )
+        )
@@ -5,20 +5,13 @@ Notifica os gestores sobre veículos com documentação vencida
 ou a vencer nos próximos N dias (seguro, inspecção, manifesto).
 """
 
-from datetime import timedelta
 from core.models import Gestor
-from django.utils import timezone
-from transporte.models import Veiculo
 from django.core.management.base import BaseCommand
 from django.core.mail import BadHeaderError, send_mail
+from transporte.documentos import DOCUMENTOS_VEICULO, documentos_a_expirar
 
 
 REMETENTE = 'admin@schoolbus.com'
-DOCS_LABEL = {
-    'data_validade_seguro': 'Seguro',
-    'data_validade_inspecao': 'Inspecção',
-    'data_validade_manifesto': 'Manifesto',
-}
 
 
 class Command(BaseCommand):
@@ -31,8 +24,6 @@ class Command(BaseCommand):
                             help='Lista os veículos afectados sem enviar e-mails.')
 
     def handle(self, *args, **options):
-        hoje = timezone.now().date()
-        limite = hoje + timedelta(days=options['dias'])
         dry_run = options['dry_run']
 
         if dry_run:
@@ -43,22 +34,10 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('Nenhum gestor com e-mail encontrado.'))
             return
 
-        veiculos_activos = Veiculo.objects.filter(ativo=True).select_related(
-            'motorista__user'
-        )
-
-        problemas_vencidos = []
-        problemas_a_vencer = []
-
-        for veiculo in veiculos_activos:
-            for campo, label in DOCS_LABEL.items():
-                validade = getattr(veiculo, campo)
-                if not validade:
-                    continue
-                if validade < hoje:
-                    problemas_vencidos.append((veiculo, label, validade))
-                elif validade <= limite:
-                    problemas_a_vencer.append((veiculo, label, validade))
+        resultado = documentos_a_expirar(dias=options['dias'], documentos=DOCUMENTOS_VEICULO)
+        hoje = resultado['data']
+        problemas_vencidos = resultado['vencidos']
+        problemas_a_vencer = resultado['a_vencer']
 
         if not problemas_vencidos and not problemas_a_vencer:
             self.stdout.write(self.style.SUCCESS('Toda a documentação está em dia.'))
@@ -68,27 +47,29 @@ class Command(BaseCommand):
 
         if problemas_vencidos:
             linhas.append(f'\n🔴 DOCUMENTAÇÃO VENCIDA ({len(problemas_vencidos)} item(s)):\n')
-            for v, doc, val in problemas_vencidos:
+            for item in problemas_vencidos:
+                val = item['validade'].strftime("%d/%m/%Y")
                 linhas.append(
-                    f'  • Veículo {v.matricula} ({v.marca} {v.modelo}) '
-                    f'— {doc} venceu em {val.strftime("%d/%m/%Y")}'
+                    f'  • Veículo {item["referencia"]} ({item["detalhe"]}) '
+                    f'— {item["descricao"]} venceu em {val}'
                 )
                 self.stdout.write(
                     self.style.ERROR(
-                        f'  VENCIDO  | {v.matricula} | {doc} | {val.strftime("%d/%m/%Y")}'
+                        f'  VENCIDO  | {item["referencia"]} | {item["descricao"]} | {val}'
                     )
                 )
 
         if problemas_a_vencer:
             linhas.append(f'\n🟡 A VENCER NOS PRÓXIMOS {options["dias"]} DIAS ({len(problemas_a_vencer)} item(s)):\n')
-            for v, doc, val in problemas_a_vencer:
+            for item in problemas_a_vencer:
+                val = item['validade'].strftime("%d/%m/%Y")
                 linhas.append(
-                    f'  • Veículo {v.matricula} ({v.marca} {v.modelo}) '
-                    f'— {doc} vence em {val.strftime("%d/%m/%Y")}'
+                    f'  • Veículo {item["referencia"]} ({item["detalhe"]}) '
+                    f'— {item["descricao"]} vence em {val}'
                 )
                 self.stdout.write(
                     self.style.WARNING(
-                        f'  A VENCER | {v.matricula} | {doc} | {val.strftime("%d/%m/%Y")}'
+                        f'  A VENCER | {item["referencia"]} | {item["descricao"]} | {val}'
                     )
                 )
 
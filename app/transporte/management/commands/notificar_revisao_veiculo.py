@@ -32,12 +32,8 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('Nenhum gestor com e-mail encontrado.'))
             return
 
-        # Filtra veículos que precisam de revisão (método do modelo)
-        veiculos_activos = Veiculo.objects.filter(ativo=True).select_related(
-            'motorista__user'
-        ).prefetch_related('manutencoes')
-
-        a_rever = [v for v in veiculos_activos if v.precisa_manutencao()]
+        # Filtra em SQL os veículos que precisam de revisão (VeiculoQuerySet)
+        a_rever = list(Veiculo.objects.a_precisar_revisao().order_by('matricula'))
 
         if not a_rever:
             self.stdout.write(self.style.SUCCESS('Nenhum veículo necessita de revisão.'))
@@ -53,7 +49,7 @@ class Command(BaseCommand):
         ]
 
         for v in a_rever:
-            excesso = v.quilometragem_atual - v.km_proxima_revisao
+            excesso = v.km_desde_revisao - v.km_proxima_revisao
             linha = (
                 f'  • {v.matricula} ({v.marca} {v.modelo}) '
                 f'— Km actual: {v.quilometragem_atual} '
@@ -0,0 +1,57 @@
+"""
+transporte/management/commands/reconciliar_contadores_rotas.py
+==============================================================
+Confere e corrige os contadores desnormalizados de inscrições:
+  - Rota.total_inscritos       (alunos inscritos na rota)
+  - Veiculo.lugares_ocupados   (inscritos da rota activa mais cheia)
+
+Os contadores são mantidos pelos signals de Rota.alunos; este comando
+corrige desvios causados por alterações feitas fora do ORM (SQL directo,
+QuerySet.update() na tabela M2M, restauros de backup).
+
+Uso:
+  python manage.py reconciliar_contadores_rotas
+  python manage.py reconciliar_contadores_rotas --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores de inscritos por rota e de ocupação por veículo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Só lista os desvios, sem corrigir.')
+
+    def handle(self, *args, **options):
+        from transporte.models import Rota, Veiculo
+
+        desvios = (
+            Rota.objects
+            .annotate(contagem=Count('alunos'))
+            .exclude(total_inscritos=F('contagem'))
+            .select_related('veiculo')
+            .order_by('nome')
+        )
+        for rota in desvios:
+            self.stdout.write(
+                f'  ✗ {rota.nome} ({rota.veiculo.matricula}):'
+                f' contador {rota.total_inscritos}, real {rota.contagem}'
+            )
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'\n[DRY-RUN] {len(desvios)} rota(s) com contador desactualizado.')
+            )
+            return
+
+        with transaction.atomic():
+            Rota.actualizar_contadores(Rota.objects.values('pk'))
+            Veiculo.actualizar_ocupacao()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✓ Contadores recalculados — {len(desvios)} rota(s) corrigida(s).')
+        )
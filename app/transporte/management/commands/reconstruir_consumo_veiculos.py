@@ -0,0 +1,44 @@
+"""
+transporte/management/commands/reconstruir_consumo_veiculos.py
+==============================================================
+Recalcula a tabela ConsumoVeiculo a partir dos abastecimentos.
+
+Os totais são mantidos a cada abastecimento (Abastecimento.save e o
+signal de post_delete); este comando corrige desvios causados por
+alterações feitas fora do ORM ou com QuerySet.update(), e preenche a
+tabela depois da migração.
+
+Uso:
+  python manage.py reconstruir_consumo_veiculos
+  python manage.py reconstruir_consumo_veiculos --matricula ABC-123-XY
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os totais de combustível por veículo a partir dos abastecimentos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--matricula', type=str, default=None,
+                            help='Só o veículo com esta matrícula (default: todos).')
+
+    def handle(self, *args, **options):
+        from transporte.models import ConsumoVeiculo, Veiculo
+
+        ids = None
+        if options['matricula']:
+            ids = list(
+                Veiculo.objects
+                .filter(matricula=options['matricula'].strip().upper())
+                .values_list('pk', flat=True)
+            )
+            if not ids:
+                self.stdout.write(self.style.ERROR(f'Veículo {options["matricula"]} não encontrado.'))
+                return
+
+        total = ConsumoVeiculo.reconstruir(ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Consumo recalculado para {total} veículo(s).')
+        )
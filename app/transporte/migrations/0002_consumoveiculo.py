@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transporte', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumoVeiculo',
+            fields=[
+                ('veiculo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo_combustivel', serialize=False, to='transporte.veiculo')),
+                ('registos', models.PositiveIntegerField(default=0)),
+                ('km_inicial', models.PositiveIntegerField(default=0)),
+                ('km_final', models.PositiveIntegerField(default=0)),
+                ('litros_apos_inicial', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('custo_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('actualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Consumo do Veículo',
+                'verbose_name_plural': 'Consumo dos Veículos',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transporte', '0002_consumoveiculo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistoEmbarque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_anterior', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EMBARCADO', 'Embarcado'), ('DESEMBARCADO', 'Desembarcado')], max_length=20)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EMBARCADO', 'Embarcado'), ('DESEMBARCADO', 'Desembarcado')], max_length=20)),
+                ('registado_em', models.DateTimeField(blank=True, null=True)),
+                ('recebido_em', models.DateTimeField(auto_now_add=True)),
+                ('registado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='registos_embarque', to=settings.AUTH_USER_MODEL)),
+                ('transporte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registos_embarque', to='transporte.transportealuno')),
+            ],
+            options={
+                'verbose_name': 'Registo de Embarque',
+                'verbose_name_plural': 'Registos de Embarque',
+                'ordering': ['-recebido_em'],
+            },
+        ),
+    ]
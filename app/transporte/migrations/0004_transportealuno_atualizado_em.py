@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transporte', '0003_registoembarque'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transportealuno',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='transportealuno',
+            index=models.Index(fields=['rota', 'data', 'atualizado_em'], name='idx_transporte_sync'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:20
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_contadores(apps, schema_editor):
+    Rota = apps.get_model('transporte', 'Rota')
+    Veiculo = apps.get_model('transporte', 'Veiculo')
+
+    inscritos = (
+        Rota.alunos.through.objects
+        .filter(rota_id=OuterRef('pk'))
+        .order_by()
+        .values('rota_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Rota.objects.update(total_inscritos=Coalesce(Subquery(inscritos), Value(0)))
+
+    mais_cheia = (
+        Rota.objects
+        .filter(veiculo_id=OuterRef('pk'), ativo=True)
+        .order_by()
+        .values('veiculo_id')
+        .annotate(maximo=Max('total_inscritos'))
+        .values('maximo')
+    )
+    Veiculo.objects.update(lugares_ocupados=Coalesce(Subquery(mais_cheia), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transporte', '0004_transportealuno_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rota',
+            name='total_inscritos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='veiculo',
+            name='lugares_ocupados',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Alunos inscritos na rota activa mais cheia do veículo'),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transporte', '0005_contadores_inscritos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rota',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['veiculo', 'hora_partida', 'hora_chegada'], name='idx_rota_turno_ativa'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transporte', '0006_rota_indice_turno'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='veiculo',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['data_validade_seguro'], name='idx_veiculo_seguro_ativo'),
+        ),
+        migrations.AddIndex(
+            model_name='veiculo',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['data_validade_inspecao'], name='idx_veiculo_inspecao_ativo'),
+        ),
+        migrations.AddIndex(
+            model_name='veiculo',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['data_validade_manifesto'], name='idx_veiculo_manifesto_ativo'),
+        ),
+    ]
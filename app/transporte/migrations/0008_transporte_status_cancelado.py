@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transporte', '0007_indices_validade_documentos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registoembarque',
+            name='status',
+            field=models.CharField(choices=[('PENDENTE', 'Pendente'), ('EMBARCADO', 'Embarcado'), ('DESEMBARCADO', 'Desembarcado'), ('CANCELADO', 'Cancelado')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='registoembarque',
+            name='status_anterior',
+            field=models.CharField(choices=[('PENDENTE', 'Pendente'), ('EMBARCADO', 'Embarcado'), ('DESEMBARCADO', 'Desembarcado'), ('CANCELADO', 'Cancelado')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='transportealuno',
+            name='status',
+            field=models.CharField(choices=[('PENDENTE', 'Pendente'), ('EMBARCADO', 'Embarcado'), ('DESEMBARCADO', 'Desembarcado'), ('CANCELADO', 'Cancelado')], default='PENDENTE', max_length=20),
+        ),
+    ]
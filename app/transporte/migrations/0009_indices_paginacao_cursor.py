@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transporte', '0008_transporte_status_cancelado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transportealuno',
+            index=models.Index(fields=['-data', '-id'], name='idx_transporte_data_id'),
+        ),
+    ]
@@ -2,7 +2,8 @@
 transporte/models.py
 Sistema de Transporte Escolar — Modelos de transporte
 
-Modelos: Veiculo, Rota, TransporteAluno, Manutencao, Abastecimento
+Modelos: Veiculo, Rota, TransporteAluno, RegistoEmbarque, Manutencao, Abastecimento,
+         ConsumoVeiculo
 
 REGRA DE DEPENDÊNCIAS:
   transporte → core
@@ -10,42 +11,163 @@ REGRA DE DEPENDÊNCIAS:
 Nunca importar de `financeiro` aqui.
 """
 import datetime
+import logging
+from decimal import Decimal
 from core.models import Aluno, Motorista
-from django.db import models, transaction
-from django.db.models import Count, F, Q, Sum
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import (
+    Count, Exists, ExpressionWrapper, F, Max, OuterRef, Subquery, Sum, Value, Window,
+)
+from django.db.models.functions import Coalesce, FirstValue
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
 
 
+logger = logging.getLogger(__name__)
+
 validar_matric = RegexValidator(
     regex=r'^[A-Z]{3}-\d{3}-[A-Z]{2}$',
     message='Matrícula inválida. Ex: ABC-123-XY'
 )
 
 
-class VeiculoManager(models.Manager):
+def _proteger_contadores(instance, kwargs) -> None:
+    """
+    Num save() de um registo existente, deixa de fora os contadores
+    desnormalizados (CAMPOS_CONTADORES): são mantidos em SQL pelos signals
+    e o valor em memória pode estar desactualizado.
+    """
+    if instance._state.adding or kwargs.get('force_insert') or kwargs.get('update_fields') is not None:
+        return
+    kwargs['update_fields'] = [
+        f.name for f in instance._meta.concrete_fields
+        if not f.primary_key and f.name not in instance.CAMPOS_CONTADORES
+    ]
+
+
+class CamposRastreadosMixin:
+    """
+    Guarda os valores de CAMPOS_RASTREADOS tal como estão na BD — lidos em
+    from_db() e renovados no fim de cada save() — para os signals compararem
+    o valor antigo com o novo sem voltar a ler o registo.
+
+    Os signals de pre_save/post_save correm dentro do save(), por isso ainda
+    vêem os valores anteriores à gravação.
+    """
+
+    CAMPOS_RASTREADOS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_valores_carregados()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._guardar_valores_carregados(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._guardar_valores_carregados(fields)
+
+    def _guardar_valores_carregados(self, campos=None) -> None:
+        """Copia os campos rastreados presentes em memória (todos ou os de `campos`)."""
+        if campos is not None:
+            nomes = set(campos)
+            campos = [
+                c for c in self.CAMPOS_RASTREADOS
+                if c in nomes or self._meta.get_field(c).name in nomes
+            ]
+        else:
+            campos = self.CAMPOS_RASTREADOS
+        valores = self.__dict__.setdefault('_valores_carregados', {})
+        valores.update((c, self.__dict__[c]) for c in campos if c in self.__dict__)
+
+    def valor_carregado(self, campo: str):
+        """
+        Valor de `campo` na BD antes das alterações em memória (None num
+        registo novo). Um campo diferido (.only/.defer) é lido à parte, uma vez.
+        """
+        if self._state.adding or self.pk is None:
+            return None
+        valores = self.__dict__.setdefault('_valores_carregados', {})
+        if campo not in valores:
+            em_falta = [c for c in self.CAMPOS_RASTREADOS if c not in valores]
+            linha = type(self)._base_manager.filter(pk=self.pk).values(*em_falta).first()
+            valores.update(linha or dict.fromkeys(em_falta))
+        return valores[campo]
+
+    def campo_alterado(self, campo: str) -> bool:
+        """
+        True se `campo` em memória difere do valor carregado (sempre True num
+        registo novo; um campo diferido que não foi lido não mudou).
+        """
+        if self._state.adding:
+            return True
+        if campo not in self.__dict__:
+            return False
+        return self.valor_carregado(campo) != self.__dict__[campo]
+
+
+class VeiculoQuerySet(models.QuerySet):
+
+    def com_estado_revisao(self):
+        """
+        Anota cada veículo com o estado de revisão, numa única query:
+          - km_ultima_revisao        → km da última manutenção concluída (ou None)
+          - tem_manutencao_em_curso  → existe manutenção por concluir
+          - km_desde_revisao         → km percorridos desde essa revisão
+        """
+        concluidas = (
+            Manutencao.objects
+            .filter(veiculo=OuterRef('pk'), concluida=True)
+            .order_by('-quilometragem_no_momento_revisao')
+            .values('quilometragem_no_momento_revisao')[:1]
+        )
+        return self.annotate(
+            km_ultima_revisao=Subquery(concluidas),
+            tem_manutencao_em_curso=Exists(
+                Manutencao.objects.filter(veiculo=OuterRef('pk'), concluida=False)
+            ),
+        ).annotate(
+            km_desde_revisao=ExpressionWrapper(
+                F('quilometragem_atual') - Coalesce(
+                    F('km_ultima_revisao'), Value(0), output_field=models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+            ),
+        )
+
+    def a_precisar_revisao(self):
+        """
+        Veículos activos que atingiram a quilometragem de revisão e não têm
+        manutenção em curso — a mesma regra de Veiculo.precisa_manutencao(),
+        filtrada em SQL.
+        """
+        return (
+            self.com_estado_revisao()
+            .filter(ativo=True, tem_manutencao_em_curso=False)
+            .filter(km_desde_revisao__gte=F('km_proxima_revisao'))
+        )
+
+
+class VeiculoManager(models.Manager.from_queryset(VeiculoQuerySet)):
 
     def ativos(self):
         return self.filter(ativo=True)
 
     def com_vagas(self):
         """
-        Veículos activos que ainda têm vagas disponíveis na rota activa.
-        Anota alunos_count e filtra alunos_count < capacidade.
+        Veículos activos que ainda têm vagas disponíveis na rota activa
+        (lê o contador lugares_ocupados — sem joins).
         """
-        return (
-            self.filter(ativo=True)
-            .annotate(
-                alunos_count=Count(
-                    'rotas__alunos',
-                    filter=Q(rotas__ativo=True)
-                )
-            )
-            .filter(alunos_count__lt=F('capacidade'))
-        )
+        return self.filter(ativo=True, lugares_ocupados__lt=F('capacidade'))
 
 
-class Veiculo(models.Model):
+class Veiculo(CamposRastreadosMixin, models.Model):
     """
     Veículo da frota.
 
@@ -106,12 +228,38 @@ class Veiculo(models.Model):
         help_text='Capacidade do tanque em litros'
     )
 
+    # Contador mantido pelos signals de Rota.alunos — ver actualizar_ocupacao()
+    lugares_ocupados = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Alunos inscritos na rota activa mais cheia do veículo',
+    )
+
+    CAMPOS_CONTADORES = ('lugares_ocupados',)
+    # Comparados pelo signal de post_save (alerta de documentação)
+    CAMPOS_RASTREADOS = ('data_validade_seguro', 'data_validade_inspecao', 'data_validade_manifesto')
+
     objects = VeiculoManager()
 
     class Meta:
         verbose_name = "Veículo"
         verbose_name_plural = "Veículos"
         ordering = ["matricula"]
+        # Índices parciais para transporte.documentos (só veículos activos)
+        indexes = [
+            models.Index(
+                fields=['data_validade_seguro'], condition=models.Q(ativo=True),
+                name='idx_veiculo_seguro_ativo',
+            ),
+            models.Index(
+                fields=['data_validade_inspecao'], condition=models.Q(ativo=True),
+                name='idx_veiculo_inspecao_ativo',
+            ),
+            models.Index(
+                fields=['data_validade_manifesto'], condition=models.Q(ativo=True),
+                name='idx_veiculo_manifesto_ativo',
+            ),
+        ]
 
     # ------------------------------------------------------------------
     # Documentação
@@ -155,8 +303,28 @@ class Veiculo(models.Model):
         self.modelo = self.modelo.strip().title()
         self.matricula = self.matricula.strip().upper()
         self.full_clean()
+        _proteger_contadores(self, kwargs)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def actualizar_ocupacao(cls, veiculo_ids=None) -> int:
+        """
+        Recalcula lugares_ocupados (inscritos da rota activa mais cheia)
+        num único UPDATE. `veiculo_ids` aceita lista ou subquery; None = todos.
+        """
+        mais_cheia = (
+            Rota.objects
+            .filter(veiculo_id=OuterRef('pk'), ativo=True)
+            .order_by()
+            .values('veiculo_id')
+            .annotate(maximo=Max('total_inscritos'))
+            .values('maximo')
+        )
+        qs = cls.objects.all() if veiculo_ids is None else cls.objects.filter(pk__in=veiculo_ids)
+        return qs.update(
+            lugares_ocupados=Coalesce(Subquery(mais_cheia), Value(0)),
+        )
+
     # ------------------------------------------------------------------
     # Properties
     # ------------------------------------------------------------------
@@ -164,17 +332,14 @@ class Veiculo(models.Model):
     @property
     def vagas_disponiveis(self) -> int:
         """
-        Vagas disponíveis na rota activa.
+        Vagas disponíveis na rota activa (a partir do contador, sem queries).
         Garante mínimo 0 (nunca negativo).
         """
-        rota_ativa = self.rotas.filter(ativo=True).first()
-        if not rota_ativa:
-            return self.capacidade
-        return max(self.capacidade - rota_ativa.alunos.count(), 0)
+        return max(self.capacidade - self.lugares_ocupados, 0)
 
     @property
     def custo_total_combustivel(self):
-        return self.abastecimento.aggregate(total=Sum('custo_total'))['total'] or 0.00
+        return ConsumoVeiculo.obter(self.pk).custo_total
 
     @property
     def autonomia_estimada(self) -> float:
@@ -211,26 +376,11 @@ class Veiculo(models.Model):
     # ------------------------------------------------------------------
 
     def consumo_medio(self) -> float:
-        """Consumo médio em km/litro com base nos abastecimentos registados."""
-        abastecimentos = list(
-            self.abastecimento.all().order_by('quilometragem_no_ato')
-        )
-        if len(abastecimentos) < 2:
-            return 0.0
-
-        distancia = (
-            abastecimentos[-1].quilometragem_no_ato - abastecimentos[0].quilometragem_no_ato
-        )
-        litros = sum(a.quantidade_litros for a in abastecimentos[1:])
-
-        if not litros:
-            return 0.0
-        return float(distancia / litros)
+        """Consumo médio em km/litro (totais mantidos em ConsumoVeiculo)."""
+        return ConsumoVeiculo.obter(self.pk).consumo_medio
 
     def custo_por_quilometro(self) -> float:
-        total_combustivel = float(
-            self.abastecimento.aggregate(total=Sum('custo_total'))['total'] or 0
-        )
+        total_combustivel = float(self.custo_total_combustivel)
         total_manutencao = float(
             self.manutencoes.aggregate(total=Sum('custo'))['total'] or 0
         )
@@ -242,7 +392,172 @@ class Veiculo(models.Model):
         return f"{self.modelo} - {self.matricula}"
 
 
-class Rota(models.Model):
+class RotaQuerySet(models.QuerySet):
+
+    def conflitos_de_turno(self, veiculo_id, hora_partida, hora_chegada, excluir_pk=None):
+        """
+        Rotas activas do veículo cujo horário se sobrepõe a
+        [hora_partida, hora_chegada) — uma query, servida pelo índice parcial
+        idx_rota_turno_ativa (veiculo, hora_partida, hora_chegada).
+        """
+        qs = self.filter(
+            veiculo_id=veiculo_id,
+            ativo=True,
+            hora_partida__lt=hora_chegada,
+            hora_chegada__gt=hora_partida,
+        )
+        if excluir_pk is not None:
+            qs = qs.exclude(pk=excluir_pk)
+        return qs.order_by('hora_partida')
+
+    def validar_horarios(self, itens: list) -> list:
+        """
+        Valida um horário completo de uma vez (ex.: importação do ano lectivo).
+
+        `itens`: dicts com 'veiculo' (id), 'hora_partida', 'hora_chegada' e,
+        opcionalmente, 'id' (rota existente a substituir), 'nome' e 'ativo'.
+
+        Uma query traz as rotas activas já gravadas dos veículos envolvidos
+        (menos as que o próprio envio substitui); depois, por veículo, os
+        intervalos são ordenados pela partida e varridos uma vez — cada
+        intervalo só é comparado com os que ainda estão "abertos".
+
+        Devolve, por item e na ordem recebida, {'indice', 'nome', 'valido',
+        'erros', 'conflitos'}; só são reportados conflitos que envolvam o envio.
+        """
+        resultados = [
+            {'indice': i, 'nome': item.get('nome'), 'valido': True, 'erros': [], 'conflitos': []}
+            for i, item in enumerate(itens)
+        ]
+
+        veiculo_ids = {item['veiculo'] for item in itens}
+        substituidas = {item['id'] for item in itens if item.get('id')}
+        existentes = (
+            self.filter(veiculo_id__in=veiculo_ids, ativo=True)
+            .exclude(pk__in=substituidas)
+            .values('pk', 'nome', 'veiculo_id', 'hora_partida', 'hora_chegada')
+        )
+        veiculos_validos = set(
+            Veiculo.objects.filter(pk__in=veiculo_ids).values_list('pk', flat=True)
+        )
+
+        # (partida, chegada, descrição, índice no envio ou None) por veículo
+        por_veiculo = {}
+        for rota in existentes:
+            por_veiculo.setdefault(rota['veiculo_id'], []).append((
+                rota['hora_partida'], rota['hora_chegada'],
+                {'rota': rota['pk'], 'nome': rota['nome']}, None,
+            ))
+        for i, item in enumerate(itens):
+            if item['veiculo'] not in veiculos_validos:
+                resultados[i]['erros'].append('Veículo inexistente.')
+                continue
+            if item['hora_chegada'] <= item['hora_partida']:
+                resultados[i]['erros'].append('A hora de chegada deve ser posterior à partida.')
+                continue
+            if not item.get('ativo', True):
+                continue
+            por_veiculo.setdefault(item['veiculo'], []).append((
+                item['hora_partida'], item['hora_chegada'],
+                {'rota': item.get('id'), 'nome': item.get('nome'), 'indice': i}, i,
+            ))
+
+        for intervalos in por_veiculo.values():
+            intervalos.sort(key=lambda t: (t[0], t[1]))
+            abertos = []
+            for partida, chegada, descricao, indice in intervalos:
+                abertos = [a for a in abertos if a[1] > partida]
+                for a_partida, a_chegada, a_descricao, a_indice in abertos:
+                    if indice is None and a_indice is None:
+                        continue  # conflito antigo, fora deste envio
+                    if indice is not None:
+                        resultados[indice]['conflitos'].append(
+                            {**a_descricao, 'hora_partida': a_partida, 'hora_chegada': a_chegada}
+                        )
+                    if a_indice is not None:
+                        resultados[a_indice]['conflitos'].append(
+                            {**descricao, 'hora_partida': partida, 'hora_chegada': chegada}
+                        )
+                abertos.append((partida, chegada, descricao, indice))
+
+        for resultado in resultados:
+            resultado['valido'] = not resultado['erros'] and not resultado['conflitos']
+        return resultados
+
+    def desactivar(self, data: datetime.date = None) -> list:
+        """
+        Desactiva as rotas activas do queryset e cancela os transportes
+        PENDENTE de `data` (hoje) dessas rotas — o mesmo que o save() de cada
+        rota faria pelo signal de pre_save, sem carregar nenhuma.
+
+        Em PostgreSQL é um único statement: UPDATE ... RETURNING das rotas
+        encadeado, num CTE, com o UPDATE dos transportes. Noutros backends
+        são um SELECT e dois UPDATE.
+
+        Os contadores de ocupação não são tocados: quem chama recalcula
+        Veiculo.actualizar_ocupacao() dos veículos afectados.
+
+        Devolve [{'id', 'nome', 'veiculo_id', 'cancelados'}, ...] por nome.
+        """
+        data = data or datetime.date.today()
+        agora = timezone.now()
+        alvo = self.filter(ativo=True).order_by().values('pk')
+
+        if connection.vendor == 'postgresql':
+            return self._desactivar_returning(alvo, data, agora)
+
+        with transaction.atomic():
+            rotas = list(
+                Rota.objects.filter(pk__in=alvo).select_for_update()
+                .values_list('pk', 'nome', 'veiculo_id').order_by('nome')
+            )
+            if not rotas:
+                return []
+            rota_ids = [pk for pk, _, _ in rotas]
+            Rota.objects.filter(pk__in=rota_ids).update(ativo=False, atualizado_em=agora)
+            pendentes = TransporteAluno.objects.filter(rota_id__in=rota_ids, data=data, status='PENDENTE')
+            cancelados = dict(
+                pendentes.order_by().values('rota_id').annotate(total=Count('pk'))
+                .values_list('rota_id', 'total')
+            )
+            pendentes.update(status='CANCELADO', atualizado_em=agora)
+        return [
+            {'id': pk, 'nome': nome, 'veiculo_id': veiculo_id, 'cancelados': cancelados.get(pk, 0)}
+            for pk, nome, veiculo_id in rotas
+        ]
+
+    @staticmethod
+    def _desactivar_returning(alvo, data, agora) -> list:
+        """desactivar() em PostgreSQL: um statement com dois UPDATE ... RETURNING."""
+        qn = connection.ops.quote_name
+        rota = qn(Rota._meta.db_table)
+        transporte = qn(TransporteAluno._meta.db_table)
+        subquery, params = alvo.query.sql_with_params()
+
+        sql = f"""
+            WITH rotas AS (
+                UPDATE {rota} SET ativo = false, atualizado_em = %s
+                WHERE ativo AND id IN ({subquery})
+                RETURNING id, nome, veiculo_id
+            ), cancelados AS (
+                UPDATE {transporte} SET status = 'CANCELADO', atualizado_em = %s
+                WHERE rota_id IN (SELECT id FROM rotas) AND data = %s AND status = 'PENDENTE'
+                RETURNING rota_id
+            )
+            SELECT r.id, r.nome, r.veiculo_id,
+                   (SELECT COUNT(*) FROM cancelados c WHERE c.rota_id = r.id)
+            FROM rotas r
+            ORDER BY r.nome
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [agora, *params, agora, data])
+            return [
+                {'id': pk, 'nome': nome, 'veiculo_id': veiculo_id, 'cancelados': cancelados}
+                for pk, nome, veiculo_id, cancelados in cursor.fetchall()
+            ]
+
+
+class Rota(CamposRastreadosMixin, models.Model):
     """
     Rota de transporte escolar.
 
@@ -264,10 +579,26 @@ class Rota(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
+    # Contador mantido pelos signals de Rota.alunos — ver actualizar_contadores()
+    total_inscritos = models.PositiveIntegerField(default=0, editable=False)
+
+    CAMPOS_CONTADORES = ('total_inscritos',)
+    # Comparados pelos signals de pre_save/post_save (cancelar transportes, ocupação)
+    CAMPOS_RASTREADOS = ('ativo', 'veiculo_id')
+
+    objects = RotaQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Rota"
         verbose_name_plural = "Rotas"
         ordering = ["nome"]
+        indexes = [
+            models.Index(
+                fields=['veiculo', 'hora_partida', 'hora_chegada'],
+                condition=models.Q(ativo=True),
+                name='idx_rota_turno_ativa',
+            ),
+        ]
 
     def clean(self):
         super().clean()
@@ -288,23 +619,46 @@ class Rota(models.Model):
             raise ValidationError({"veiculo": "O motorista tem carta de condução vencida."})
 
         if self.ativo:
-            for outra in Rota.objects.filter(veiculo=self.veiculo, ativo=True).exclude(pk=self.pk):
-                if self.hora_partida < outra.hora_chegada and self.hora_chegada > outra.hora_partida:
-                    raise ValidationError({
-                        "hora_partida": (
-                            f"Conflito de turno com a rota '{outra.nome}' "
-                            f"({outra.hora_partida}–{outra.hora_chegada})."
-                        )
-                    })
+            outra = Rota.objects.conflitos_de_turno(
+                self.veiculo_id, self.hora_partida, self.hora_chegada, excluir_pk=self.pk,
+            ).first()
+            if outra:
+                raise ValidationError({
+                    "hora_partida": (
+                        f"Conflito de turno com a rota '{outra.nome}' "
+                        f"({outra.hora_partida}–{outra.hora_chegada})."
+                    )
+                })
 
     @property
     def motorista(self):
         """Atalho para o motorista do veículo desta rota."""
         return self.veiculo.motorista
 
-    @property
-    def total_inscritos(self) -> int:
-        return self.alunos.count()
+    def save(self, *args, **kwargs):
+        _proteger_contadores(self, kwargs)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def actualizar_contadores(cls, rota_ids) -> None:
+        """
+        Reconta total_inscritos das rotas indicadas e a ocupação dos seus
+        veículos — dois UPDATE, seja qual for o número de rotas.
+        """
+        inscritos = (
+            cls.alunos.through.objects
+            .filter(rota_id=OuterRef('pk'))
+            .order_by()
+            .values('rota_id')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        cls.objects.filter(pk__in=rota_ids).update(
+            total_inscritos=Coalesce(Subquery(inscritos), Value(0)),
+        )
+        Veiculo.actualizar_ocupacao(
+            cls.objects.filter(pk__in=rota_ids).values('veiculo_id')
+        )
 
     @property
     def alunos_embarcados_hoje(self):
@@ -319,6 +673,273 @@ class Rota(models.Model):
         return f"Rota: {self.nome} — {self.veiculo.matricula}"
 
 
+class TransporteAlunoManager(models.Manager):
+
+    TAMANHO_LOTE = 500
+    # Duração máxima esperada de uma transacção que grava check-ins (ver cursor_sincronizacao)
+    JANELA_SINCRONIZACAO = datetime.timedelta(seconds=30)
+
+    def gerar_lista_diaria(self, data: datetime.date = None, tamanho_lote: int = None,
+                           dry_run: bool = False) -> dict:
+        """
+        Cria os registos PENDENTE do dia para todos os alunos inscritos em
+        todas as rotas elegíveis — o check-in da manhã passa a ser só um
+        UPDATE de status.
+
+        As regras de TransporteAluno.clean() são aplicadas por rota, numa
+        única query, e não por registo:
+          - rota activa
+          - veículo activo e sem manutenção em curso
+          - aluno inscrito (os pares vêm da própria tabela M2M) e activo
+
+        Registos já existentes para o dia são mantidos; os novos entram em
+        lotes de `tamanho_lote` com bulk_create (ignore_conflicts cobre um
+        check-in manual ou outra execução que chegue entretanto).
+
+        Devolve {'data', 'rotas', 'rotas_ignoradas', 'tentados',
+        'registos_do_dia'}. `tentados` são os registos em falta à leitura
+        das inscrições — os que o ignore_conflicts descarta (já inseridos
+        por outra execução) também contam; `registos_do_dia` é a contagem
+        feita depois do INSERT.
+        """
+        data = data or datetime.date.today()
+        tamanho_lote = tamanho_lote or self.TAMANHO_LOTE
+
+        rotas = (
+            Rota.objects
+            .filter(ativo=True)
+            .annotate(
+                veiculo_em_manutencao=Exists(
+                    Manutencao.objects.filter(veiculo=OuterRef('veiculo_id'), concluida=False)
+                ),
+            )
+            .values_list('pk', 'veiculo__ativo', 'veiculo_em_manutencao')
+        )
+        elegiveis, ignoradas = [], []
+        for rota_id, veiculo_ativo, em_manutencao in rotas:
+            (elegiveis if veiculo_ativo and not em_manutencao else ignoradas).append(rota_id)
+
+        inscricoes = (
+            Rota.alunos.through.objects
+            .filter(rota_id__in=elegiveis, aluno__ativo=True)
+            .filter(~Exists(self.model.objects.filter(
+                data=data, rota_id=OuterRef('rota_id'), aluno_id=OuterRef('aluno_id'),
+            )))
+            .order_by('rota_id', 'aluno_id')
+            .values_list('rota_id', 'aluno_id')
+        )
+        novos = [
+            self.model(aluno_id=aluno_id, rota_id=rota_id, data=data, status='PENDENTE')
+            for rota_id, aluno_id in inscricoes
+        ]
+
+        if novos and not dry_run:
+            with transaction.atomic():
+                self.bulk_create(novos, batch_size=tamanho_lote, ignore_conflicts=True)
+        registos_do_dia = self.filter(data=data).count()
+
+        logger.info(
+            'Lista de embarque %s: %d registo(s) tentado(s), %d no dia, em %d rota(s); '
+            '%d rota(s) ignorada(s).',
+            data, len(novos), registos_do_dia, len(elegiveis), len(ignoradas),
+        )
+        return {
+            'data': data,
+            'rotas': len(elegiveis),
+            'rotas_ignoradas': ignoradas,
+            'tentados': len(novos),
+            'registos_do_dia': registos_do_dia,
+        }
+
+    def registar_check_ins(self, rota: 'Rota', itens: list, data: datetime.date = None,
+                           utilizador=None) -> list:
+        """
+        Aplica um lote de check-ins de uma rota numa única transacção.
+
+        `itens` é uma lista de dicts {'aluno': id, 'status': ..., 'registado_em':
+        datetime do cliente}. São aplicados por ordem de registado_em (o
+        telemóvel pode juntar EMBARCADO e DESEMBARCADO do mesmo aluno no mesmo
+        envio) com as transições de TransporteAluno.TRANSICOES.
+
+        Conflitos resolvem-se pela hora do cliente: um item mais antigo do
+        que a última alteração já registada no servidor para esse aluno
+        perde ('conflito') e o registo fica como está.
+
+        Queries, seja qual for o tamanho do lote:
+          - registos do dia (SELECT ... FOR UPDATE)
+          - inscrições e estado da rota, só se faltar algum registo
+          - um INSERT para os registos em falta, um UPDATE para os restantes
+          - um INSERT para a auditoria (RegistoEmbarque)
+
+        Um item inválido não anula os outros: devolve uma entrada por item,
+        na ordem recebida, com 'resultado' = 'ok' | 'sem_alteracao' |
+        'conflito' | 'erro'.
+
+        Se outro lote criar ao mesmo tempo um registo que faltava, o INSERT
+        falha na constraint única e o lote é repetido uma vez, já sobre esse
+        registo.
+        """
+        data = data or datetime.date.today()
+        for tentativa in (1, 2):
+            try:
+                resultados, registos, eventos = self._aplicar_check_ins(rota, itens, data, utilizador)
+                break
+            except IntegrityError:
+                # O SELECT ... FOR UPDATE não bloqueia registos que ainda não
+                # existem: outro lote criou ao mesmo tempo o registo de um aluno
+                # em falta (unique aluno/rota/data). Na segunda tentativa esse
+                # registo já é lido e bloqueado, e as transições são avaliadas sobre ele.
+                if tentativa == 2:
+                    raise
+                logger.info('[%s] Check-in em lote na rota %s: registo criado em paralelo, a repetir.',
+                            data, rota.nome)
+
+        for resultado in resultados:
+            registo = registos.get(resultado['aluno'])
+            resultado['id'] = registo.pk if registo else None
+            resultado['status'] = registo.status if registo else None
+
+        logger.info(
+            '[%s] Check-in em lote na rota %s: %d alteração(ões), %d erro(s).',
+            data, rota.nome, len(eventos),
+            sum(1 for r in resultados if r['resultado'] in ('erro', 'conflito')),
+        )
+        return resultados
+
+    def _aplicar_check_ins(self, rota, itens, data, utilizador):
+        """Corpo de registar_check_ins(), numa transacção (savepoint) própria."""
+        ordem = sorted(range(len(itens)), key=lambda i: (itens[i]['registado_em'], i))
+        aluno_ids = {item['aluno'] for item in itens}
+
+        with transaction.atomic():
+            ultimo_registo = (
+                RegistoEmbarque.objects
+                .filter(transporte=OuterRef('pk'), registado_em__isnull=False)
+                .order_by('-registado_em')
+                .values('registado_em')[:1]
+            )
+            registos = {
+                t.aluno_id: t
+                for t in (
+                    self.select_for_update()
+                    .filter(rota=rota, data=data, aluno_id__in=aluno_ids)
+                    .annotate(ultimo_registo_em=Subquery(ultimo_registo))
+                )
+            }
+
+            em_falta = aluno_ids - registos.keys()
+            inscritos, erro_rota = set(), None
+            if em_falta:
+                inscritos = set(
+                    rota.alunos.filter(pk__in=em_falta, ativo=True).values_list('pk', flat=True)
+                )
+                if not rota.ativo:
+                    erro_rota = 'A rota está inactiva.'
+                elif rota.veiculo.em_manutencao():
+                    erro_rota = 'O veículo da rota está em manutenção.'
+
+            novos, alterados, eventos = [], {}, []
+            resultados = [None] * len(itens)
+            for i in ordem:
+                item = itens[i]
+                aluno_id, pedido = item['aluno'], item['status']
+                registo = registos.get(aluno_id)
+                anterior = registo.status if registo else 'PENDENTE'
+
+                erro = None
+                if registo is None and aluno_id not in inscritos:
+                    erro = 'Este aluno não está inscrito nesta rota.'
+                elif registo is None and erro_rota:
+                    erro = erro_rota
+                elif pedido != anterior and not self.model.transicao_valida(anterior, pedido):
+                    erro = f'Transição inválida: {anterior} → {pedido}.'
+                if erro:
+                    resultados[i] = {'aluno': aluno_id, 'resultado': 'erro', 'erro': erro}
+                    continue
+
+                if pedido == anterior:
+                    resultados[i] = {'aluno': aluno_id, 'resultado': 'sem_alteracao'}
+                    continue
+
+                ultimo = getattr(registo, 'ultimo_registo_em', None)
+                if ultimo and item['registado_em'] < ultimo:
+                    resultados[i] = {
+                        'aluno': aluno_id, 'resultado': 'conflito',
+                        'erro': f'Já existe uma alteração mais recente ({ultimo.isoformat()}).',
+                    }
+                    continue
+
+                if registo is None:
+                    registo = self.model(aluno_id=aluno_id, rota=rota, data=data)
+                    registos[aluno_id] = registo
+                    novos.append(registo)
+                elif registo.pk:
+                    alterados[registo.pk] = registo
+                registo.status = pedido
+                eventos.append((registo, anterior, pedido, item['registado_em']))
+                resultados[i] = {'aluno': aluno_id, 'resultado': 'ok'}
+
+            if novos:
+                self.bulk_create(novos)
+                if any(t.pk is None for t in novos):
+                    # Backends sem RETURNING no bulk_create: lê os ids de volta
+                    ids = dict(
+                        self.filter(rota=rota, data=data, aluno_id__in=[t.aluno_id for t in novos])
+                        .values_list('aluno_id', 'pk')
+                    )
+                    for t in novos:
+                        t.pk = ids[t.aluno_id]
+            if alterados:
+                # bulk_update não passa pelo auto_now: a versão é posta à mão
+                agora = timezone.now()
+                for t in alterados.values():
+                    t.atualizado_em = agora
+                self.bulk_update(alterados.values(), ['status', 'atualizado_em'])
+            if eventos:
+                RegistoEmbarque.objects.bulk_create([
+                    RegistoEmbarque(
+                        transporte_id=registo.pk,
+                        status_anterior=anterior,
+                        status=pedido,
+                        registado_por=utilizador,
+                        registado_em=registado_em,
+                    )
+                    for registo, anterior, pedido, registado_em in eventos
+                ])
+        return resultados, registos, eventos
+
+    def alteracoes_desde(self, rota: 'Rota', data: datetime.date, cursor: datetime.datetime = None):
+        """
+        Registos da rota/dia alterados depois de `cursor` (todos, se None),
+        por ordem de versão (atualizado_em). Base da sincronização offline.
+        """
+        qs = self.filter(rota=rota, data=data)
+        if cursor is not None:
+            qs = qs.filter(atualizado_em__gt=cursor)
+        return qs.order_by('atualizado_em', 'pk')
+
+    def cursor_sincronizacao(self, linhas, cursor, lido_em: datetime.datetime):
+        """
+        Cursor a devolver depois de enviar `linhas` (lidas em `lido_em`).
+
+        atualizado_em é a hora de gravação, não a de commit: uma transacção
+        que gravou às t1 e faz commit depois de outra que gravou às t2 > t1
+        não estava visível na leitura, e um cursor t2 saltava-a. Por isso o
+        cursor nunca passa de lido_em - JANELA_SINCRONIZACAO — o que foi
+        gravado nessa janela volta na sincronização seguinte (reenviar uma
+        linha é inofensivo: o telemóvel substitui-a pelo mesmo estado).
+
+        Limitação: uma transacção mais longa do que a janela pode ainda
+        perder-se; a descarga completa (sem cursor) repõe sempre a lista.
+        """
+        if linhas:
+            cursor = linhas[-1].atualizado_em
+        limite = lido_em - self.JANELA_SINCRONIZACAO
+        if cursor is not None and cursor > limite:
+            cursor = limite
+        return cursor
+
+
 class TransporteAluno(models.Model):
     """
     Registo diário de embarque/desembarque de um aluno numa rota.
@@ -332,12 +953,26 @@ class TransporteAluno(models.Model):
         ("PENDENTE", "Pendente"),
         ("EMBARCADO", "Embarcado"),
         ("DESEMBARCADO", "Desembarcado"),
+        ("CANCELADO", "Cancelado"),
     ]
 
+    # Transições válidas: PENDENTE → EMBARCADO → DESEMBARCADO.
+    # CANCELADO só é escrito pela desactivação da rota (nunca por check-in).
+    TRANSICOES = {
+        'PENDENTE': ['EMBARCADO'],
+        'EMBARCADO': ['DESEMBARCADO'],
+        'DESEMBARCADO': [],
+        'CANCELADO': [],
+    }
+
     aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name='transportes')
     rota = models.ForeignKey(Rota, on_delete=models.CASCADE, related_name='transportes')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDENTE")
     data = models.DateField(default=datetime.date.today)
+    # Versão do registo para a sincronização offline (cursor do cliente)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    objects = TransporteAlunoManager()
 
     class Meta:
         verbose_name = "Transporte de Aluno"
@@ -349,6 +984,11 @@ class TransporteAluno(models.Model):
                 name='unique_transporte_aluno_por_dia'
             )
         ]
+        indexes = [
+            models.Index(fields=['rota', 'data', 'atualizado_em'], name='idx_transporte_sync'),
+            # Paginação por cursor (core.pagination.TransporteAlunoPagination)
+            models.Index(fields=['-data', '-id'], name='idx_transporte_data_id'),
+        ]
 
     def clean(self):
         super().clean()
@@ -363,6 +1003,44 @@ class TransporteAluno(models.Model):
     def __str__(self):
         return f"{self.aluno} — {self.rota} ({self.status}) [{self.data}]"
 
+    @classmethod
+    def transicao_valida(cls, anterior: str, novo: str) -> bool:
+        return novo in cls.TRANSICOES.get(anterior, [])
+
+
+class RegistoEmbarque(models.Model):
+    """
+    Auditoria das mudanças de status de TransporteAluno.
+
+    Uma linha por transição aplicada, escrita em bulk pelo check-in (um
+    INSERT por pedido, seja de um aluno ou de um lote). `registado_em` é a
+    hora indicada pelo telemóvel; `recebido_em` a hora a que chegou ao
+    servidor.
+    """
+
+    transporte = models.ForeignKey(
+        TransporteAluno, on_delete=models.CASCADE, related_name='registos_embarque'
+    )
+    status_anterior = models.CharField(max_length=20, choices=TransporteAluno.STATUS_CHOICES)
+    status = models.CharField(max_length=20, choices=TransporteAluno.STATUS_CHOICES)
+    registado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='registos_embarque',
+    )
+    registado_em = models.DateTimeField(null=True, blank=True)
+    recebido_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Registo de Embarque"
+        verbose_name_plural = "Registos de Embarque"
+        ordering = ["-recebido_em"]
+
+    def __str__(self):
+        return f"{self.transporte_id}: {self.status_anterior} → {self.status}"
+
 
 class Manutencao(models.Model):
 
@@ -461,15 +1139,181 @@ class Abastecimento(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        novo = self._state.adding
         with transaction.atomic():
             if self.quilometragem_no_ato > self.veiculo.quilometragem_atual:
                 Veiculo.objects.filter(pk=self.veiculo_id).update(
                     quilometragem_atual=self.quilometragem_no_ato
                 )
+            veiculo_anterior = None if novo else (
+                Abastecimento.objects.filter(pk=self.pk).values_list('veiculo_id', flat=True).first()
+            )
             super().save(*args, **kwargs)
+            # Totais de consumo: incremento num registo novo, recálculo numa edição
+            if novo:
+                ConsumoVeiculo.registar(self)
+            else:
+                ConsumoVeiculo.recalcular(self.veiculo_id)
+                if veiculo_anterior and veiculo_anterior != self.veiculo_id:
+                    ConsumoVeiculo.recalcular(veiculo_anterior)
 
     def __str__(self):
         return (
             f"{self.veiculo.matricula} — {self.data} "
             f"({self.quantidade_litros}L @ {self.posto_combustivel})"
         )
+
+
+class ConsumoVeiculo(models.Model):
+    """
+    Totais de combustível por veículo, mantidos a cada abastecimento.
+
+    Guarda o necessário para o consumo médio (primeira e última leitura do
+    conta-quilómetros, litros abastecidos depois da primeira) e o custo
+    total — leituras O(1) em vez de percorrer o histórico de abastecimentos.
+
+    Actualizado por Abastecimento.save() (incremento) e pelo signal de
+    post_delete (recálculo). Para corrigir desvios:
+      python manage.py reconstruir_consumo_veiculos
+    """
+
+    veiculo = models.OneToOneField(
+        Veiculo,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumo_combustivel',
+    )
+    registos = models.PositiveIntegerField(default=0)
+    km_inicial = models.PositiveIntegerField(default=0)
+    km_final = models.PositiveIntegerField(default=0)
+    litros_apos_inicial = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    custo_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    actualizado_em = models.DateTimeField(auto_now=True)
+
+    TOTAIS_VAZIOS = {
+        'registos': 0, 'km_inicial': 0, 'km_final': 0,
+        'litros_apos_inicial': Decimal('0'), 'custo_total': Decimal('0'),
+    }
+
+    class Meta:
+        verbose_name = "Consumo do Veículo"
+        verbose_name_plural = "Consumo dos Veículos"
+
+    # ------------------------------------------------------------------
+    # Manutenção dos totais
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def registar(cls, abastecimento: 'Abastecimento') -> 'ConsumoVeiculo':
+        """Soma um abastecimento novo aos totais do veículo."""
+        with transaction.atomic():
+            obj, _ = cls.objects.select_for_update().get_or_create(veiculo_id=abastecimento.veiculo_id)
+            km = abastecimento.quilometragem_no_ato
+
+            if obj.registos and km < obj.km_inicial:
+                # Leitura anterior à primeira conhecida: a ordem mudou, recalcular
+                return cls.recalcular(abastecimento.veiculo_id)
+
+            if obj.registos == 0:
+                obj.km_inicial = km
+                obj.km_final = km
+            else:
+                obj.km_final = max(obj.km_final, km)
+                obj.litros_apos_inicial += abastecimento.quantidade_litros
+            obj.registos += 1
+            obj.custo_total += abastecimento.custo_total
+            obj.save()
+        return obj
+
+    @classmethod
+    def _totais(cls, veiculo_ids=None) -> dict:
+        """
+        Totais calculados a partir dos abastecimentos, numa query.
+
+        Window functions por veículo devolvem em cada linha a primeira
+        leitura (e os seus litros) e os totais da partição; o DISTINCT
+        reduz a uma linha por veículo.
+        """
+        por_veiculo = {'partition_by': [F('veiculo_id')]}
+        ordem_km = [F('quilometragem_no_ato').asc(), F('pk').asc()]
+
+        qs = Abastecimento.objects.order_by()
+        if veiculo_ids is not None:
+            qs = qs.filter(veiculo_id__in=veiculo_ids)
+
+        linhas = (
+            qs.annotate(
+                _km_inicial=Window(FirstValue('quilometragem_no_ato'), order_by=ordem_km, **por_veiculo),
+                _litros_iniciais=Window(FirstValue('quantidade_litros'), order_by=ordem_km, **por_veiculo),
+                _km_final=Window(Max('quilometragem_no_ato'), **por_veiculo),
+                _litros=Window(Sum('quantidade_litros'), **por_veiculo),
+                _custo=Window(Sum('custo_total'), **por_veiculo),
+                _registos=Window(Count('id'), **por_veiculo),
+            )
+            .values_list(
+                'veiculo_id', '_registos', '_km_inicial', '_km_final',
+                '_litros', '_litros_iniciais', '_custo',
+            )
+            .distinct()
+        )
+        return {
+            veiculo_id: {
+                'registos': registos,
+                'km_inicial': km_inicial,
+                'km_final': km_final,
+                'litros_apos_inicial': Decimal(litros) - Decimal(litros_iniciais),
+                'custo_total': Decimal(custo),
+            }
+            for veiculo_id, registos, km_inicial, km_final, litros, litros_iniciais, custo in linhas
+        }
+
+    @classmethod
+    def recalcular(cls, veiculo_id: int, criar: bool = True) -> 'ConsumoVeiculo | None':
+        """
+        Recalcula os totais de um veículo a partir dos abastecimentos.
+
+        Com criar=False só actualiza uma linha existente — usado no
+        post_delete, onde o veículo pode estar a ser apagado em cascata.
+        """
+        totais = cls._totais([veiculo_id]).get(veiculo_id, cls.TOTAIS_VAZIOS)
+        if not criar:
+            cls.objects.filter(veiculo_id=veiculo_id).update(**totais)
+            return None
+        obj, _ = cls.objects.update_or_create(veiculo_id=veiculo_id, defaults=totais)
+        return obj
+
+    @classmethod
+    def obter(cls, veiculo_id: int) -> 'ConsumoVeiculo':
+        """Leitura O(1); calcula os totais na primeira vez que são pedidos."""
+        try:
+            return cls.objects.get(veiculo_id=veiculo_id)
+        except cls.DoesNotExist:
+            return cls.recalcular(veiculo_id)
+
+    @classmethod
+    def reconstruir(cls, veiculo_ids=None) -> int:
+        """Recalcula os totais dos veículos indicados (default: todos)."""
+        if veiculo_ids is None:
+            veiculo_ids = list(Veiculo.objects.values_list('pk', flat=True))
+        totais = cls._totais(veiculo_ids)
+        with transaction.atomic():
+            cls.objects.filter(veiculo_id__in=veiculo_ids).delete()
+            cls.objects.bulk_create([
+                cls(veiculo_id=veiculo_id, **totais.get(veiculo_id, cls.TOTAIS_VAZIOS))
+                for veiculo_id in veiculo_ids
+            ])
+        return len(veiculo_ids)
+
+    # ------------------------------------------------------------------
+    # Derivados
+    # ------------------------------------------------------------------
+
+    @property
+    def consumo_medio(self) -> float:
+        """km/litro — mesma regra de sempre: precisa de pelo menos dois abastecimentos."""
+        if self.registos < 2 or not self.litros_apos_inicial:
+            return 0.0
+        return float((self.km_final - self.km_inicial) / self.litros_apos_inicial)
+
+    def __str__(self):
+        return f"Consumo {self.veiculo_id}: {self.consumo_medio:.2f} km/l"
@@ -3,9 +3,12 @@ transporte/serializers.py
 Serializers DRF para o módulo transporte.
 """
 
+from django.utils.dateparse import parse_datetime
 from rest_framework import serializers
 from core.serializers import MotoristaListSerializer
-from transporte.models import Abastecimento, Manutencao, Rota, TransporteAluno, Veiculo
+from transporte.models import (
+    Abastecimento, Manutencao, RegistoEmbarque, Rota, TransporteAluno, Veiculo,
+)
 
 
 class VeiculoListSerializer(serializers.ModelSerializer):
@@ -45,7 +48,7 @@ class VeiculoSerializer(serializers.ModelSerializer):
     em_manutencao = serializers.BooleanField(read_only=True)
     precisa_manutencao = serializers.BooleanField(read_only=True)
     doc_em_dia = serializers.BooleanField(source='document_em_dia', read_only=True)
-    alunos_count = serializers.IntegerField(read_only=True, default=0)
+    alunos_count = serializers.IntegerField(source='lugares_ocupados', read_only=True)
 
     class Meta:
         model = Veiculo
@@ -168,17 +171,43 @@ class RotaWriteSerializer(serializers.ModelSerializer):
             })
 
         if veiculo and ativo:
-            for outra in Rota.objects.filter(veiculo=veiculo, ativo=True).exclude(pk=pk):
-                if hora_partida < outra.hora_chegada and hora_chegada > outra.hora_partida:
-                    raise serializers.ValidationError({
-                        'hora_partida': (
-                            f"Conflito de turno com a rota '{outra.nome}' "
-                            f"({outra.hora_partida}–{outra.hora_chegada})."
-                        )
-                    })
+            outra = Rota.objects.conflitos_de_turno(
+                veiculo.pk, hora_partida, hora_chegada, excluir_pk=pk,
+            ).first()
+            if outra:
+                raise serializers.ValidationError({
+                    'hora_partida': (
+                        f"Conflito de turno com a rota '{outra.nome}' "
+                        f"({outra.hora_partida}–{outra.hora_chegada})."
+                    )
+                })
         return data
 
 
+class HorarioRotaSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False, min_value=1)
+    nome = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    veiculo = serializers.IntegerField(min_value=1)
+    hora_partida = serializers.TimeField()
+    hora_chegada = serializers.TimeField()
+    ativo = serializers.BooleanField(default=True)
+
+
+class ValidarHorariosSerializer(serializers.Serializer):
+    """Payload de POST /rotas/validar-horarios/: { "rotas": [ {...}, ... ] }."""
+
+    MAX_ROTAS = 500
+
+    rotas = HorarioRotaSerializer(many=True, allow_empty=False)
+
+    def validate_rotas(self, value):
+        if len(value) > self.MAX_ROTAS:
+            raise serializers.ValidationError(
+                f'Máximo de {self.MAX_ROTAS} rotas por validação (recebidas {len(value)}).'
+            )
+        return value
+
+
 class TransporteAlunoSerializer(serializers.ModelSerializer):
     """Leitura do registo diário de transporte."""
 
@@ -222,13 +251,7 @@ class CheckInSerializer(serializers.ModelSerializer):
         if not instance:
             return value
 
-        # Transições válidas: PENDENTE → EMBARCADO → DESEMBARCADO
-        TRANSICOES = {
-            'PENDENTE': ['EMBARCADO'],
-            'EMBARCADO': ['DESEMBARCADO'],
-            'DESEMBARCADO': [],
-        }
-        permitidas = TRANSICOES.get(instance.status, [])
+        permitidas = TransporteAluno.TRANSICOES.get(instance.status, [])
         if value != instance.status and value not in permitidas:
             raise serializers.ValidationError(
                 f"Transição inválida: {instance.status} → {value}. "
@@ -236,6 +259,93 @@ class CheckInSerializer(serializers.ModelSerializer):
             )
         return value
 
+    def update(self, instance, validated_data):
+        # O registo do dia já existe (lista de embarque): só o status muda
+        anterior = instance.status
+        instance.status = validated_data.get('status', instance.status)
+        instance.save(update_fields=['status', 'atualizado_em'])
+        if instance.status != anterior:
+            request = self.context.get('request')
+            RegistoEmbarque.objects.create(
+                transporte=instance,
+                status_anterior=anterior,
+                status=instance.status,
+                registado_por=request.user if request else None,
+                registado_em=instance.atualizado_em,
+            )
+        return instance
+
+
+class CheckInLoteItemSerializer(serializers.Serializer):
+    aluno = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(choices=TransporteAluno.STATUS_CHOICES)
+    registado_em = serializers.DateTimeField()
+
+
+class CheckInLoteSerializer(serializers.Serializer):
+    """
+    Payload do check-in em lote (POST /rotas/{id}/check-in-lote/).
+
+    { "data": "AAAA-MM-DD" (opcional, default hoje),
+      "itens": [{"aluno": 1, "status": "EMBARCADO", "registado_em": "..."}] }
+    """
+
+    MAX_ITENS = 200
+
+    data = serializers.DateField(required=False)
+    itens = CheckInLoteItemSerializer(many=True, allow_empty=False)
+
+    def validate_itens(self, value):
+        if len(value) > self.MAX_ITENS:
+            raise serializers.ValidationError(
+                f'Máximo de {self.MAX_ITENS} itens por lote (recebidos {len(value)}).'
+            )
+        return value
+
+
+class SincronizacaoSerializer(serializers.Serializer):
+    """
+    Payload da sincronização offline (GET/POST /rotas/{id}/sincronizar/).
+
+    { "data": "AAAA-MM-DD"   (opcional, default hoje),
+      "cursor": "..."        (devolvido pela sincronização anterior; vazio = tudo),
+      "alteracoes": [ ...itens como no check-in em lote... ] }
+    """
+
+    data = serializers.DateField(required=False)
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    alteracoes = CheckInLoteItemSerializer(many=True, required=False)
+
+    def validate_cursor(self, value):
+        if not value:
+            return None
+        try:
+            cursor = parse_datetime(value)
+        except ValueError:  # bem formado mas impossível (ex.: 30 de Fevereiro)
+            cursor = None
+        if cursor is None:
+            raise serializers.ValidationError('Cursor inválido.')
+        return cursor
+
+    def validate_alteracoes(self, value):
+        if len(value) > CheckInLoteSerializer.MAX_ITENS:
+            raise serializers.ValidationError(
+                f'Máximo de {CheckInLoteSerializer.MAX_ITENS} alterações por envio '
+                f'(recebidas {len(value)}).'
+            )
+        return value
+
+
+class TransporteAlunoSyncSerializer(serializers.ModelSerializer):
+    """Linha compacta da lista de embarque enviada ao telemóvel."""
+
+    aluno_nome = serializers.CharField(source='aluno.user.nome', read_only=True)
+
+    class Meta:
+        model = TransporteAluno
+        fields = ('id', 'aluno', 'aluno_nome', 'status', 'atualizado_em')
+        read_only_fields = fields
+
 
 class ManutencaoSerializer(serializers.ModelSerializer):
     """Leitura e criação de manutenções."""
@@ -4,12 +4,19 @@ transporte/signals.py
 Signals do módulo transporte.
 
 Signals:
-  - Veiculo.post_save         → alertar documentação a vencer
+  - Veiculo.post_save         → alertar documentação a vencer (se as validades mudaram)
   - Veiculo.pre_delete        → bloquear eliminação com rotas activas
   - Rota.pre_save             → desactivar transportes do dia se rota desactivada
-  - Manutencao.post_save      → desactivar rotas ao iniciar; criar DespesaVeiculo ao concluir
+  - Rota.post_save/post_delete → recontar ocupação do veículo
+  - Rota.alunos m2m_changed   → recontar inscritos da rota e ocupação do veículo
+  - Aluno.pre/post_delete     → idem, para as rotas do aluno apagado
+  - Manutencao.post_save      → desactivar rotas e cancelar transportes do dia ao iniciar;
+                                criar DespesaVeiculo ao concluir
   - Abastecimento.post_save   → log + criar DespesaVeiculo (COMBUSTIVEL) no financeiro
-  - TransporteAluno.post_save → log de embarque/desembarque
+  - Abastecimento.post_delete → recalcular ConsumoVeiculo
+
+Os valores anteriores de Veiculo/Rota (CAMPOS_RASTREADOS) vêm do snapshot
+guardado pelo CamposRastreadosMixin — nenhum signal relê o registo.
 
 REGRA DE DEPENDÊNCIAS:
   transporte/signals.py pode importar de `core` mas NUNCA no topo de `financeiro`.
@@ -20,20 +27,26 @@ REGRA DE DEPENDÊNCIAS:
 import datetime
 import logging
 from django.dispatch import receiver
+from django.utils import timezone
+from core.models import Aluno
 from financeiro.models import DespesaVeiculo
 from django.core.exceptions import PermissionDenied
-from django.db.models.signals import post_save, pre_delete, pre_save
-from transporte.models import Abastecimento, Manutencao, Rota, TransporteAluno, Veiculo
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from transporte.models import Abastecimento, ConsumoVeiculo, Manutencao, Rota, TransporteAluno, Veiculo
 
 logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Veiculo)
-def alertar_documentacao_veiculo(sender, instance, **kwargs):
+def alertar_documentacao_veiculo(sender, instance, created, **kwargs):
     """
-    Após guardar um Veículo, regista avisos no log para documentação
-    vencida ou a vencer nos próximos 30 dias (seguro, inspecção, manifesto).
+    Após criar um Veículo ou alterar uma das validades, regista avisos no log
+    para documentação vencida ou a vencer nos próximos 30 dias (seguro,
+    inspecção, manifesto). Os restantes saves não repetem os avisos.
     """
+    if not created and not any(instance.campo_alterado(c) for c in Veiculo.CAMPOS_RASTREADOS):
+        return
+
     hoje   = datetime.date.today()
     limite = hoje + datetime.timedelta(days=30)
 
@@ -77,21 +90,19 @@ def cancelar_transportes_ao_desactivar_rota(sender, instance, **kwargs):
     Quando uma Rota é desactivada (ativo: True → False),
     cancela os registos de TransporteAluno PENDENTE de hoje para esta rota.
     Registos EMBARCADO ou DESEMBARCADO são preservados.
-    """
-    if not instance.pk:
-        return
 
-    try:
-        anterior = Rota.objects.get(pk=instance.pk)
-    except Rota.DoesNotExist:
+    O valor anterior de `ativo` vem do snapshot da instância (CAMPOS_RASTREADOS),
+    sem reler a rota.
+    """
+    if instance._state.adding:
         return
 
-    if anterior.ativo and not instance.ativo:
+    if instance.valor_carregado('ativo') and not instance.ativo:
         cancelados = TransporteAluno.objects.filter(
             rota=instance,
             data=datetime.date.today(),
             status='PENDENTE',
-        ).update(status='CANCELADO')  # cancela os transportes pendentes do dia
+        ).update(status='CANCELADO', atualizado_em=timezone.now())  # cancela os pendentes do dia
 
         logger.info(
             'Rota "%s" desactivada — %d registo(s) de transporte de hoje afectado(s).',
@@ -99,27 +110,96 @@ def cancelar_transportes_ao_desactivar_rota(sender, instance, **kwargs):
         )
 
 
+# ──────────────────────────────────────────────
+# Contadores de inscritos / ocupação
+# ──────────────────────────────────────────────
+
+@receiver(m2m_changed, sender=Rota.alunos.through)
+def actualizar_contadores_inscricoes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Mantém Rota.total_inscritos e Veiculo.lugares_ocupados ao inscrever ou
+    remover alunos, pelos dois lados da relação (rota.alunos / aluno.rotas_transporte).
+    """
+    if action == 'pre_clear' and reverse:
+        # No clear() o pk_set vem vazio: guarda as rotas antes de as perder
+        instance._rotas_antes_de_limpar = list(instance.rotas_transporte.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if pk_set is not None and not pk_set:
+        return
+
+    if reverse:
+        rota_ids = list(pk_set) if pk_set is not None else instance.__dict__.pop('_rotas_antes_de_limpar', [])
+    else:
+        rota_ids = [instance.pk]
+    if not rota_ids:
+        return
+
+    Rota.actualizar_contadores(rota_ids)
+
+    if not reverse:
+        instance.refresh_from_db(fields=['total_inscritos'])
+        if Rota.veiculo.is_cached(instance):
+            instance.veiculo.refresh_from_db(fields=['lugares_ocupados'])
+
+
+@receiver(post_save, sender=Rota)
+def actualizar_ocupacao_ao_guardar_rota(sender, instance, created, **kwargs):
+    """
+    Activar/desactivar uma rota ou mudá-la de veículo altera a ocupação
+    do veículo (e do anterior). Uma rota nova ainda não tem inscritos, e
+    os restantes saves não mexem na ocupação.
+    """
+    if created:
+        return
+    if not (instance.campo_alterado('ativo') or instance.campo_alterado('veiculo_id')):
+        return
+    anterior = instance.valor_carregado('veiculo_id')
+    Veiculo.actualizar_ocupacao({instance.veiculo_id, anterior} - {None})
+
+
+@receiver(post_delete, sender=Rota)
+def actualizar_ocupacao_ao_apagar_rota(sender, instance, **kwargs):
+    Veiculo.actualizar_ocupacao([instance.veiculo_id])
+
+
+@receiver(pre_delete, sender=Aluno)
+def guardar_rotas_do_aluno_apagado(sender, instance, **kwargs):
+    """O delete em cascata da tabela M2M não dispara m2m_changed."""
+    instance._rotas_antes_de_apagar = list(instance.rotas_transporte.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Aluno)
+def actualizar_contadores_ao_apagar_aluno(sender, instance, **kwargs):
+    rota_ids = instance.__dict__.pop('_rotas_antes_de_apagar', [])
+    if rota_ids:
+        Rota.actualizar_contadores(rota_ids)
+
+
 @receiver(post_save, sender=Manutencao)
 def desactivar_rotas_ao_iniciar_manutencao(sender, instance, created, **kwargs):
     """
     Quando uma Manutenção é criada (não concluída), desactiva automaticamente
-    todas as rotas activas do veículo e regista um aviso.
+    todas as rotas activas do veículo — e cancela os transportes PENDENTE de
+    hoje dessas rotas — num único statement (RotaQuerySet.desactivar), e
+    regista um aviso.
 
     Quando a manutenção é concluída, regista o log mas NÃO reactiva as rotas
     automaticamente (decisão do gestor).
     """
     if created and not instance.concluida:
-        rotas_afectadas = Rota.objects.filter(
-            veiculo=instance.veiculo, ativo=True
-        )
-        count = rotas_afectadas.count()
-        if count:
-            rotas_afectadas.update(ativo=False)
+        rotas_afectadas = Rota.objects.filter(veiculo_id=instance.veiculo_id).desactivar()
+        if rotas_afectadas:
+            # O UPDATE em massa não passa pelo post_save das rotas
+            Veiculo.actualizar_ocupacao([instance.veiculo_id])
             logger.warning(
-                'Manutenção iniciada no veículo %s — %d rota(s) desactivada(s): %s.',
+                'Manutenção iniciada no veículo %s — %d rota(s) desactivada(s): %s; '
+                '%d transporte(s) de hoje cancelado(s).',
                 instance.veiculo.matricula,
-                count,
-                list(rotas_afectadas.values_list('nome', flat=True)),
+                len(rotas_afectadas),
+                [rota['nome'] for rota in rotas_afectadas],
+                sum(rota['cancelados'] for rota in rotas_afectadas),
             )
 
     if not created and instance.concluida and instance.custo > 0:
@@ -196,24 +276,10 @@ def lancar_abastecimento_no_financeiro(sender, instance, created, **kwargs):
         )
 
 
-@receiver(post_save, sender=TransporteAluno)
-def log_embarque_desembarque(sender, instance, created, **kwargs):
+@receiver(post_delete, sender=Abastecimento)
+def recalcular_consumo_ao_apagar_abastecimento(sender, instance, **kwargs):
     """
-    Regista no log cada mudança de status relevante:
-    PENDENTE → EMBARCADO ou EMBARCADO → DESEMBARCADO.
+    Recalcula os totais de consumo do veículo depois de apagar um abastecimento.
+    Só actualiza a linha existente: num delete em cascata do veículo não a recria.
     """
-    if instance.status == 'EMBARCADO':
-        logger.info(
-            '[%s] Embarque: aluno=%s, rota=%s, veículo=%s.',
-            instance.data,
-            instance.aluno.user.nome,
-            instance.rota.nome,
-            instance.rota.veiculo.matricula,
-        )
-    elif instance.status == 'DESEMBARCADO':
-        logger.info(
-            '[%s] Desembarque: aluno=%s, rota=%s.',
-            instance.data,
-            instance.aluno.user.nome,
-            instance.rota.nome,
-        )
+    ConsumoVeiculo.recalcular(instance.veiculo_id, criar=False)
@@ -4,6 +4,7 @@ transporte/tasks.py
 Tasks Celery do módulo transporte.
 
 Tasks periódicas (agendadas pelo Celery Beat):
+  - gerar_lista_embarque_diaria  → segunda a sexta às 04:30
   - notificar_cartas_conducao    → segundas às 08:30
   - notificar_documentos_veiculo → terças às 08:00
   - notificar_revisao_veiculo    → terças às 08:30
@@ -11,11 +12,30 @@ Tasks periódicas (agendadas pelo Celery Beat):
 
 import logging
 from celery import shared_task
-from datetime import date, timedelta
 
 logger = logging.getLogger(__name__)
 
 
+@shared_task(name='transporte.tasks.gerar_lista_embarque_diaria')
+def gerar_lista_embarque_diaria():
+    """
+    Cria os registos PENDENTE do dia para todos os alunos inscritos nas
+    rotas activas, antes da primeira partida.
+
+    Agendada: segunda a sexta às 04:30.
+    Equivalente ao management command: gerar_lista_embarque
+    """
+    from transporte.models import TransporteAluno
+
+    resultado = TransporteAluno.objects.gerar_lista_diaria()
+    if resultado['rotas_ignoradas']:
+        logger.warning(
+            'Rotas sem lista de embarque (veículo inactivo ou em manutenção): %s',
+            resultado['rotas_ignoradas'],
+        )
+    return {**resultado, 'data': resultado['data'].isoformat()}
+
+
 @shared_task(name='transporte.tasks.notificar_cartas_conducao')
 def notificar_cartas_conducao():
     """
@@ -25,75 +45,57 @@ def notificar_cartas_conducao():
     Agendada: segundas-feiras às 08:30.
     Equivalente ao management command: notificar_cartas_conducao
     """
-    from core.models import Motorista
-
-    hoje = date.today()
-    limite = hoje + timedelta(days=30)
-
-    motoristas = Motorista.objects.filter(
-        ativo=True
-    ).select_related('user')
-
-    vencidas = []
-    a_vencer = []
-
-    for m in motoristas:
-        if not m.validade_da_carta:
-            continue
-        if m.validade_da_carta < hoje:
-            vencidas.append(m.user.nome)
-            logger.warning(
-                'Carta VENCIDA: motorista=%s validade=%s',
-                m.user.nome, m.validade_da_carta
-            )
-        elif m.validade_da_carta <= limite:
-            a_vencer.append(m.user.nome)
-            logger.warning(
-                'Carta a vencer: motorista=%s validade=%s',
-                m.user.nome, m.validade_da_carta
-            )
+    from transporte.documentos import documentos_a_expirar
+
+    resultado = documentos_a_expirar(dias=30, documentos=['CARTA'])
+
+    for item in resultado['vencidos']:
+        logger.warning(
+            'Carta VENCIDA: motorista=%s validade=%s', item['referencia'], item['validade']
+        )
+    for item in resultado['a_vencer']:
+        logger.warning(
+            'Carta a vencer: motorista=%s validade=%s', item['referencia'], item['validade']
+        )
 
     logger.info(
         'notificar_cartas_conducao: %d vencida(s), %d a vencer.',
-        len(vencidas), len(a_vencer)
+        len(resultado['vencidos']), len(resultado['a_vencer'])
     )
-    return {'vencidas': vencidas, 'a_vencer': a_vencer}
+    return {
+        'vencidas': [item['referencia'] for item in resultado['vencidos']],
+        'a_vencer': [item['referencia'] for item in resultado['a_vencer']],
+    }
 
 
 @shared_task(name='transporte.tasks.notificar_documentos_veiculo')
 def notificar_documentos_veiculo():
     """
-    Verifica veículos com documentos (seguro, inspecção) vencidos
-    ou a vencer nos próximos 30 dias.
+    Verifica veículos com documentos (seguro, inspecção, manifesto)
+    vencidos ou a vencer nos próximos 30 dias.
 
     Agendada: terças-feiras às 08:00.
     Equivalente ao management command: notificar_documentos_veiculo
     """
-    from transporte.models import Veiculo
+    from transporte.documentos import DOCUMENTOS_VEICULO, documentos_a_expirar
 
-    hoje = date.today()
-    limite = hoje + timedelta(days=30)
+    resultado = documentos_a_expirar(dias=30, documentos=DOCUMENTOS_VEICULO)
 
-    veiculos = Veiculo.objects.filter(ativo=True)
+    problemas = {}
+    for item in resultado['vencidos']:
+        problemas.setdefault(item['referencia'], []).append(
+            f'{item["descricao"].lower()} vencido(a) em {item["validade"]}'
+        )
+    for item in resultado['a_vencer']:
+        problemas.setdefault(item['referencia'], []).append(
+            f'{item["descricao"].lower()} vence em {item["validade"]}'
+        )
 
     alertas = []
-    for v in veiculos:
-        problemas = []
-
-        if v.data_seguro and v.data_seguro < hoje:
-            problemas.append(f'seguro vencido em {v.data_seguro}')
-        elif v.data_seguro and v.data_seguro <= limite:
-            problemas.append(f'seguro vence em {v.data_seguro}')
-
-        if v.data_inspecao and v.data_inspecao < hoje:
-            problemas.append(f'inspecção vencida em {v.data_inspecao}')
-        elif v.data_inspecao and v.data_inspecao <= limite:
-            problemas.append(f'inspecção vence em {v.data_inspecao}')
-
-        if problemas:
-            msg = f'{v.matricula}: {", ".join(problemas)}'
-            alertas.append(msg)
-            logger.warning('Documentos veículo — %s', msg)
+    for matricula, lista in sorted(problemas.items()):
+        msg = f'{matricula}: {", ".join(lista)}'
+        alertas.append(msg)
+        logger.warning('Documentos veículo — %s', msg)
 
     logger.info(
         'notificar_documentos_veiculo: %d veículo(s) com alertas.', len(alertas)
@@ -112,20 +114,18 @@ def notificar_revisao_veiculo():
     """
     from transporte.models import Veiculo
 
-    veiculos = Veiculo.objects.filter(ativo=True)
-
     necessitam_revisao = []
-    for v in veiculos:
-        if v.necessita_revisao():
-            necessitam_revisao.append({
-                'matricula': v.matricula,
-                'quilometragem_atual': v.quilometragem_atual,
-                'km_proxima_revisao': v.km_proxima_revisao,
-            })
-            logger.warning(
-                'Revisão necessária: veiculo=%s km_atual=%s km_revisao=%s',
-                v.matricula, v.quilometragem_atual, v.km_proxima_revisao
-            )
+    for v in Veiculo.objects.a_precisar_revisao().order_by('matricula'):
+        necessitam_revisao.append({
+            'matricula': v.matricula,
+            'quilometragem_atual': v.quilometragem_atual,
+            'km_proxima_revisao': v.km_proxima_revisao,
+            'km_desde_revisao': v.km_desde_revisao,
+        })
+        logger.warning(
+            'Revisão necessária: veiculo=%s km_atual=%s km_revisao=%s',
+            v.matricula, v.quilometragem_atual, v.km_proxima_revisao
+        )
 
     logger.info(
         'notificar_revisao_veiculo: %d veículo(s) a necessitar revisão.',
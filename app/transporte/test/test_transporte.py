@@ -10,14 +10,18 @@ Executar:
 
 import datetime
 from decimal import Decimal
+from io import StringIO
 
 from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
 from rest_framework import status
 
 from tests.base import BaseAPITestCase, BaseTestCase
 from tests.factories import (
     criar_aluno,
+    criar_encarregado,
     criar_manutencao,
     criar_motorista,
     criar_rota,
@@ -63,6 +67,49 @@ class VeiculoManagerTests(TestCase):
         self.assertIn(v.pk, pks)
 
 
+class VeiculosAPrecisarRevisaoTests(TestCase):
+    """VeiculoQuerySet.a_precisar_revisao — mesma regra de precisa_manutencao(), em SQL."""
+
+    def _veiculo(self, n, **kwargs):
+        motorista = criar_motorista(
+            user=criar_user(role='MOTORISTA', email=f'mot_rev{n}@teste.co.mz'),
+        )
+        return criar_veiculo(motorista=motorista, matricula=f'REV-{n:03d}-MZ', **kwargs)
+
+    def setUp(self):
+        from transporte.models import Veiculo
+        # Sem histórico: compara quilometragem_atual com km_proxima_revisao
+        self.sem_historico = self._veiculo(1, quilometragem_atual=12000, km_proxima_revisao=10000)
+        # Revisto aos 8000 km; só volta a precisar aos 8000 + 5000
+        self.revisto = self._veiculo(2, quilometragem_atual=12000, km_proxima_revisao=5000)
+        criar_manutencao(veiculo=self.revisto, concluida=True, quilometragem_no_momento_revisao=8000)
+        # Já em manutenção: fica de fora
+        self.em_oficina = self._veiculo(3, quilometragem_atual=20000, km_proxima_revisao=1000)
+        criar_manutencao(veiculo=self.em_oficina, concluida=False)
+        # Revisto aos 2000 km com intervalo de 5000: precisa
+        self.atrasado = self._veiculo(4, quilometragem_atual=9000, km_proxima_revisao=5000)
+        criar_manutencao(veiculo=self.atrasado, concluida=True, quilometragem_no_momento_revisao=2000)
+        self.inativo = self._veiculo(5, quilometragem_atual=50000)
+        Veiculo.objects.filter(pk=self.inativo.pk).update(ativo=False)
+
+    def test_coincide_com_precisa_manutencao(self):
+        from transporte.models import Veiculo
+        with self.assertNumQueries(1):
+            pks = set(Veiculo.objects.a_precisar_revisao().values_list('pk', flat=True))
+
+        esperado = {v.pk for v in Veiculo.objects.filter(ativo=True) if v.precisa_manutencao()}
+        self.assertEqual(pks, esperado)
+        self.assertEqual(pks, {self.sem_historico.pk, self.atrasado.pk})
+
+    def test_task_usa_o_queryset(self):
+        from transporte.tasks import notificar_revisao_veiculo
+        resultado = notificar_revisao_veiculo()
+        self.assertEqual(
+            [(v['matricula'], v['km_desde_revisao']) for v in resultado['veiculos']],
+            [('REV-001-MZ', 12000), ('REV-004-MZ', 7000)],
+        )
+
+
 # ══════════════════════════════════════════════
 # VEICULO — MODELO
 # ══════════════════════════════════════════════
@@ -189,6 +236,156 @@ class RotaModelTests(TestCase):
         self.assertIn('Rota', str(criar_rota()))
 
 
+class ContadoresInscricaoTests(BaseAPITestCase):
+    """Rota.total_inscritos e Veiculo.lugares_ocupados mantidos por signals."""
+
+    def setUp(self):
+        super().setUp()
+        motorista = criar_motorista(user=criar_user(role='MOTORISTA', email='mot_cont@teste.co.mz'))
+        self.veiculo = criar_veiculo(motorista=motorista, capacidade=3)
+        self.rota = criar_rota(veiculo=self.veiculo)
+        self.alunos = [
+            criar_aluno(
+                user=criar_user(role='ALUNO', email=f'aluno_cont{i}@teste.co.mz'),
+                encarregado=criar_encarregado(
+                    user=criar_user(role='ENCARREGADO', email=f'enc_cont{i}@teste.co.mz'),
+                ),
+            )
+            for i in range(3)
+        ]
+
+    def _contadores(self):
+        from transporte.models import Rota, Veiculo
+        return (
+            Rota.objects.values_list('total_inscritos', flat=True).get(pk=self.rota.pk),
+            Veiculo.objects.values_list('lugares_ocupados', flat=True).get(pk=self.veiculo.pk),
+        )
+
+    def test_add_remove_clear_pelos_dois_lados(self):
+        self.rota.alunos.add(*self.alunos[:2])
+        self.assertEqual(self._contadores(), (2, 2))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.rota.total_inscritos, 2)
+            self.assertEqual(self.veiculo.vagas_disponiveis, 1)
+
+        self.alunos[2].rotas_transporte.add(self.rota)
+        self.assertEqual(self._contadores(), (3, 3))
+
+        self.rota.alunos.remove(self.alunos[0])
+        self.assertEqual(self._contadores(), (2, 2))
+
+        self.alunos[1].rotas_transporte.clear()
+        self.assertEqual(self._contadores(), (1, 1))
+
+        self.rota.alunos.clear()
+        self.assertEqual(self._contadores(), (0, 0))
+
+    def test_desactivar_rota_liberta_o_veiculo(self):
+        self.rota.alunos.add(*self.alunos)
+        self.rota.ativo = False
+        self.rota.save()
+        self.assertEqual(self._contadores(), (3, 0))
+
+    def test_save_com_instancia_antiga_nao_apaga_contador(self):
+        from transporte.models import Rota
+        antiga = Rota.objects.get(pk=self.rota.pk)
+        self.rota.alunos.add(*self.alunos)
+
+        antiga.descricao = 'Via marginal'
+        antiga.save()
+        self.assertEqual(self._contadores(), (3, 3))
+
+    def test_adicionar_aluno_usa_contador_para_capacidade(self):
+        self.rota.alunos.add(*self.alunos)
+        self.autenticar_como_gestor(email='gestor_cont@teste.co.mz')
+        extra = criar_aluno(
+            user=criar_user(role='ALUNO', email='aluno_cont_extra@teste.co.mz'),
+            encarregado=criar_encarregado(
+                user=criar_user(role='ENCARREGADO', email='enc_cont_extra@teste.co.mz'),
+            ),
+        )
+        resp = self.client.post(
+            f'/api/v1/rotas/{self.rota.pk}/adicionar-aluno/', {'aluno_id': extra.pk},
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Capacidade', resp.data['erro'])
+
+    def test_comando_reconcilia_desvios(self):
+        from transporte.models import Rota, Veiculo
+        self.rota.alunos.add(*self.alunos[:2])
+        Rota.objects.update(total_inscritos=9)
+        Veiculo.objects.update(lugares_ocupados=0)
+
+        out = StringIO()
+        call_command('reconciliar_contadores_rotas', stdout=out)
+
+        self.assertIn('1 rota(s) corrigida(s)', out.getvalue())
+        self.assertEqual(self._contadores(), (2, 2))
+
+
+class ValidarHorariosTests(BaseAPITestCase):
+    """Conflitos de turno numa query (Rota.clean) e validação de horários em lote."""
+
+    def setUp(self):
+        super().setUp()
+        motorista = criar_motorista(user=criar_user(role='MOTORISTA', email='mot_hor@teste.co.mz'))
+        self.veiculo = criar_veiculo(motorista=motorista)
+        self.manha = criar_rota(veiculo=self.veiculo, nome='Manhã')  # 06:00–07:30
+        self.tarde = criar_rota(
+            veiculo=self.veiculo, nome='Tarde',
+            hora_partida=datetime.time(12, 0), hora_chegada=datetime.time(13, 0),
+        )
+
+    def _rota(self, inicio, fim, **kwargs):
+        return {
+            'veiculo': self.veiculo.pk, 'nome': kwargs.pop('nome', f'{inicio}-{fim}'),
+            'hora_partida': datetime.time(*inicio), 'hora_chegada': datetime.time(*fim),
+            **kwargs,
+        }
+
+    def test_conflitos_de_turno_numa_query(self):
+        from transporte.models import Rota
+        with self.assertNumQueries(1):
+            conflitos = list(Rota.objects.conflitos_de_turno(
+                self.veiculo.pk, datetime.time(7, 0), datetime.time(12, 30),
+            ))
+        self.assertEqual(conflitos, [self.manha, self.tarde])
+
+    def test_valida_envio_contra_si_proprio_e_contra_a_bd(self):
+        from transporte.models import Rota
+        itens = [
+            self._rota((5, 0), (6, 30), id=self.manha.pk),   # substitui a Manhã
+            self._rota((6, 0), (7, 0)),                      # choca com o item 0
+            self._rota((12, 30), (13, 30)),                  # choca com a Tarde
+            self._rota((14, 0), (15, 0)),
+            self._rota((9, 0), (8, 0)),
+        ]
+        with self.assertNumQueries(2):
+            resultados = Rota.objects.validar_horarios(itens)
+
+        self.assertEqual([r['valido'] for r in resultados], [False, False, False, True, False])
+        self.assertEqual([c.get('indice') for c in resultados[0]['conflitos']], [1])
+        self.assertEqual([c.get('indice') for c in resultados[1]['conflitos']], [0])
+        self.assertEqual([c['rota'] for c in resultados[2]['conflitos']], [self.tarde.pk])
+        self.assertEqual(len(resultados[4]['erros']), 1)
+
+    def test_endpoint_so_para_gestor(self):
+        payload = {'rotas': [{
+            'veiculo': self.veiculo.pk, 'hora_partida': '07:00', 'hora_chegada': '08:00',
+        }]}
+        self._autenticar(self.veiculo.motorista.user)
+        self.assertEqual(
+            self.client.post('/api/v1/rotas/validar-horarios/', payload, format='json').status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+
+        self.autenticar_como_gestor(email='gestor_hor@teste.co.mz')
+        resp = self.client.post('/api/v1/rotas/validar-horarios/', payload, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(resp.data['valido'])
+        self.assertEqual(resp.data['resultados'][0]['conflitos'][0]['nome'], 'Manhã')
+
+
 # ══════════════════════════════════════════════
 # TRANSPORTE ALUNO
 # ══════════════════════════════════════════════
@@ -225,6 +422,89 @@ class TransporteAlunoTests(TestCase):
         self.assertIn('PENDENTE', str(criar_transporte_aluno()))
 
 
+class ListaEmbarqueDiariaTests(TestCase):
+    """TransporteAluno.objects.gerar_lista_diaria — registos PENDENTE em lote."""
+
+    DIA = datetime.date(2030, 3, 4)
+
+    def _rota(self, n, alunos):
+        motorista = criar_motorista(
+            user=criar_user(role='MOTORISTA', email=f'mot_lista{n}@teste.co.mz'),
+        )
+        veiculo = criar_veiculo(motorista=motorista, matricula=f'LST-{n:03d}-MZ')
+        enc = criar_encarregado(user=criar_user(role='ENCARREGADO', email=f'enc_lista{n}@teste.co.mz'))
+        return criar_rota(veiculo=veiculo, nome=f'Rota Lista {n}', alunos=[
+            criar_aluno(
+                encarregado=enc,
+                user=criar_user(role='ALUNO', email=f'aluno_lista{n}_{i}@teste.co.mz'),
+            )
+            for i in range(alunos)
+        ])
+
+    def setUp(self):
+        from transporte.models import Rota
+        self.rota_a = self._rota(1, 3)
+        self.rota_b = self._rota(2, 2)
+        # Veículo em manutenção: o signal desactiva a rota; reactivada à força
+        self.rota_oficina = self._rota(3, 2)
+        criar_manutencao(veiculo=self.rota_oficina.veiculo, concluida=False)
+        Rota.objects.filter(pk=self.rota_oficina.pk).update(ativo=True)
+
+    def test_cria_pendentes_para_rotas_elegiveis(self):
+        from transporte.models import TransporteAluno
+
+        # 2 SELECT + 1 INSERT + COUNT (+ SAVEPOINT/RELEASE do atomic dentro do teste)
+        with self.assertNumQueries(6):
+            resultado = TransporteAluno.objects.gerar_lista_diaria(self.DIA)
+
+        self.assertEqual(resultado['tentados'], 5)
+        self.assertEqual(resultado['registos_do_dia'], 5)
+        self.assertEqual(resultado['rotas_ignoradas'], [self.rota_oficina.pk])
+        registos = TransporteAluno.objects.filter(data=self.DIA)
+        self.assertEqual(registos.count(), 5)
+        self.assertFalse(registos.exclude(status='PENDENTE').exists())
+        self.assertFalse(registos.filter(rota=self.rota_oficina).exists())
+
+    def test_mantem_registos_existentes(self):
+        from transporte.models import TransporteAluno
+        aluno = self.rota_a.alunos.first()
+        TransporteAluno.objects.create(aluno=aluno, rota=self.rota_a, data=self.DIA, status='EMBARCADO')
+
+        self.assertEqual(TransporteAluno.objects.gerar_lista_diaria(self.DIA)['tentados'], 4)
+        self.assertEqual(TransporteAluno.objects.gerar_lista_diaria(self.DIA)['tentados'], 0)
+        self.assertEqual(
+            TransporteAluno.objects.get(aluno=aluno, rota=self.rota_a, data=self.DIA).status,
+            'EMBARCADO',
+        )
+
+    def test_registos_inseridos_por_outra_execucao(self):
+        from unittest.mock import patch
+        from transporte.models import TransporteAluno
+        bulk_create = TransporteAluno.objects.bulk_create
+        aluno = self.rota_a.alunos.first()
+
+        def execucao_paralela(novos, **kwargs):
+            # Outra execução insere um dos registos depois da leitura das inscrições
+            TransporteAluno.objects.create(aluno=aluno, rota=self.rota_a, data=self.DIA, status='PENDENTE')
+            return bulk_create(novos, **kwargs)
+
+        with patch.object(TransporteAluno.objects, 'bulk_create', side_effect=execucao_paralela):
+            resultado = TransporteAluno.objects.gerar_lista_diaria(self.DIA)
+
+        # O registo da outra execução foi tentado mas descartado pelo ignore_conflicts
+        self.assertEqual(resultado['tentados'], 5)
+        self.assertEqual(resultado['registos_do_dia'], 5)
+        self.assertEqual(TransporteAluno.objects.filter(data=self.DIA).count(), 5)
+
+    def test_comando_dry_run_nao_cria(self):
+        from transporte.models import TransporteAluno
+        out = StringIO()
+        call_command('gerar_lista_embarque', '--data', self.DIA.isoformat(), '--dry-run', stdout=out)
+
+        self.assertIn('5 registo(s) seriam criados', out.getvalue())
+        self.assertFalse(TransporteAluno.objects.filter(data=self.DIA).exists())
+
+
 # ══════════════════════════════════════════════
 # MANUTENCAO
 # ══════════════════════════════════════════════
@@ -322,6 +602,109 @@ class SignalDesactivarRotasManutencaoTests(TestCase):
         rota.refresh_from_db()
         self.assertFalse(rota.ativo)
 
+    def test_iniciar_manutencao_cancela_pendentes_de_hoje_e_liberta_veiculo(self):
+        from transporte.models import Rota, TransporteAluno
+        v = criar_veiculo(motorista=criar_motorista(
+            user=criar_user(role='MOTORISTA', email='mot_manut@teste.co.mz'),
+        ))
+        rota = criar_rota(veiculo=v)
+        alunos = [
+            criar_aluno(
+                user=criar_user(role='ALUNO', email=f'aluno_manut{i}@teste.co.mz'),
+                encarregado=criar_encarregado(
+                    user=criar_user(role='ENCARREGADO', email=f'enc_manut{i}@teste.co.mz'),
+                ),
+            )
+            for i in range(3)
+        ]
+        rota.alunos.add(*alunos)
+        pendente = criar_transporte_aluno(aluno=alunos[0], rota=rota)
+        embarcado = criar_transporte_aluno(aluno=alunos[1], rota=rota, status='EMBARCADO')
+        ontem = criar_transporte_aluno(
+            aluno=alunos[2], rota=rota, data=datetime.date.today() - datetime.timedelta(days=1),
+        )
+
+        criar_manutencao(veiculo=v)
+
+        estados = dict(TransporteAluno.objects.values_list('pk', 'status'))
+        self.assertEqual(estados[pendente.pk], 'CANCELADO')
+        self.assertEqual(estados[embarcado.pk], 'EMBARCADO')
+        self.assertEqual(estados[ontem.pk], 'PENDENTE')
+        self.assertFalse(Rota.objects.get(pk=rota.pk).ativo)
+        v.refresh_from_db()
+        self.assertEqual(v.lugares_ocupados, 0)
+
+    def test_desactivar_devolve_rotas_e_cancelados(self):
+        from transporte.models import Rota
+        v = criar_veiculo()
+        rota = criar_rota(veiculo=v)
+        criar_rota(veiculo=v, nome='Rota Inactiva', ativo=False,
+                   hora_partida=datetime.time(13, 0), hora_chegada=datetime.time(14, 0))
+        criar_transporte_aluno(rota=rota)
+
+        resultado = Rota.objects.filter(veiculo=v).desactivar()
+
+        self.assertEqual(
+            resultado,
+            [{'id': rota.pk, 'nome': rota.nome, 'veiculo_id': v.pk, 'cancelados': 1}],
+        )
+        self.assertEqual(Rota.objects.filter(veiculo=v).desactivar(), [])
+
+
+class CamposRastreadosTests(TestCase):
+    """Valores carregados de Rota/Veiculo comparados pelos signals sem reler o registo."""
+
+    def test_desactivar_rota_carregada_nao_rele_a_rota(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from transporte.models import Rota, TransporteAluno
+        transporte = criar_transporte_aluno()
+        rota = Rota.objects.get(pk=transporte.rota_id)
+
+        rota.ativo = False
+        with CaptureQueriesContext(connection) as queries:
+            rota.save()
+
+        selects_rota = [
+            q['sql'] for q in queries
+            if q['sql'].startswith('SELECT') and 'FROM "transporte_rota"' in q['sql']
+        ]
+        self.assertEqual(selects_rota, [])
+        self.assertEqual(TransporteAluno.objects.get(pk=transporte.pk).status, 'CANCELADO')
+
+    def test_snapshot_renovado_apos_save(self):
+        from transporte.models import Rota
+        rota = Rota.objects.get(pk=criar_rota().pk)
+        self.assertFalse(rota.campo_alterado('ativo'))
+
+        rota.ativo = False
+        self.assertTrue(rota.campo_alterado('ativo'))
+        rota.save()
+        self.assertFalse(rota.campo_alterado('ativo'))
+        self.assertFalse(rota.valor_carregado('ativo'))
+
+    def test_campo_diferido_lido_uma_vez(self):
+        from transporte.models import Veiculo
+        v = Veiculo.objects.only('matricula').get(pk=criar_veiculo().pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(v.campo_alterado('data_validade_seguro'))
+        with self.assertNumQueries(1):
+            self.assertEqual(v.valor_carregado('data_validade_seguro'), data_futura(365))
+            self.assertEqual(v.valor_carregado('data_validade_inspecao'), data_futura(365))
+
+    def test_alerta_documentacao_so_quando_validade_muda(self):
+        from transporte.models import Veiculo
+        v = Veiculo.objects.get(pk=criar_veiculo(data_validade_seguro=data_passada(5)).pk)
+
+        with self.assertNoLogs('transporte.signals', level='WARNING'):
+            v.quilometragem_atual = 1000
+            v.save()
+
+        with self.assertLogs('transporte.signals', level='WARNING') as logs:
+            v.data_validade_seguro = data_passada(1)
+            v.save()
+        self.assertIn('seguro VENCIDO', logs.output[0])
+
 
 # ══════════════════════════════════════════════
 # API — VEICULOS
@@ -363,6 +746,153 @@ class VeiculoAPITests(BaseAPITestCase):
         self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class DocumentosAExpirarTests(BaseAPITestCase):
+    """transporte.documentos — seguro, inspecção, manifesto e carta numa query."""
+
+    def setUp(self):
+        super().setUp()
+        self.motorista = self._motorista(1, validade_da_carta=data_futura(5))
+        self.veiculo = criar_veiculo(
+            motorista=self.motorista, matricula='DOC-001-MZ',
+            data_validade_seguro=data_passada(3),
+            data_validade_inspecao=data_futura(10),
+        )
+        criar_veiculo(motorista=self._motorista(2), matricula='DOC-002-MZ')
+        inactivo = criar_veiculo(
+            motorista=self._motorista(3), matricula='DOC-003-MZ',
+            data_validade_seguro=data_passada(90),
+        )
+        inactivo.ativo = False
+        inactivo.save()
+
+    def _motorista(self, n, **kwargs):
+        return criar_motorista(
+            user=criar_user(role='MOTORISTA', email=f'mot_doc{n}@teste.co.mz'), **kwargs
+        )
+
+    def test_uma_query_para_todos_os_documentos(self):
+        from transporte.documentos import documentos_a_expirar
+
+        with self.assertNumQueries(1):
+            resultado = documentos_a_expirar(dias=30)
+
+        self.assertEqual(
+            [(i['documento'], i['referencia'], i['dias']) for i in resultado['vencidos']],
+            [('SEGURO', 'DOC-001-MZ', -3)],
+        )
+        self.assertEqual(
+            [(i['documento'], i['id']) for i in resultado['a_vencer']],
+            [('CARTA', self.motorista.pk), ('INSPECAO', self.veiculo.pk)],
+        )
+        self.assertEqual(resultado['a_vencer'][0]['email'], 'mot_doc1@teste.co.mz')
+
+    def test_tasks_usam_o_mesmo_resultado(self):
+        from transporte.tasks import notificar_cartas_conducao, notificar_documentos_veiculo
+
+        self.assertEqual(notificar_cartas_conducao()['a_vencer'], [self.motorista.user.nome])
+        alertas = notificar_documentos_veiculo()['alertas']
+        self.assertEqual(len(alertas), 1)
+        self.assertIn('seguro vencido(a)', alertas[0])
+        self.assertIn('inspecção vence', alertas[0])
+
+    def test_endpoint_so_documentos_de_veiculos(self):
+        self.autenticar_como_gestor(email='gestor_doc@teste.co.mz')
+        resp = self.client.get('/api/v1/veiculos/documentos-a-vencer/', {'dias': 15})
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([i['documento'] for i in resp.data['vencidos']], ['SEGURO'])
+        self.assertEqual([i['documento'] for i in resp.data['a_vencer']], ['INSPECAO'])
+
+    def test_endpoint_dias_fora_do_intervalo(self):
+        self.autenticar_como_gestor(email='gestor_doc_dias@teste.co.mz')
+        for dias in (3000000, -1):
+            resp = self.client.get('/api/v1/veiculos/documentos-a-vencer/', {'dias': dias})
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('erro', resp.data)
+
+
+class EstatisticasFrotaTests(BaseAPITestCase):
+    """Métricas da frota com número fixo de queries (transporte.estatisticas)."""
+
+    def setUp(self):
+        super().setUp()
+        self.autenticar_como_gestor(email='gestor_frota@teste.co.mz')
+
+    def _veiculo(self, n, **kwargs):
+        motorista = criar_motorista(
+            user=criar_user(role='MOTORISTA', email=f'mot_frota{n}@teste.co.mz'),
+        )
+        return criar_veiculo(motorista=motorista, matricula=f'FRT-{n:03d}-MZ', **kwargs)
+
+    def _abastecer(self, veiculo, km, litros, custo):
+        from transporte.models import Abastecimento
+        veiculo.refresh_from_db()
+        return Abastecimento.objects.create(
+            veiculo=veiculo, quilometragem_no_ato=km,
+            quantidade_litros=Decimal(litros), custo_total=Decimal(custo),
+            posto_combustivel='Posto Central',
+        )
+
+    def _frota_completa(self, n):
+        v = self._veiculo(n, capacidade=10, km_proxima_revisao=500)
+        criar_manutencao(veiculo=v, concluida=True, custo=Decimal('1500.00'))
+        self._abastecer(v, 100, '30.00', '2000.00')
+        self._abastecer(v, 400, '25.00', '1800.00')
+        self._abastecer(v, 900, '40.00', '2900.00')
+        v.refresh_from_db()
+        enc = criar_encarregado(user=criar_user(role='ENCARREGADO', email=f'enc_frota{n}@teste.co.mz'))
+        criar_rota(veiculo=v, nome=f'Rota {n}', alunos=[
+            criar_aluno(
+                encarregado=enc,
+                user=criar_user(role='ALUNO', email=f'aluno_frota{n}_{i}@teste.co.mz'),
+            )
+            for i in range(2)
+        ])
+        return v
+
+    def test_metricas_iguais_as_do_modelo(self):
+        from transporte.estatisticas import estatisticas_veiculo
+        from transporte.models import Veiculo
+        v = Veiculo.objects.get(pk=self._frota_completa(1).pk)
+
+        stats = estatisticas_veiculo(v)
+
+        self.assertAlmostEqual(stats['consumo_medio_km_l'], round(v.consumo_medio(), 2))
+        self.assertEqual(stats['custo_por_km_mzn'], v.custo_por_quilometro())
+        self.assertAlmostEqual(stats['autonomia_estimada_km'], v.autonomia_estimada)
+        self.assertEqual(stats['custo_total_combustivel_mzn'], float(v.custo_total_combustivel))
+        self.assertEqual(stats['vagas_disponiveis'], v.vagas_disponiveis)
+        self.assertEqual(stats['em_manutencao'], v.em_manutencao())
+        self.assertEqual(stats['precisa_manutencao'], v.precisa_manutencao())
+        self.assertTrue(stats['precisa_manutencao'])
+
+    def test_veiculo_sem_registos(self):
+        from transporte.estatisticas import estatisticas_veiculo
+        stats = estatisticas_veiculo(self._veiculo(2))
+
+        self.assertEqual(stats['consumo_medio_km_l'], 0.0)
+        self.assertEqual(stats['custo_por_km_mzn'], 0.0)
+        self.assertEqual(stats['vagas_disponiveis'], 15)
+        self.assertFalse(stats['em_manutencao'])
+
+    def test_endpoint_frota_com_queries_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._frota_completa(3)
+        with CaptureQueriesContext(connection) as uma:
+            resp = self.client.get('/api/v1/veiculos/estatisticas-frota/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['total'], 1)
+
+        self._frota_completa(4)
+        self._frota_completa(5)
+        with CaptureQueriesContext(connection) as tres:
+            resp = self.client.get('/api/v1/veiculos/estatisticas-frota/')
+        self.assertEqual(resp.data['total'], 3)
+        self.assertEqual(len(tres), len(uma))
+
+
 # ══════════════════════════════════════════════
 # API — ROTAS
 # ══════════════════════════════════════════════
@@ -417,6 +947,67 @@ class TransporteAlunoAPITests(BaseAPITestCase):
 # SIGNAL — ABASTECIMENTO → DESPESA VEICULO
 # ══════════════════════════════════════════════
 
+class ConsumoVeiculoTests(TestCase):
+    """Totais de combustível incrementais (ConsumoVeiculo) e comando de reconstrução."""
+
+    def setUp(self):
+        motorista = criar_motorista(
+            user=criar_user(role='MOTORISTA', email='mot_consumo@teste.co.mz'),
+        )
+        self.veiculo = criar_veiculo(motorista=motorista, matricula='CNS-001-MZ')
+        self.abastecimentos = [
+            self._abastecer(100, '30.00', '2000.00'),
+            self._abastecer(400, '25.00', '1800.00'),
+            self._abastecer(900, '40.00', '2900.00'),
+        ]
+
+    def _abastecer(self, km, litros, custo):
+        from transporte.models import Abastecimento
+        self.veiculo.refresh_from_db()
+        return Abastecimento.objects.create(
+            veiculo=self.veiculo, quilometragem_no_ato=km,
+            quantidade_litros=Decimal(litros), custo_total=Decimal(custo),
+            posto_combustivel='Posto Central',
+        )
+
+    def test_totais_incrementais(self):
+        from transporte.models import ConsumoVeiculo
+        c = ConsumoVeiculo.objects.get(veiculo=self.veiculo)
+
+        self.assertEqual((c.registos, c.km_inicial, c.km_final), (3, 100, 900))
+        self.assertEqual(c.litros_apos_inicial, Decimal('65.00'))
+        self.assertEqual(c.custo_total, Decimal('6700.00'))
+        self.assertAlmostEqual(c.consumo_medio, 800 / 65)
+
+    def test_consumo_medio_le_totais_sem_percorrer_historico(self):
+        from transporte.models import Veiculo
+        v = Veiculo.objects.get(pk=self.veiculo.pk)
+        with self.assertNumQueries(1):
+            consumo = v.consumo_medio()
+        self.assertAlmostEqual(consumo, 800 / 65)
+
+    def test_apagar_abastecimento_recalcula(self):
+        from transporte.models import ConsumoVeiculo
+        self.abastecimentos[0].delete()
+        c = ConsumoVeiculo.objects.get(veiculo=self.veiculo)
+
+        self.assertEqual((c.registos, c.km_inicial, c.km_final), (2, 400, 900))
+        self.assertEqual(c.litros_apos_inicial, Decimal('40.00'))
+        self.assertEqual(c.custo_total, Decimal('4700.00'))
+
+    def test_comando_reconstroi_totais(self):
+        from transporte.models import ConsumoVeiculo
+        ConsumoVeiculo.objects.filter(veiculo=self.veiculo).update(registos=0, custo_total=0)
+
+        out = StringIO()
+        call_command('reconstruir_consumo_veiculos', '--matricula', 'cns-001-mz', stdout=out)
+
+        c = ConsumoVeiculo.objects.get(veiculo=self.veiculo)
+        self.assertIn('1 veículo(s)', out.getvalue())
+        self.assertEqual(c.registos, 3)
+        self.assertEqual(c.custo_total, Decimal('6700.00'))
+
+
 class SignalAbastecimentoDespesaVeiculoTests(TestCase):
     """
     Garante que ao criar um Abastecimento é criada automaticamente
@@ -772,6 +1363,313 @@ class CheckInActionTests(BaseAPITestCase):
         self.assertEqual(resp.status_code, 403)
 
 
+class _RotaComAlunosTestCase(BaseAPITestCase):
+    """Rota de um motorista com três alunos inscritos e um de fora."""
+
+    DIA = datetime.date(2030, 3, 4)
+
+    def setUp(self):
+        super().setUp()
+        self.motorista = criar_motorista(
+            user=criar_user(role='MOTORISTA', email='mot_lote@teste.co.mz'),
+        )
+        self.rota = criar_rota(veiculo=criar_veiculo(motorista=self.motorista))
+        self.alunos = [self._aluno(i) for i in range(4)]
+        self.rota.alunos.add(*self.alunos[:3])
+
+    def _aluno(self, i):
+        encarregado = criar_encarregado(
+            user=criar_user(role='ENCARREGADO', email=f'enc_lote{i}@teste.co.mz'),
+        )
+        return criar_aluno(
+            user=criar_user(role='ALUNO', email=f'aluno_lote{i}@teste.co.mz'),
+            encarregado=encarregado,
+        )
+
+    def _item(self, aluno, status_, minuto):
+        return {
+            'aluno': aluno.pk, 'status': status_,
+            'registado_em': f'2030-03-04T06:{minuto:02d}:00+02:00',
+        }
+
+
+class PaginacaoCursorTransporteTests(_RotaComAlunosTestCase):
+    """GET /transportes/ — paginação por (data, id), COUNT só com ?contar=1."""
+
+    def setUp(self):
+        super().setUp()
+        from transporte.models import TransporteAluno
+        TransporteAluno.objects.bulk_create([
+            TransporteAluno(aluno=aluno, rota=self.rota, data=self.DIA - datetime.timedelta(days=d))
+            for d in range(12) for aluno in self.alunos[:3]
+        ])
+        self.autenticar_como_gestor(email='gestor_cursor@teste.co.mz')
+
+    def _percorrer(self, url):
+        ids, paginas = [], []
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            paginas.append(resp.data)
+            ids += [r['id'] for r in resp.data['results']]
+            url = resp.data['next']
+        return ids, paginas
+
+    def test_paginas_percorrem_tudo_sem_repetir(self):
+        from transporte.models import TransporteAluno
+        ids, paginas = self._percorrer('/api/v1/transportes/')
+
+        esperado = list(TransporteAluno.objects.order_by('-data', '-id').values_list('pk', flat=True))
+        self.assertEqual(ids, esperado)
+        self.assertEqual(len(paginas), 2)
+        self.assertNotIn('count', paginas[0])
+
+    def test_previous_volta_a_pagina_anterior(self):
+        primeira = self.client.get('/api/v1/transportes/').data
+        segunda = self.client.get(primeira['next']).data
+        anterior = self.client.get(segunda['previous']).data
+
+        self.assertIsNone(primeira['previous'])
+        self.assertEqual(
+            [r['id'] for r in anterior['results']],
+            [r['id'] for r in primeira['results']],
+        )
+
+    def test_sem_contar_nao_faz_count(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get('/api/v1/transportes/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse([q['sql'] for q in queries if 'COUNT(' in q['sql'].upper()])
+
+        resp = self.client.get('/api/v1/transportes/', {'contar': '1'})
+        self.assertEqual(resp.data['count'], 36)
+
+    def test_ordering_por_status_percorre_tudo(self):
+        from transporte.models import TransporteAluno
+        ids, _ = self._percorrer('/api/v1/transportes/?ordering=status')
+        self.assertEqual(sorted(ids), sorted(TransporteAluno.objects.values_list('pk', flat=True)))
+
+    def test_ordering_por_fk_e_ignorado(self):
+        from transporte.models import TransporteAluno
+        ids, _ = self._percorrer('/api/v1/transportes/?ordering=aluno')
+        esperado = list(TransporteAluno.objects.order_by('-data', '-id').values_list('pk', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_posicao_de_fk_guarda_o_id(self):
+        import json
+        from core.pagination import KeysetPagination
+        from transporte.models import TransporteAluno
+        registo = TransporteAluno.objects.select_related('aluno').first()
+        posicao = KeysetPagination()._get_position_from_instance(registo, ('aluno', '-id'))
+        self.assertEqual(json.loads(posicao), [str(registo.aluno_id), str(registo.pk)])
+
+    def test_cursor_invalido_retorna_404(self):
+        resp = self.client.get('/api/v1/transportes/', {'cursor': 'lixo'})
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RotaAlunosStreamTests(_RotaComAlunosTestCase):
+    """GET /rotas/{id}/alunos/ — resposta em stream."""
+
+    def test_alunos_inscritos_em_stream(self):
+        import json
+        self.autenticar_como_gestor(email='gestor_alunos_stream@teste.co.mz')
+        resp = self.client.get(f'/api/v1/rotas/{self.rota.pk}/alunos/')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp.streaming)
+        dados = json.loads(b''.join(resp.streaming_content))
+        self.assertEqual(sorted(a['id'] for a in dados), sorted(a.pk for a in self.alunos[:3]))
+        self.assertEqual(dados[0]['encarregado_nome'], self.alunos[0].encarregado.user.nome)
+
+
+class CheckInLoteTests(_RotaComAlunosTestCase):
+    """POST /rotas/{id}/check-in-lote/ — vários check-ins numa transacção."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/v1/rotas/{self.rota.pk}/check-in-lote/'
+
+    def test_aplica_lote_com_resultado_por_item(self):
+        from transporte.models import RegistoEmbarque, TransporteAluno
+        a0, a1, a2, fora = self.alunos
+        TransporteAluno.objects.create(aluno=a0, rota=self.rota, data=self.DIA)
+        self._autenticar(self.motorista.user)
+
+        resp = self.client.post(self.url, {
+            'data': '2030-03-04',
+            'itens': [
+                self._item(a0, 'EMBARCADO', 1),
+                self._item(a1, 'DESEMBARCADO', 9),  # chega antes do embarque
+                self._item(a1, 'EMBARCADO', 2),
+                self._item(a2, 'DESEMBARCADO', 3),
+                self._item(fora, 'EMBARCADO', 4),
+            ],
+        }, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual((resp.data['aplicados'], resp.data['erros']), (3, 2))
+        self.assertEqual(
+            [r['resultado'] for r in resp.data['resultados']],
+            ['ok', 'ok', 'ok', 'erro', 'erro'],
+        )
+        estados = dict(
+            TransporteAluno.objects.filter(data=self.DIA).values_list('aluno_id', 'status')
+        )
+        self.assertEqual(estados, {a0.pk: 'EMBARCADO', a1.pk: 'DESEMBARCADO'})
+        self.assertEqual(
+            list(RegistoEmbarque.objects.order_by('registado_em').values_list('status', flat=True)),
+            ['EMBARCADO', 'EMBARCADO', 'DESEMBARCADO'],
+        )
+        self.assertEqual(RegistoEmbarque.objects.filter(registado_por=self.motorista.user).count(), 3)
+
+    def test_registo_criado_por_lote_paralelo_repete_o_lote(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from transporte.models import TransporteAluno, TransporteAlunoManager
+        a0, a1 = self.alunos[:2]
+        aplicar = TransporteAlunoManager._aplicar_check_ins
+        tentativas = []
+
+        def lote_paralelo(manager, *args):
+            tentativas.append(1)
+            if len(tentativas) == 1:
+                # Outro lote fez commit do registo de a0 e o nosso INSERT falhou
+                TransporteAluno.objects.create(aluno=a0, rota=self.rota, data=self.DIA, status='EMBARCADO')
+                raise IntegrityError('unique_transporte_aluno_por_dia')
+            return aplicar(manager, *args)
+
+        with mock.patch.object(TransporteAlunoManager, '_aplicar_check_ins', autospec=True,
+                               side_effect=lote_paralelo):
+            resultados = TransporteAluno.objects.registar_check_ins(
+                self.rota,
+                [{'aluno': a0.pk, 'status': 'EMBARCADO', 'registado_em': timezone.now()},
+                 {'aluno': a1.pk, 'status': 'EMBARCADO', 'registado_em': timezone.now()}],
+                data=self.DIA,
+            )
+
+        self.assertEqual(len(tentativas), 2)
+        self.assertEqual([r['resultado'] for r in resultados], ['sem_alteracao', 'ok'])
+        self.assertEqual(
+            dict(TransporteAluno.objects.filter(data=self.DIA).values_list('aluno_id', 'status')),
+            {a0.pk: 'EMBARCADO', a1.pk: 'EMBARCADO'},
+        )
+
+    def test_reenvio_do_mesmo_lote_nao_altera_nada(self):
+        from transporte.models import RegistoEmbarque
+        self._autenticar(self.motorista.user)
+        payload = {'data': '2030-03-04', 'itens': [self._item(self.alunos[0], 'EMBARCADO', 1)]}
+
+        self.client.post(self.url, payload, format='json')
+        resp = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(resp.data['resultados'][0]['resultado'], 'sem_alteracao')
+        self.assertEqual(RegistoEmbarque.objects.count(), 1)
+
+    def test_motorista_de_outra_rota_sem_acesso(self):
+        outro = criar_motorista(user=criar_user(role='MOTORISTA', email='mot_lote_outro@teste.co.mz'))
+        self._autenticar(outro.user)
+        resp = self.client.post(self.url, {
+            'itens': [self._item(self.alunos[0], 'EMBARCADO', 1)],
+        }, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_check_in_individual_regista_auditoria(self):
+        from transporte.models import RegistoEmbarque, TransporteAluno
+        from transporte.serializers import CheckInSerializer
+        registo = TransporteAluno.objects.create(aluno=self.alunos[0], rota=self.rota, data=self.DIA)
+
+        serializer = CheckInSerializer(registo, data={'status': 'EMBARCADO'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        evento = RegistoEmbarque.objects.get()
+        self.assertEqual((evento.status_anterior, evento.status), ('PENDENTE', 'EMBARCADO'))
+
+
+class SincronizacaoOfflineTests(_RotaComAlunosTestCase):
+    """GET/POST /rotas/{id}/sincronizar/ — delta da lista de embarque por cursor."""
+
+    def setUp(self):
+        super().setUp()
+        from transporte.models import TransporteAluno
+        TransporteAluno.objects.gerar_lista_diaria(self.DIA)
+        # Lista gerada há uma hora — fora da janela de reenvio do cursor
+        TransporteAluno.objects.update(atualizado_em=timezone.now() - datetime.timedelta(hours=1))
+        self.url = f'/api/v1/rotas/{self.rota.pk}/sincronizar/'
+        self._autenticar(self.motorista.user)
+
+    def test_descarga_inicial_e_delta_vazio(self):
+        resp = self.client.get(self.url, {'data': '2030-03-04'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.data['alteracoes']), 3)
+
+        resp = self.client.get(self.url, {'data': '2030-03-04', 'cursor': resp.data['cursor']})
+        self.assertEqual(resp.data['alteracoes'], [])
+
+    def test_envio_devolve_so_linhas_alteradas(self):
+        cursor = self.client.get(self.url, {'data': '2030-03-04'}).data['cursor']
+
+        resp = self.client.post(self.url, {
+            'data': '2030-03-04',
+            'cursor': cursor,
+            'alteracoes': [self._item(self.alunos[0], 'EMBARCADO', 5)],
+        }, format='json')
+
+        self.assertEqual(resp.data['resultados'][0]['resultado'], 'ok')
+        self.assertEqual(
+            [(linha['aluno'], linha['status']) for linha in resp.data['alteracoes']],
+            [(self.alunos[0].pk, 'EMBARCADO')],
+        )
+        self.assertGreater(resp.data['cursor'], cursor)
+
+    def test_alteracao_antiga_perde_para_a_mais_recente(self):
+        from transporte.models import TransporteAluno
+        a0 = self.alunos[0]
+        self.client.post(self.url, {
+            'data': '2030-03-04', 'alteracoes': [self._item(a0, 'EMBARCADO', 10)],
+        }, format='json')
+        # Segundo telemóvel, offline, marcou antes — e pede DESEMBARCADO com hora anterior
+        resp = self.client.post(self.url, {
+            'data': '2030-03-04', 'alteracoes': [self._item(a0, 'DESEMBARCADO', 5)],
+        }, format='json')
+
+        self.assertEqual(resp.data['resultados'][0]['resultado'], 'conflito')
+        self.assertEqual(
+            TransporteAluno.objects.get(aluno=a0, data=self.DIA).status, 'EMBARCADO'
+        )
+
+    def test_commit_tardio_dentro_da_janela_nao_se_perde(self):
+        from transporte.models import TransporteAluno
+        resp = self.client.post(self.url, {
+            'data': '2030-03-04', 'alteracoes': [self._item(self.alunos[0], 'EMBARCADO', 5)],
+        }, format='json')
+        cursor = resp.data['cursor']
+
+        # Outra transacção gravou antes desta sincronização mas só fez commit depois
+        gravado_em = timezone.now() - TransporteAluno.objects.JANELA_SINCRONIZACAO / 2
+        TransporteAluno.objects.filter(aluno=self.alunos[1], data=self.DIA).update(
+            status='EMBARCADO', atualizado_em=gravado_em,
+        )
+
+        resp = self.client.get(self.url, {'data': '2030-03-04', 'cursor': cursor})
+        self.assertIn(
+            (self.alunos[1].pk, 'EMBARCADO'),
+            [(linha['aluno'], linha['status']) for linha in resp.data['alteracoes']],
+        )
+
+    def test_cursor_invalido(self):
+        resp = self.client.get(self.url, {'cursor': 'ontem'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_com_data_impossivel(self):
+        resp = self.client.get(self.url, {'cursor': '2025-02-30T10:00:00'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', resp.data)
+
+
 # ══════════════════════════════════════════════
 # FILTROS DE DATA — TRANSPORTE
 # ══════════════════════════════════════════════
@@ -11,8 +11,8 @@ ViewSets:
   AbastecimentoViewSet    — CRUD + histórico por veículo
 """
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
@@ -32,19 +32,29 @@ from core.permissions import (
     IsGestorOuMotoristaOuMonitor,
     PodeVerRota,
     PodeVerVeiculo,
+    filtrar_por_role,
 )
 from rest_framework.response import Response
 
+from core.authentication import AutenticacaoPorTokenMixin
 from core.models import Aluno
+from core.pagination import TransporteAlunoPagination
+from core.streaming import resposta_json_em_stream
+from transporte.documentos import DIAS_MAXIMO, DOCUMENTOS_VEICULO, documentos_a_expirar
+from transporte.estatisticas import estatisticas_veiculo, estatisticas_veiculos
 from transporte.models import Abastecimento, Manutencao, Rota, TransporteAluno, Veiculo
 from transporte.serializers import (
     AbastecimentoSerializer,
+    CheckInLoteSerializer,
     CheckInSerializer,
     ManutencaoConcluirSerializer,
     ManutencaoSerializer,
     RotaSerializer,
     RotaWriteSerializer,
+    SincronizacaoSerializer,
     TransporteAlunoSerializer,
+    TransporteAlunoSyncSerializer,
+    ValidarHorariosSerializer,
     VeiculoListSerializer,
     VeiculoSerializer,
     VeiculoWriteSerializer,
@@ -65,6 +75,7 @@ class VeiculoViewSet(viewsets.ModelViewSet):
     PUT/PATCH /veiculos/{id}/              → editar (admin)
     DELETE /veiculos/{id}/                 → desactivar (admin, soft)
     GET    /veiculos/{id}/estatisticas/    → métricas calculadas
+    GET    /veiculos/estatisticas-frota/   → métricas de toda a frota (gestor)
     GET    /veiculos/{id}/rotas-ativas/    → rotas activas do veículo
     GET    /veiculos/{id}/manutencoes/     → histórico de manutenções
     GET    /veiculos/{id}/abastecimentos/  → histórico de abastecimentos
@@ -80,17 +91,16 @@ class VeiculoViewSet(viewsets.ModelViewSet):
     ordering = ['matricula']
 
     def get_queryset(self):
-        return (
+        if self.action in ('estatisticas', 'estatisticas_frota'):
+            # As métricas vêm de transporte.estatisticas — sem prefetch
+            return Veiculo.objects.all()
+        qs = (
             Veiculo.objects
             .select_related('motorista__user')
             .prefetch_related('rotas', 'manutencoes', 'abastecimento')
-            .annotate(
-                alunos_count=Count(
-                    'rotas__alunos',
-                    filter=Q(rotas__ativo=True)
-                )
-            )
         )
+        # A lista já vem restringida ao role; no detalhe decide o PodeVerVeiculo (403)
+        return qs if self.detail else filtrar_por_role(qs, self.request)
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -100,7 +110,7 @@ class VeiculoViewSet(viewsets.ModelViewSet):
         return VeiculoSerializer
 
     def get_permissions(self):
-        if self.action in ('create', 'update', 'partial_update', 'destroy'):
+        if self.action in ('create', 'update', 'partial_update', 'destroy', 'estatisticas_frota'):
             return [IsGestor()]
         if self.action in ('retrieve', 'estatisticas', 'rotas_ativas', 'manutencoes', 'abastecimentos'):
             return [PodeVerVeiculo()]
@@ -120,17 +130,19 @@ class VeiculoViewSet(viewsets.ModelViewSet):
         consumo médio, custo/km, autonomia, estado de manutenção e documentação.
         """
         veiculo = self.get_object()
+        return Response(estatisticas_veiculo(veiculo))
+
+    @action(detail=False, methods=['get'], url_path='estatisticas-frota')
+    def estatisticas_frota(self, request):
+        """
+        Métricas de todos os veículos (respeita filtros e pesquisa da lista).
+        Número fixo de queries, independente do tamanho da frota.
+        """
+        veiculos = list(self.filter_queryset(self.get_queryset()))
+        stats = estatisticas_veiculos(veiculos)
         return Response({
-            'matricula': veiculo.matricula,
-            'quilometragem_atual': veiculo.quilometragem_atual,
-            'consumo_medio_km_l': round(veiculo.consumo_medio(), 2),
-            'custo_por_km_mzn': veiculo.custo_por_quilometro(),
-            'autonomia_estimada_km': veiculo.autonomia_estimada,
-            'custo_total_combustivel_mzn': float(veiculo.custo_total_combustivel),
-            'vagas_disponiveis': veiculo.vagas_disponiveis,
-            'em_manutencao': veiculo.em_manutencao(),
-            'precisa_manutencao': veiculo.precisa_manutencao(),
-            'documentacao_em_dia': veiculo.document_em_dia(),
+            'total': len(veiculos),
+            'veiculos': [{'id': v.pk, **stats[v.pk]} for v in veiculos],
         })
 
     @action(detail=True, methods=['get'], url_path='rotas-ativas')
@@ -163,32 +175,39 @@ class VeiculoViewSet(viewsets.ModelViewSet):
         Veículos activos que precisam de revisão (baseado em quilometragem).
         Não inclui os que já estão em manutenção.
         """
-        veiculos = [v for v in self.get_queryset().filter(ativo=True) if v.precisa_manutencao()]
+        veiculos = self.get_queryset().a_precisar_revisao()
         serializer = VeiculoListSerializer(veiculos, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='documentos-a-vencer')
     def documentos_a_vencer(self, request):
         """
-        Veículos activos com seguro, inspecção ou manifesto
-        a expirar nos próximos 30 dias (ou já expirados).
+        Seguros, inspecções e manifestos de veículos activos já expirados
+        ou a expirar nos próximos `?dias=` dias (default 30).
+
+        Resposta: { "data", "limite", "vencidos": [...], "a_vencer": [...] }
+        — o mesmo resultado de transporte.documentos usado pelas tasks.
         """
-        import datetime
-        limite = datetime.date.today() + datetime.timedelta(days=30)
-        qs = self.get_queryset().filter(
-            ativo=True,
-        ).filter(
-            Q(data_validade_seguro__lte=limite) | Q(data_validade_inspecao__lte=limite) | Q(data_validade_manifesto__lte=limite)
-        )
-        serializer = VeiculoListSerializer(qs, many=True)
-        return Response(serializer.data)
+        try:
+            dias = int(request.query_params.get('dias', 30))
+        except ValueError:
+            return Response(
+                {'erro': 'dias deve ser um número inteiro.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= dias <= DIAS_MAXIMO:
+            return Response(
+                {'erro': f'dias deve estar entre 0 e {DIAS_MAXIMO}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(documentos_a_expirar(dias=dias, documentos=DOCUMENTOS_VEICULO))
 
 
 # ──────────────────────────────────────────────
 # ROTA VIEWSET
 # ──────────────────────────────────────────────
 
-class RotaViewSet(viewsets.ModelViewSet):
+class RotaViewSet(AutenticacaoPorTokenMixin, viewsets.ModelViewSet):
     """
     CRUD de rotas.
 
@@ -197,14 +216,21 @@ class RotaViewSet(viewsets.ModelViewSet):
     GET    /rotas/{id}/                     → detalhe
     PUT/PATCH /rotas/{id}/                  → editar (admin)
     DELETE /rotas/{id}/                     → desactivar (admin, soft)
-    GET    /rotas/{id}/alunos/              → alunos inscritos
+    GET    /rotas/{id}/alunos/              → alunos inscritos (stream)
     POST   /rotas/{id}/adicionar-aluno/     → inscrever aluno
     POST   /rotas/{id}/remover-aluno/       → remover aluno
     GET    /rotas/{id}/presenca-hoje/       → registos de presença de hoje
     GET    /rotas/{id}/resumo-hoje/         → contagem por status hoje
+    POST   /rotas/{id}/check-in-lote/       → vários check-ins numa transacção
+    GET/POST /rotas/{id}/sincronizar/       → delta da lista de embarque (offline)
+    POST   /rotas/validar-horarios/         → conflitos de turno de um horário inteiro (admin)
+
+    presenca-hoje e resumo-hoje são consultados em ciclo pelos telemóveis:
+    autenticam só pelo token, sem ler o User (core.authentication).
     """
 
     permission_classes = [IsAuthenticated]
+    acoes_autenticadas_por_token = ('presenca_hoje', 'resumo_hoje')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['ativo', 'veiculo', 'veiculo__marca']
     search_fields = ['nome', 'veiculo__matricula', 'veiculo__motorista__user__nome']
@@ -212,12 +238,15 @@ class RotaViewSet(viewsets.ModelViewSet):
     ordering = ['nome']
 
     def get_queryset(self):
-        return (
+        if self.action in ('check_in_lote', 'sincronizar', 'adicionar_aluno', 'remover_aluno'):
+            return Rota.objects.select_related('veiculo__motorista__user')
+        qs = (
             Rota.objects
             .select_related('veiculo__motorista__user')
             .prefetch_related('alunos__user')
-            .annotate(total_inscritos_ann=Count('alunos'))
         )
+        # A lista já vem restringida ao role; no detalhe decide o PodeVerRota (403)
+        return qs if self.detail else filtrar_por_role(qs, self.request)
 
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
@@ -226,10 +255,12 @@ class RotaViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         if self.action in ('create', 'update', 'partial_update', 'destroy',
-                           'adicionar_aluno', 'remover_aluno'):
+                           'adicionar_aluno', 'remover_aluno', 'validar_horarios'):
             return [IsGestor()]
         if self.action in ('retrieve', 'alunos', 'presenca_hoje', 'resumo_hoje'):
             return [PodeVerRota()]
+        if self.action in ('check_in_lote', 'sincronizar'):
+            return [IsGestorOuMotoristaOuMonitor(), PodeVerRota()]
         return [IsGestorOuMotoristaOuMonitor()]
 
     def perform_destroy(self, instance):
@@ -243,11 +274,11 @@ class RotaViewSet(viewsets.ModelViewSet):
         """Lista os alunos inscritos na rota."""
         from core.serializers import AlunoListSerializer
         rota = self.get_object()
-        serializer = AlunoListSerializer(
+        return resposta_json_em_stream(
             rota.alunos.filter(ativo=True).select_related('user', 'encarregado__user'),
-            many=True
+            AlunoListSerializer,
+            context=self.get_serializer_context(),
         )
-        return Response(serializer.data)
 
     @action(detail=True, methods=['post'], url_path='adicionar-aluno')
     def adicionar_aluno(self, request, pk=None):
@@ -269,13 +300,20 @@ class RotaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if rota.alunos.count() >= rota.veiculo.capacidade:
-            return Response(
-                {'erro': f'Capacidade do veículo ({rota.veiculo.capacidade}) atingida.'},
-                status=status.HTTP_400_BAD_REQUEST
+        with transaction.atomic():
+            # Lê o contador com a rota bloqueada: duas inscrições em
+            # simultâneo não passam ambas a última vaga
+            inscritos = (
+                Rota.objects.select_for_update()
+                .values_list('total_inscritos', flat=True)
+                .get(pk=rota.pk)
             )
-
-        rota.alunos.add(aluno)
+            if inscritos >= rota.veiculo.capacidade:
+                return Response(
+                    {'erro': f'Capacidade do veículo ({rota.veiculo.capacidade}) atingida.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            rota.alunos.add(aluno)
         return Response(
             {'mensagem': f'{aluno} inscrito na rota {rota.nome}.'},
             status=status.HTTP_200_OK
@@ -330,12 +368,116 @@ class RotaViewSet(viewsets.ModelViewSet):
         )
         return Response(list(resumo))
 
+    @action(detail=False, methods=['post'], url_path='validar-horarios')
+    def validar_horarios(self, request):
+        """
+        Verifica um horário inteiro antes de o gravar: conflitos de turno
+        entre as rotas enviadas e com as rotas activas já existentes.
+
+        Payload: { "rotas": [{"id": 3 (opcional, rota a substituir), "nome",
+                   "veiculo", "hora_partida", "hora_chegada", "ativo"}, ...] }
+        """
+        serializer = ValidarHorariosSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        resultados = Rota.objects.validar_horarios(serializer.validated_data['rotas'])
+        invalidos = sum(1 for r in resultados if not r['valido'])
+        return Response({
+            'valido': invalidos == 0,
+            'invalidos': invalidos,
+            'resultados': resultados,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='check-in-lote')
+    def check_in_lote(self, request, pk=None):
+        """
+        Regista vários check-ins da rota de uma só vez (ex.: o monitor
+        embarca a turma inteira com rede fraca e envia tudo num pedido).
+
+        Payload:
+          { "data": "AAAA-MM-DD",            (opcional, default hoje)
+            "itens": [{"aluno": 1, "status": "EMBARCADO",
+                       "registado_em": "2025-03-04T06:45:12+02:00"}, ...] }
+
+        Tudo corre numa transacção; cada item tem o seu resultado
+        ('ok' | 'sem_alteracao' | 'erro') na ordem em que foi enviado.
+        """
+        rota = self.get_object()
+        serializer = CheckInLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data.get('data') or timezone.localdate()
+
+        resultados = TransporteAluno.objects.registar_check_ins(
+            rota,
+            serializer.validated_data['itens'],
+            data=data,
+            utilizador=request.user,
+        )
+        erros = sum(1 for r in resultados if r['resultado'] == 'erro')
+        conflitos = sum(1 for r in resultados if r['resultado'] == 'conflito')
+        return Response({
+            'data': data,
+            'aplicados': len(resultados) - erros - conflitos,
+            'erros': erros,
+            'conflitos': conflitos,
+            'resultados': resultados,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get', 'post'], url_path='sincronizar')
+    def sincronizar(self, request, pk=None):
+        """
+        Sincronização offline da lista de embarque de um dia.
+
+        O telemóvel guarda o `cursor` da última resposta e, quando tem rede,
+        envia de uma vez as alterações que acumulou. A resposta traz só os
+        registos que mudaram desde esse cursor (incluindo os que acabou de
+        enviar) e o cursor novo:
+
+          GET  ?data=AAAA-MM-DD&cursor=...          → só descarga
+          POST { "data", "cursor", "alteracoes": [{"aluno", "status",
+                 "registado_em"}, ...] }             → envio + descarga
+
+        Alterações mais antigas do que a última já registada no servidor
+        perdem ('conflito'); o registo actual volta em `alteracoes`.
+
+        O cursor fica uns segundos atrás da leitura, para apanhar gravações
+        com commit tardio; linhas dessa janela podem vir repetidas
+        (TransporteAlunoManager.cursor_sincronizacao).
+        """
+        rota = self.get_object()
+        dados = request.query_params if request.method == 'GET' else request.data
+        serializer = SincronizacaoSerializer(data=dados)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data.get('data') or timezone.localdate()
+        cursor = serializer.validated_data.get('cursor')
+
+        resultados = []
+        if serializer.validated_data.get('alteracoes'):
+            resultados = TransporteAluno.objects.registar_check_ins(
+                rota,
+                serializer.validated_data['alteracoes'],
+                data=data,
+                utilizador=request.user,
+            )
+
+        lido_em = timezone.now()
+        linhas = list(
+            TransporteAluno.objects.alteracoes_desde(rota, data, cursor).select_related('aluno__user')
+        )
+        cursor = TransporteAluno.objects.cursor_sincronizacao(linhas, cursor, lido_em)
+        return Response({
+            'data': data,
+            'cursor': cursor.isoformat() if cursor else None,
+            'alteracoes': TransporteAlunoSyncSerializer(linhas, many=True).data,
+            'resultados': resultados,
+        }, status=status.HTTP_200_OK)
+
 
 # ──────────────────────────────────────────────
 # TRANSPORTE ALUNO VIEWSET
 # ──────────────────────────────────────────────
 
-class TransporteAlunoViewSet(viewsets.ModelViewSet):
+class TransporteAlunoViewSet(AutenticacaoPorTokenMixin, viewsets.ModelViewSet):
     """
     Gestão de check-in/check-out dos alunos.
 
@@ -346,49 +488,29 @@ class TransporteAlunoViewSet(viewsets.ModelViewSet):
     DELETE /transportes/{id}/        → apagar (admin)
     GET    /transportes/hoje/        → registos do dia actual
     GET    /transportes/resumo-hoje/ → contagem por status hoje
+
+    As leituras autenticam só pelo token, sem ler o User (core.authentication);
+    o check-in grava registado_por e mantém a autenticação completa.
+    A lista é paginada por cursor (?cursor=...); ?contar=1 inclui o total.
     """
 
     permission_classes = [IsAuthenticated]
+    pagination_class = TransporteAlunoPagination
+    acoes_autenticadas_por_token = ('list', 'retrieve', 'hoje', 'resumo_hoje')
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_class = TransporteAlunoFilter
+    # Só colunas que a paginação por cursor usa como posição (sem FKs)
+    ordering_fields = ['data', 'atualizado_em', 'status']
     ordering = ['-data']
 
     def get_queryset(self):
-        user = self.request.user
         qs = TransporteAluno.objects.select_related(
             'aluno__user',
             'rota__veiculo__motorista__user'
         )
-
-        # Utilizador anónimo — devolve queryset vazio
-        if not user or not user.is_authenticated:
-            return qs.none()
-
-        # Motoristas vêem apenas os registos da sua rota
-        try:
-            motorista = user.perfil_motorista
-            return qs.filter(rota__veiculo__motorista=motorista)
-        except (ObjectDoesNotExist, AttributeError):
-            pass
-
-        # Monitores vêem apenas os registos da sua rota activa
-        try:
-            monitor = user.perfil_monitor
-            rota_ativa = monitor.rota_ativa
-            if rota_ativa:
-                return qs.filter(rota=rota_ativa)
-        except (ObjectDoesNotExist, AttributeError):
-            pass
-
-        # Encarregados vêem apenas os registos dos seus alunos
-        try:
-            encarregado = user.perfil_encarregado
-            return qs.filter(aluno__encarregado=encarregado)
-        except (ObjectDoesNotExist, AttributeError):
-            pass
-
-        # Admin e Gestores vêem tudo
-        return qs
+        # Motorista: registos das suas rotas; encarregado: dos seus alunos;
+        # monitor, gestor e admin: todos (core.permissions.ESCOPOS_POR_ROLE)
+        return filtrar_por_role(qs, self.request)
 
     def get_serializer_class(self):
         if self.action in ('update', 'partial_update'):